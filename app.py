@@ -1,10 +1,32 @@
+import argparse
 import asyncio
+import os
 import random
+import signal
 import time
 from contextlib import suppress
 from loguru import logger
+from utils.engine import SellEngine
+from utils.metrics import start_exporters, stop_exporters
+from utils.scheduler import Scheduler
+from utils.config import (
+    JOURNAL_PATH,
+    LAMPORTS_PER_SOL,
+    SIMULATION_SNAPSHOT_PATH,
+    TEST_TOKEN,
+    TEST_AMM_KEY,
+)
+from utils.journal import TradeJournalReader
 from utils.raydium import RaydiumClient
-from utils.config import TEST_TOKEN, TEST_AMM_KEY, read_private_keys
+from utils.simulator import (
+    MarketSnapshot,
+    compare,
+    fetch_snapshot,
+    fixed_fraction,
+    scalar_sizer,
+    uniform_fraction,
+)
+from utils.wallets import WalletRegistry
 
 
 def get_sell_amount(wallet_holding: float):
@@ -13,33 +35,211 @@ def get_sell_amount(wallet_holding: float):
     return sell_amount
 
 
-async def main():
-    """base runner"""
-    wallets = read_private_keys()
-    if not wallets:
+SIMULATED_SIZERS = {
+    "get_sell_amount": scalar_sizer(get_sell_amount),
+    "uniform 1-5%": uniform_fraction(1, 5),
+    "fixed 6%": fixed_fraction(6),
+}
+"""Strategies ``--simulate`` compares; add variants here"""
+
+
+def make_engine(mint: str = None) -> SellEngine:
+    """Sells TEST_TOKEN on TEST_AMM_KEY, or ``mint`` on its pool from the pool index."""
+    wallets = WalletRegistry(mints=[mint or TEST_TOKEN])
+    if not len(wallets):
         raise ValueError("No valid private keys found in the file.")
-    selected_key = random.choice(wallets)
-    logger.info(selected_key)
-    client = RaydiumClient(keys=selected_key)
-    wallet_sol_balance = await client.balance()
-    wallet_address = await client.wallet_address()
-    wallet_token_balance = await client.check_token_balance(TEST_TOKEN)
-    sell_holdings = get_sell_amount(wallet_token_balance)
-    if sell_holdings <= 0:
-        logger.error("Invalid sell amount. Aborting swap.")
+    if mint:
+        return SellEngine(wallets, None, mint, get_sell_amount)
+    return SellEngine(wallets, TEST_AMM_KEY, TEST_TOKEN, get_sell_amount)
+
+
+async def prepare(engine: SellEngine) -> None:
+    """
+    Brings the pool index and its ranking up to date when the pool is looked
+    up by mint. Failures are logged: sells fall back to the saved index and
+    its scan order.
+    """
+    if engine.pair is None:
+        await engine.refresh_pools()
+        try:
+            await RaydiumClient.pools.rank(engine.mint)
+        except Exception as e:
+            logger.error(f"Pool ranking failed: {e!r}")
+
+
+async def main(mint: str = None):
+    """base runner"""
+    engine = make_engine(mint)
+    await prepare(engine)
+    await engine.watch()
+    exporters = await start_exporters()
+    logger.info(f"Performing Sell across {len(engine.clients)} wallets")
+    try:
+        await engine.run()
+    finally:
+        await engine.close()
+        await stop_exporters(exporters)
+        RaydiumClient.signer.shutdown()
+        await RaydiumClient.journal.close()
+    engine.log_summary()
+
+
+async def daemon(mint: str = None):
+    """Sells from every wallet on its own jittered interval until SIGINT/SIGTERM."""
+    engine = make_engine(mint)
+    await prepare(engine)
+    await engine.watch()
+    scheduler = Scheduler()
+    engine.schedule(scheduler)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, scheduler.stop)
+    exporters = await start_exporters()
+    try:
+        await scheduler.run()
+    finally:
+        await engine.close()
+        await stop_exporters(exporters)
+        RaydiumClient.signer.shutdown()
+        await RaydiumClient.journal.close()
+    engine.log_summary()
+
+
+async def lookup_table(mint: str = None):
+    """Creates or extends the pool's address lookup table, paid by the first wallet."""
+    engine = make_engine(mint)
+    await prepare(engine)
+    pair = engine.pair or RaydiumClient.pools.pool_for(engine.mint)
+    if pair is None:
+        raise ValueError(f"No indexed pool for {engine.mint}")
+    owner = next(client for client in engine.clients if client.pubkey is not None)
+    table = await owner.ensure_lookup_table(pair)
+    logger.info(f"Sells on {pair} will use lookup table {table.key}")
+
+
+async def scan_pools():
+    """Rebuilds the pool index from a full program account scan."""
+    await RaydiumClient.pools.scan()
+
+
+def journal_report(path: str = JOURNAL_PATH):
+    """Logs daily quoted PnL and stage latencies from the trade journal."""
+    if not path or not os.path.exists(path):
+        logger.warning(f"No trade journal at {path!r}")
         return
-    logger.info(
-        f"""Performing Sell \n\nWallet: {wallet_address}\nBal SOL: {wallet_sol_balance}\nToken Balance: {wallet_token_balance}\nAmount to sell: {sell_holdings}"""
-    )
-    logger.info(
-        await client.make_sell_swap(
-            TEST_AMM_KEY, int(sell_holdings * 10**9), TEST_TOKEN
+    journal = TradeJournalReader(path)
+    daily = journal.daily()
+    lines = [f"{len(journal)} journaled attempts"]
+    for index, day in enumerate(daily["day"]):
+        lines.append(
+            f"{day}  attempts {daily['attempts'][index]}  "
+            f"confirmed {daily['confirmed'][index]}  "
+            f"sold {daily['tokens_sold'][index]:.4f}  "
+            f"quoted out {daily['quoted_out'][index] / LAMPORTS_PER_SOL:.6f} SOL  "
+            f"fees {daily['fees'][index] / LAMPORTS_PER_SOL:.6f} SOL  "
+            f"quoted pnl {daily['quoted_pnl'][index] / LAMPORTS_PER_SOL:.6f} SOL  "
+            f"unquoted {daily['unquoted'][index]}"
+        )
+    for stage, (p50, p90, p99) in (
+        (stage, values) for stage, values in journal.latency().items() if values
+    ):
+        lines.append(
+            f"{stage:<9} p50 {p50 * 1000:8.1f}ms  p90 {p90 * 1000:8.1f}ms  "
+            f"p99 {p99 * 1000:8.1f}ms"
         )
+    logger.info("\n".join(lines))
+
+
+async def market_snapshot(mint: str = None) -> MarketSnapshot:
+    """Reads the sell pool and every wallet's holding of the token."""
+    engine = make_engine(mint)
+    await prepare(engine)
+    pair = engine.pair or RaydiumClient.pools.pool_for(engine.mint)
+    if pair is None:
+        raise ValueError(f"No indexed pool for {engine.mint}")
+    wallets = [client for client in engine.clients if client.pubkey is not None]
+    return await fetch_snapshot(
+        RaydiumClient.client,
+        pair,
+        engine.mint,
+        [client.pubkey for client in wallets],
+        [client.associated_token_address(engine.mint) for client in wallets],
     )
 
 
+def simulate_strategies(
+    mint: str = None, runs: int = 10_000, rounds: int = 1, refresh: bool = False
+):
+    """Logs how every ``SIMULATED_SIZERS`` strategy fares on a pool and fleet snapshot."""
+    snapshot = None
+    if not refresh and os.path.exists(SIMULATION_SNAPSHOT_PATH):
+        snapshot = MarketSnapshot.load(SIMULATION_SNAPSHOT_PATH)
+        if snapshot.mint != str(mint or TEST_TOKEN):
+            snapshot = None
+    if snapshot is None:
+        snapshot = asyncio.run(market_snapshot(mint))
+        snapshot.save(SIMULATION_SNAPSHOT_PATH)
+    started = time.perf_counter()
+    results = compare(snapshot, SIMULATED_SIZERS, runs=runs, rounds=rounds)
+    lines = [
+        f"{runs} schedules of {rounds} round(s) across {len(snapshot.holdings)} wallets "
+        f"in {time.perf_counter() - started:.1f}s (p5 / p50 / p95)"
+    ]
+    for name, result in results.items():
+        summary = result.summary()
+        sol = " / ".join(f"{value / LAMPORTS_PER_SOL:.4f}" for value in summary["sol_out"])
+        slippage = " / ".join(f"{value * 100:.2f}%" for value in summary["slippage"])
+        price = " / ".join(f"{value * 100:.2f}%" for value in summary["price_change"])
+        lines.append(f"{name:<16} SOL {sol}  slippage {slippage}  price {price}")
+    logger.info("\n".join(lines))
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--daemon", action="store_true", help="keep selling on a schedule"
+    )
+    parser.add_argument(
+        "--lookup-table",
+        action="store_true",
+        help="set up the pool's address lookup table and exit",
+    )
+    parser.add_argument(
+        "--mint", help="token to sell, on its deepest indexed pool (default TEST_TOKEN)"
+    )
+    parser.add_argument(
+        "--scan-pools", action="store_true", help="rebuild the pool index and exit"
+    )
+    parser.add_argument(
+        "--journal-report",
+        action="store_true",
+        help="print daily quoted PnL and latencies from the trade journal and exit",
+    )
+    parser.add_argument(
+        "--simulate",
+        action="store_true",
+        help="compare sell strategies on a pool and fleet snapshot and exit",
+    )
+    parser.add_argument(
+        "--runs", type=int, default=10_000, help="schedules per simulated strategy"
+    )
+    parser.add_argument(
+        "--rounds", type=int, default=1, help="fleet-wide sell rounds per schedule"
+    )
+    parser.add_argument(
+        "--refresh-snapshot",
+        action="store_true",
+        help="re-read the pool and holdings instead of reusing Snapshot.json",
+    )
+    args = parser.parse_args()
     with suppress(KeyboardInterrupt) as error:
-        # while True:
-        asyncio.run(main())
-        # time.sleep(60)
+        if args.journal_report:
+            journal_report()
+        elif args.simulate:
+            simulate_strategies(args.mint, args.runs, args.rounds, args.refresh_snapshot)
+        elif args.scan_pools:
+            asyncio.run(scan_pools())
+        elif args.lookup_table:
+            asyncio.run(lookup_table(args.mint))
+        else:
+            asyncio.run(daemon(args.mint) if args.daemon else main(args.mint))
@@ -0,0 +1,200 @@
+"""End-to-end sells and balance checks against the local mock RPC.
+
+Starts ``benchmarks.mock_rpc`` in a subprocess with a synthetic pool and one
+funded token account per generated wallet, points the RPC config at it and
+drives ``SolanaClient.balance``/``check_token_balance``, ``fleet_snapshot``
+and ``SellEngine`` (``make_sell_swap``) at the given concurrency. Reports
+throughput and latency percentiles for each. With ``--lookup-table`` the
+pool's address lookup table is created on the mock first, and sells are
+compiled against it. With ``--route`` the mock also has a deeper AMM v4
+pool and sells are routed by mint instead of going to the CPMM pool.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_e2e [--wallets 200] [--concurrency 32]
+        [--latency 0.02] [--jitter 0.01] [--error-rate 0.0] [--lookup-table]
+        [--route]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from solders.keypair import Keypair  # type: ignore
+
+
+def report(name: str, latencies, elapsed: float, failed: int = 0) -> None:
+    from utils.engine import percentile
+
+    print(
+        f"{name:<22} {len(latencies) / elapsed:9.1f}/s  "
+        f"p50 {percentile(latencies, 50) * 1000:7.1f}ms  "
+        f"p90 {percentile(latencies, 90) * 1000:7.1f}ms  "
+        f"p99 {percentile(latencies, 99) * 1000:7.1f}ms  "
+        f"failed {failed}"
+    )
+
+
+async def timed_all(calls, concurrency: int):
+    """Runs coroutine factories under a semaphore; returns (latencies, failures, elapsed)."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def one(call):
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await call()
+            except Exception:
+                failures += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(call) for call in calls))
+    return latencies, failures, time.perf_counter() - started
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run(
+    keypairs, concurrency: int, lookup_table: bool = False, route: bool = False
+) -> None:
+    from utils.config import TEST_AMM_KEY, TEST_TOKEN
+    from utils.engine import SellEngine
+    from utils.journal import TradeJournal, TradeJournalReader
+    from utils.lookup import LookupTableManager
+    from utils.pools import PoolRegistry
+    from utils.raydium import RaydiumClient
+    from utils.snapshot import fleet_snapshot
+
+    # Tables created on the mock must not end up in the real LookupTables.json
+    RaydiumClient.lookup_tables = LookupTableManager(RaydiumClient.client, path="")
+    RaydiumClient.pools = PoolRegistry(RaydiumClient.client, path="")
+    journal = tempfile.NamedTemporaryFile(suffix=".journal", delete=False)
+    journal.close()
+    os.unlink(journal.name)
+    RaydiumClient.journal = TradeJournal(journal.name)
+    if route:
+        await RaydiumClient.pools.scan()
+    clients = [RaydiumClient(keypair=keypair) for keypair in keypairs]
+    if lookup_table:
+        table = await clients[0].ensure_lookup_table(TEST_AMM_KEY)
+        print(f"lookup table {table.key} with {len(table.addresses)} addresses")
+    latencies, failed, elapsed = await timed_all(
+        [client.balance for client in clients], concurrency
+    )
+    report("getBalance", latencies, elapsed, failed)
+    latencies, failed, elapsed = await timed_all(
+        [lambda client=client: client.check_token_balance(TEST_TOKEN) for client in clients],
+        concurrency,
+    )
+    report("check_token_balance", latencies, elapsed, failed)
+
+    owners = [keypair.pubkey() for keypair in keypairs]
+    started = time.perf_counter()
+    await fleet_snapshot(RaydiumClient.client, owners, TEST_TOKEN)
+    elapsed = time.perf_counter() - started
+    print(f"{'fleet_snapshot':<22} {len(owners)} wallets in {elapsed * 1000:.1f}ms")
+
+    engine = SellEngine(
+        [str(keypair) for keypair in keypairs],
+        None if route else TEST_AMM_KEY,
+        TEST_TOKEN,
+        lambda holding: holding * 0.05,
+        concurrency,
+    )
+    # As app.main: sells on the fixed pool quote from a PoolWatcher
+    await engine.watch()
+    results = await engine.run()
+    await engine.close()
+    summary = engine.summary()
+    report(
+        "make_sell_swap",
+        [result.elapsed for result in results if result.ok],
+        summary["elapsed"],
+        summary["failed"],
+    )
+    template = await clients[0].sell_template(TEST_AMM_KEY, TEST_TOKEN)
+    print(f"{'sell message':<22} {len(template.message)} bytes")
+    await RaydiumClient.journal.close()
+    reader = TradeJournalReader(journal.name)
+    stages = "  ".join(
+        f"{stage} {values[0] * 1000:.1f}ms"
+        for stage, values in reader.latency((50,)).items()
+        if values
+    )
+    print(f"{'journal':<22} {len(reader)} records, p50 {stages}")
+    del reader
+    os.unlink(journal.name)
+    await RaydiumClient.client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--wallets", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--confirm-delay", type=float, default=0.4)
+    parser.add_argument("--lookup-table", action="store_true")
+    parser.add_argument("--route", action="store_true")
+    args = parser.parse_args()
+
+    port, ws_port = free_port(), free_port()
+    # Before anything imports utils.config, which reads the RPC urls once
+    os.environ["RPC_NODES"] = f"http://127.0.0.1:{port}"
+    os.environ["WS"] = f"ws://127.0.0.1:{ws_port}"
+    from benchmarks.mock_rpc import MockChain
+
+    keypairs = [Keypair() for _ in range(args.wallets)]
+    fixture = tempfile.NamedTemporaryFile(suffix=".json", delete=False)
+    fixture.close()
+    pools = {}
+    if args.route:
+        # A v4 pool ten times deeper than the CPMM pool
+        pools = dict(v4_reserve_sol=5_000 * 10**9, v4_reserve_token=500_000_000 * 10**9)
+    MockChain.synthetic([keypair.pubkey() for keypair in keypairs], **pools).save(
+        fixture.name
+    )
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.mock_rpc", "serve",
+            "--fixture", fixture.name,
+            "--port", str(port),
+            "--ws-port", str(ws_port),
+            "--latency", str(args.latency),
+            "--jitter", str(args.jitter),
+            "--error-rate", str(args.error_rate),
+            "--confirm-delay", str(args.confirm_delay),
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        # Wait for the "Mock RPC on ..." banner
+        server.stdout.readline()
+        print(
+            f"{args.wallets} wallets, concurrency {args.concurrency}, "
+            f"latency {args.latency * 1000:.0f}+/-{args.jitter * 1000:.0f}ms, "
+            f"error rate {args.error_rate:.1%}"
+        )
+        asyncio.run(run(keypairs, args.concurrency, args.lookup_table, args.route))
+    finally:
+        server.terminate()
+        server.wait()
+        os.unlink(fixture.name)
+
+
+if __name__ == "__main__":
+    main()
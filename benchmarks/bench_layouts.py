@@ -0,0 +1,52 @@
+"""construct vs struct decoding of the account layouts.
+
+tests/test_fastlayout.py checks that both decode the same values.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_layouts [accounts]
+"""
+import os
+import sys
+import time
+
+from utils.extractor import (
+    ACCOUNT_LAYOUT,
+    AMM_INFO_LAYOUT_V4_1,
+    CPMM_CONFIG_INFO_LAYOUT,
+    CPMM_POOL_INFO_LAYOUT,
+)
+from utils.fastlayout import (
+    FAST_ACCOUNT_LAYOUT,
+    FAST_AMM_INFO_LAYOUT_V4_1,
+    FAST_CPMM_CONFIG_INFO_LAYOUT,
+    FAST_CPMM_POOL_INFO_LAYOUT,
+)
+
+LAYOUTS = (
+    ("CPMM_POOL_INFO_LAYOUT", CPMM_POOL_INFO_LAYOUT, FAST_CPMM_POOL_INFO_LAYOUT),
+    ("ACCOUNT_LAYOUT", ACCOUNT_LAYOUT, FAST_ACCOUNT_LAYOUT),
+    ("AMM_INFO_LAYOUT_V4_1", AMM_INFO_LAYOUT_V4_1, FAST_AMM_INFO_LAYOUT_V4_1),
+    ("CPMM_CONFIG_INFO_LAYOUT", CPMM_CONFIG_INFO_LAYOUT, FAST_CPMM_CONFIG_INFO_LAYOUT),
+)
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main(count: int = 10_000) -> None:
+    for name, layout, fast in LAYOUTS:
+        buffers = [os.urandom(layout.sizeof()) for _ in range(count)]
+        _, slow_time = timed(lambda: [layout.parse(data) for data in buffers])
+        _, quick_time = timed(fast.decode_many, buffers)
+        print(
+            f"{name:<26} construct {count / slow_time:>10,.0f}/s  "
+            f"struct {count / quick_time:>12,.0f}/s  x{slow_time / quick_time:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,107 @@
+"""Legacy construct metadata decoding vs utils.metadata.
+
+Builds a seeded fixture corpus of CreateMetadataAccountV3 payloads and
+reports payloads decoded per second. tests/test_metadata.py checks that both
+paths agree.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_metadata [payloads]
+"""
+import json
+import random
+import sys
+import time
+
+import base58
+from borsh_construct import Enum
+
+from utils.extractor import (
+    METADATA_INSTRUCTION_LAYOUT,
+    convert_bytes_to_pubkey,
+    remove_bytesio,
+)
+from utils.metadata import iter_metadata
+
+USE_METHOD = Enum("Burn", "Multiple", "Single", enum_name="UseMethod")
+USE_METHODS = (USE_METHOD.enum.Burn, USE_METHOD.enum.Multiple, USE_METHOD.enum.Single)
+
+
+def fixture_corpus(count: int, seed: int = 7):
+    rng = random.Random(seed)
+
+    def text(limit):
+        return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz ") for _ in range(rng.randrange(limit)))
+
+    corpus = []
+    for _ in range(count):
+        uses = None
+        if rng.random() < 0.2:
+            uses = {
+                "useMethod": rng.choice(USE_METHODS)(),
+                "remaining": rng.randrange(2**32),
+                "total": rng.randrange(2**32),
+            }
+        payload = METADATA_INSTRUCTION_LAYOUT.build(
+            {
+                "instructionDiscriminator": 33,
+                "createMetadataAccountArgsV3": {
+                    "data": {
+                        "name": text(32),
+                        "symbol": text(10),
+                        "uri": "https://arweave.net/" + text(43),
+                        "sellerFeeBasisPoints": rng.randrange(10_000),
+                        "creators": [
+                            {
+                                "address": rng.randbytes(32),
+                                "verified": rng.random() < 0.5,
+                                "share": rng.randrange(101),
+                            }
+                            for _ in range(rng.randrange(4))
+                        ]
+                        or None,
+                        "collection": {"verified": True, "key": rng.randbytes(32)}
+                        if rng.random() < 0.3
+                        else None,
+                        "uses": uses,
+                    },
+                    "isMutable": rng.random() < 0.5,
+                    "collectionDetails": None,
+                },
+            }
+        )
+        corpus.append(base58.b58encode(payload).decode())
+    return corpus
+
+
+def legacy(payload: str) -> dict:
+    metadata = METADATA_INSTRUCTION_LAYOUT.parse(base58.b58decode(payload))
+    return convert_bytes_to_pubkey(remove_bytesio(metadata))
+
+
+def comparable(metadata: dict) -> dict:
+    """Legacy output with the borsh enum replaced by its variant name"""
+    return json.loads(json.dumps(metadata, default=lambda o: type(o).__name__))
+
+
+def main(count: int = 20_000) -> None:
+    corpus = fixture_corpus(count)
+
+    started = time.perf_counter()
+    [legacy(payload) for payload in corpus]
+    slow_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    list(iter_metadata(corpus))
+    fast_time = time.perf_counter() - started
+
+    print(f"construct   {count / slow_time:>10,.0f} payloads/s")
+    print(f"single-pass {count / fast_time:>10,.0f} payloads/s  x{slow_time / fast_time:.1f}")
+
+    started = time.perf_counter()
+    list(iter_metadata(corpus, records=True))
+    print(f"records     {count / (time.perf_counter() - started):>10,.0f} payloads/s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
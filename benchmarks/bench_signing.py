@@ -0,0 +1,92 @@
+"""Wallets signed per second: inline vs process and thread signing pools.
+
+Every wallet signs one rendered sell template, all submitted at once as a
+fleet would in the same sell window. Besides throughput, a ticker coroutine
+measures the worst event loop stall while signing, which is what the pools
+are for: inline signing blocks the loop for the whole burst.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_signing [wallets] [max workers]
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+from solders.hash import Hash  # type: ignore
+from solders.keypair import Keypair  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+
+from benchmarks.bench_swap_build import fake_pool_keys
+from utils.raydium import RaydiumClient
+from utils.signing import Signer, sign_message
+from utils.templates import SwapTemplate
+
+
+async def _ticker(stop: asyncio.Event, interval: float = 0.001) -> float:
+    """Longest gap between ticks that were due every ``interval`` seconds."""
+    worst = 0.0
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(interval)
+        now = time.perf_counter()
+        worst = max(worst, now - last - interval)
+        last = now
+    return worst
+
+
+async def _burst(signer: Signer, jobs) -> tuple:
+    stop = asyncio.Event()
+    ticker = asyncio.ensure_future(_ticker(stop))
+    await asyncio.sleep(0.01)
+    started = time.perf_counter()
+    transactions = await asyncio.gather(
+        *(signer.sign(keypair, message) for keypair, message in jobs)
+    )
+    elapsed = time.perf_counter() - started
+    stop.set()
+    return transactions, elapsed, await ticker
+
+
+async def main(count: int = 4_000, max_workers: int = os.cpu_count() or 1) -> None:
+    client = RaydiumClient(keys=str(Keypair()))
+    instructions = client.make_sell_instructions(
+        0, Pubkey.new_unique(), fake_pool_keys(), pair=Pubkey.new_unique()
+    )
+    template = SwapTemplate(client.keypair.pubkey(), instructions, len(instructions) - 2)
+    blockhash = Hash.new_unique()
+    # The template's payer is fixed; signing cost does not depend on it
+    jobs = [
+        (Keypair(), template.render(random.randrange(1, 10**15), 0, blockhash))
+        for _ in range(count)
+    ]
+    expected = [sign_message(keypair, message) for keypair, message in jobs]
+
+    print(f"{count} wallets, {os.cpu_count()} cores")
+    configurations = [("inline", 0)]
+    for workers in sorted({1, 2, max_workers} | set(range(2, max_workers + 1, 2))):
+        if workers <= max_workers:
+            configurations += [("process", workers), ("thread", workers)]
+    for mode, workers in configurations:
+        signer = Signer(workers=workers, mode=mode)
+        if workers:
+            # Start the pool (spawned interpreters import solders) outside the timing
+            await _burst(signer, jobs[:workers])
+        transactions, elapsed, stall = await _burst(signer, jobs)
+        signer.shutdown()
+        assert transactions == expected, f"{mode} signer output differs"
+        print(
+            f"{mode:<8} {workers:>2} workers  {count / elapsed:>9,.0f} wallets/s"
+            f"  worst loop stall {stall * 1e3:>7.1f} ms  ({signer.batches} batches)"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 4_000,
+            int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1,
+        )
+    )
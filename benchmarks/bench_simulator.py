@@ -0,0 +1,135 @@
+"""Monte Carlo sell simulation throughput, and its accuracy against exact quotes.
+
+Builds a synthetic CPMM pool, vaults, config and fleet, checks one simulated
+schedule (every trade) against the same sells replayed with the exact
+integer ``quote_exact_in``, then times ``runs`` schedules for a few sizers.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_simulator [--runs 10000] [--wallets 100] [--rounds 5]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+from solders.pubkey import Pubkey  # type: ignore
+
+from app import get_sell_amount
+from utils import extractor
+from utils.config import WSOL
+from utils.quote import CpmmFees, quote_exact_in
+from utils.simulator import (
+    MarketSnapshot,
+    fixed_fraction,
+    scalar_sizer,
+    simulate,
+    uniform_fraction,
+)
+
+MINT = Pubkey.new_unique()
+
+
+def fake_accounts(reserve_token: int, reserve_sol: int) -> dict:
+    """Raw pool, vault and config accounts of a token/wSOL CPMM pool."""
+    key = bytes(Pubkey.new_unique())
+    pool = extractor.CPMM_POOL_INFO_LAYOUT.build(
+        dict(
+            blob_8=bytes(8), configId=key, poolCreator=key, vaultA=key, vaultB=key,
+            mintLp=key, mintA=bytes(MINT), mintB=bytes(Pubkey.from_string(WSOL)),
+            mintProgramA=key, mintProgramB=key, observationId=key, bump=0, status=0,
+            lpDecimals=9, mintDecimalA=6, mintDecimalB=9, lpAmount=0,
+            protocolFeesMintA=1_000, protocolFeesMintB=2_000, fundFeesMintA=500,
+            fundFeesMintB=700, openTime=0, seq_u64_32=[0] * 32,
+        )
+    )
+    config = extractor.CPMM_CONFIG_INFO_LAYOUT.build(
+        dict(
+            blob_8=bytes(8), bump=0, disableCreatePool=False, index=0,
+            tradeFeeRate=2_500, protocolFeeRate=120_000, fundFeeRate=40_000,
+            createPoolFee=0, protocolOwner=key, fundOwner=key, seq_u64_16=[0] * 16,
+        )
+    )
+
+    def vault(amount: int) -> bytes:
+        return extractor.ACCOUNT_LAYOUT.build(
+            dict(
+                mint=key, owner=key, amount=amount, delegate_option=0, delegate=key,
+                state=1, is_native_option=0, is_native=0, delegated_amount=0,
+                close_authority_option=0, close_authority=key,
+            )
+        )
+
+    return {
+        "pool": pool,
+        "vaultA": vault(reserve_token + 1_500),
+        "vaultB": vault(reserve_sol + 2_700),
+        "config": config,
+    }
+
+
+def exact_replay(snapshot: MarketSnapshot, percent: float, rounds: int, seed: int):
+    """
+    Simulates one ``fixed_fraction(percent)`` schedule and replays the same
+    sells, in the same wallet orders, with exact integer quotes. Returns the
+    largest quote-side reserve difference over all trades.
+    """
+    result = simulate(
+        snapshot, fixed_fraction(percent), runs=1, rounds=rounds, seed=seed, every_trade=True
+    )
+    order_seed, _ = np.random.SeedSequence(seed).spawn(2)
+    order_rng = np.random.default_rng(order_seed)
+    scale = 10**snapshot.decimals
+    holdings = snapshot.holdings.copy()
+    reserve_in, reserve_out = snapshot.reserve_in, snapshot.reserve_out
+    worst, point = 0, 0
+    for _ in range(rounds):
+        amounts = np.floor(holdings / scale * (percent / 100) * scale)
+        order = order_rng.permuted(np.tile(np.arange(len(holdings)), (1, 1)), axis=1)[0]
+        for wallet in order:
+            quote = quote_exact_in(int(amounts[wallet]), reserve_in, reserve_out, snapshot.fees)
+            reserve_in += quote.amount_in - quote.protocol_fee - quote.fund_fee
+            reserve_out -= quote.amount_out
+            point += 1
+            worst = max(worst, abs(reserve_out - int(result.reserves_out[0, point])))
+        holdings -= amounts
+    return worst
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10_000)
+    parser.add_argument("--wallets", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(1)
+    holdings = np.random.default_rng(1).integers(10**9, 10**11, args.wallets)
+    snapshot = MarketSnapshot.from_accounts(
+        MINT, fake_accounts(5 * 10**13, 800 * 10**9), holdings
+    )
+    assert snapshot.fees == CpmmFees(2_500, 120_000, 40_000)
+
+    error = exact_replay(snapshot, 6, args.rounds, seed=1)
+    print(f"{'exact replay':<18} max reserve error {error} lamports")
+
+    sizers = {
+        "uniform 2-10%": uniform_fraction(2, 10),
+        "fixed 6%": fixed_fraction(6),
+        "get_sell_amount": scalar_sizer(get_sell_amount),
+    }
+    for name, sizer in sizers.items():
+        started = time.perf_counter()
+        result = simulate(snapshot, sizer, runs=args.runs, rounds=args.rounds, seed=1)
+        elapsed = time.perf_counter() - started
+        summary = result.summary((50,))
+        print(
+            f"{name:<18} {args.runs / elapsed:9.0f} schedules/s  "
+            f"sol p50 {summary['sol_out'][0] / 10**9:8.3f}  "
+            f"slippage p50 {summary['slippage'][0] * 100:6.3f}%  "
+            f"price {summary['price_change'][0] * 100:7.3f}%"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Cold start time: ``import app`` and the first RPC call, in fresh interpreters.
+
+Starts ``benchmarks.mock_rpc`` and runs ``runs`` new Python processes that
+each import ``app`` and then send one ``getSlot`` through
+``RaydiumClient.client``. Reports the median and best time to each point,
+and with ``--modules`` the slowest imports (``python -X importtime``,
+cumulative) of one more run.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup [--runs 10] [--modules 15]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.bench_e2e import free_port
+
+CHILD = """
+import time
+started = time.perf_counter()
+import asyncio
+import app
+imported = time.perf_counter()
+
+async def first_call():
+    client = app.RaydiumClient.client
+    await client.get_slot()
+    await client.close()
+
+asyncio.run(first_call())
+called = time.perf_counter()
+print(__import__("json").dumps({"import": imported - started, "first_rpc": called - started}))
+"""
+
+
+def slowest_imports(env: dict, count: int) -> list:
+    """(cumulative seconds, module) of the ``count`` slowest top-level imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            imports.append((int(cumulative) / 1e6, name.rstrip()))
+    # Direct imports of app and of utils modules, which is where time can be cut
+    imports = [
+        (seconds, name.strip())
+        for seconds, name in imports
+        if len(name) - len(name.lstrip()) <= 3 or name.strip().startswith("utils.")
+    ]
+    return sorted(imports, reverse=True)[:count]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--modules", type=int, default=0)
+    args = parser.parse_args()
+
+    port = free_port()
+    env = dict(os.environ)
+    env["RPC_NODES"] = f"http://127.0.0.1:{port}"
+    env["WS"] = f"ws://127.0.0.1:{free_port()}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.mock_rpc", "serve", "--port", str(port),
+         "--ws-port", "0"],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        server.stdout.readline()
+        timings = []
+        for _ in range(args.runs):
+            child = subprocess.run(
+                [sys.executable, "-c", CHILD],
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            timings.append(json.loads(child.stdout.splitlines()[-1]))
+        for point in ("import", "first_rpc"):
+            values = [timing[point] for timing in timings]
+            print(
+                f"{point:<10} median {statistics.median(values) * 1000:7.1f}ms  "
+                f"best {min(values) * 1000:7.1f}ms  ({args.runs} runs)"
+            )
+        if args.modules:
+            print("slowest imports (cumulative):")
+            for seconds, name in slowest_imports(env, args.modules):
+                print(f"  {seconds * 1000:7.1f}ms  {name}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Build+sign time per sell: full compile vs precompiled SwapTemplate.
+
+tests/test_templates.py checks that both produce the same bytes.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_swap_build [swaps]
+"""
+import random
+import sys
+import time
+
+from solders.hash import Hash  # type: ignore
+from solders.keypair import Keypair  # type: ignore
+from solders.message import MessageV0  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+from solders.transaction import VersionedTransaction  # type: ignore
+
+from utils.config import TOKEN_PROGRAM_ID, WSOL
+from utils.raydium import RaydiumClient
+from utils.templates import SwapTemplate
+
+
+def fake_pool_keys() -> dict:
+    keys = {
+        name: Pubkey.new_unique()
+        for name in (
+            "configId",
+            "vaultA",
+            "vaultB",
+            "mintA",
+            "observationId",
+        )
+    }
+    keys["mintB"] = Pubkey.from_string(WSOL)
+    keys["mintProgramA"] = keys["mintProgramB"] = TOKEN_PROGRAM_ID
+    return keys
+
+
+def main(count: int = 2_000) -> None:
+    client = RaydiumClient(keys=str(Keypair()))
+    pool_keys = fake_pool_keys()
+    pair = Pubkey.new_unique()
+    token_account = Pubkey.new_unique()
+    amounts = [random.randrange(1, 10**15) for _ in range(count)]
+    blockhashes = [Hash.new_unique() for _ in range(count)]
+
+    started = time.perf_counter()
+    full = []
+    for amount, blockhash in zip(amounts, blockhashes):
+        instructions = client.make_sell_instructions(
+            amount, token_account, pool_keys, pair=pair
+        )
+        message = MessageV0.try_compile(
+            client.keypair.pubkey(), instructions, [], blockhash
+        )
+        full.append(bytes(VersionedTransaction(message, [client.keypair])))
+    full_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    instructions = client.make_sell_instructions(0, token_account, pool_keys, pair=pair)
+    template = SwapTemplate(
+        client.keypair.pubkey(), instructions, len(instructions) - 2
+    )
+    patched = [
+        template.sign(client.keypair, amount, 0, blockhash)
+        for amount, blockhash in zip(amounts, blockhashes)
+    ]
+    template_time = time.perf_counter() - started
+
+    print(f"full compile  {full_time / count * 1e6:>8.1f} us/swap")
+    print(f"template      {template_time / count * 1e6:>8.1f} us/swap")
+    print(f"speedup       x{full_time / template_time:.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000)
@@ -0,0 +1,775 @@
+"""Local mock Solana JSON-RPC + websocket server for offline benchmarks.
+
+Serves account data from a fixture (recorded from a live node with
+``record``, or generated by ``MockChain.synthetic``) and answers the methods
+``SolanaClient``/``RaydiumClient`` use: account reads, balances, blockhashes,
+sends and signature statuses, plus ``accountSubscribe`` over websocket. Sent
+transactions are not executed, except for address lookup table create/extend
+instructions, so tables can be set up against the mock. ``getProgramAccounts``
+supports dataSize/memcmp filters and dataSlice, for pool index scans.
+Every HTTP request can be delayed (``latency`` +/- ``jitter`` seconds) and
+fail with probability ``error_rate`` (HTTP 429/503 or a JSON-RPC error).
+
+Run from the repository root:
+
+    python -m benchmarks.mock_rpc serve [--fixture accounts.json] [--port 8899]
+    python -m benchmarks.mock_rpc record accounts.json <pubkey> [<pubkey> ...]
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import struct
+import time
+from typing import Dict, Iterable, List, Optional
+
+import websockets
+from construct import Bytes
+from solders.address_lookup_table_account import ID as LOOKUP_TABLE_PROGRAM_ID  # type: ignore
+from solders.hash import Hash  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+from solders.signature import Signature  # type: ignore
+from solders.transaction import VersionedTransaction  # type: ignore
+from spl.token.instructions import get_associated_token_address
+
+from utils.config import (
+    OPEN_BOOK_PROGRAM_ID,
+    RAYDIUM_AUTHORITY,
+    RAYDIUM_CPMM,
+    RAYDIUM_LIQUIDITY_POOL,
+    TEST_AMM_KEY,
+    TEST_TOKEN,
+    TOKEN_PROGRAM_ID,
+    WSOL,
+)
+from utils.extractor import (
+    ACCOUNT_LAYOUT,
+    AMM_INFO_LAYOUT_V4_1,
+    CPMM_CONFIG_INFO_LAYOUT,
+    CPMM_POOL_INFO_LAYOUT,
+    MARKET_LAYOUT,
+    OPEN_ORDERS_LAYOUT,
+)
+from utils.metadata import b58decode
+
+SYSTEM_PROGRAM = "11111111111111111111111111111111"
+MAX_RENT_EPOCH = 2**64 - 1
+SLOT_TIME = 0.4
+
+
+class Account:
+    __slots__ = ("lamports", "owner", "data", "executable")
+
+    def __init__(self, lamports: int, owner: str, data: bytes = b"", executable: bool = False):
+        self.lamports = lamports
+        self.owner = str(owner)
+        self.data = data
+        self.executable = executable
+
+    def to_json(self) -> dict:
+        return {
+            "data": [base64.b64encode(self.data).decode(), "base64"],
+            "executable": self.executable,
+            "lamports": self.lamports,
+            "owner": self.owner,
+            "rentEpoch": MAX_RENT_EPOCH,
+            "space": len(self.data),
+        }
+
+
+def token_account_data(mint, owner, amount: int) -> bytes:
+    return ACCOUNT_LAYOUT.build(
+        {
+            "mint": bytes(Pubkey.from_string(str(mint))),
+            "owner": bytes(Pubkey.from_string(str(owner))),
+            "amount": amount,
+            "delegate_option": 0,
+            "delegate": bytes(32),
+            "state": 1,
+            "is_native_option": 0,
+            "is_native": 0,
+            "delegated_amount": 0,
+            "close_authority_option": 0,
+            "close_authority": bytes(32),
+        }
+    )
+
+
+def lookup_table_data(authority: Pubkey, addresses: List[Pubkey], slot: int) -> bytes:
+    """An active address lookup table: 56-byte meta, then the addresses."""
+    meta = struct.pack("<IQQB", 1, 2**64 - 1, slot, 0) + b"\x01" + bytes(authority) + bytes(2)
+    return meta + b"".join(bytes(address) for address in addresses)
+
+
+def _blank(layout) -> dict:
+    """Zero value for every named field of a construct layout."""
+    return {
+        subcon.name: bytes(subcon.sizeof()) if isinstance(subcon.subcon, Bytes) else 0
+        for subcon in layout.subcons
+        if subcon.name
+    }
+
+
+def _is_program_address(seeds: List[bytes], program: Pubkey) -> bool:
+    # create_program_address panics (not an Exception) on an on-curve address,
+    # so derive it by hand
+    digest = hashlib.sha256(b"".join(seeds) + bytes(program) + b"ProgramDerivedAddress")
+    return not Pubkey(digest.digest()).is_on_curve()
+
+
+def mint_data(decimals: int, supply: int = 10**18) -> bytes:
+    # COption<Pubkey> authority, u64 supply, u8 decimals, bool initialized, COption freeze
+    return (
+        bytes(36)
+        + supply.to_bytes(8, "little")
+        + bytes([decimals, 1])
+        + bytes(36)
+    )
+
+
+class MockChain:
+    """Accounts plus the transactions sent against them"""
+
+    def __init__(self, accounts: Optional[Dict[str, Account]] = None, confirm_delay: float = 0.4):
+        self.accounts: Dict[str, Account] = accounts or {}
+        self.confirm_delay = confirm_delay
+        self.started = time.monotonic()
+        self.signatures: Dict[str, float] = {}
+        self.subscribers: List = []
+
+    @property
+    def slot(self) -> int:
+        return 300_000_000 + int((time.monotonic() - self.started) / SLOT_TIME)
+
+    def set_account(self, pubkey, account: Account) -> None:
+        self.accounts[str(pubkey)] = account
+        for notify in self.subscribers:
+            notify(str(pubkey), account)
+
+    def token_accounts(self, owner: str, mint: Optional[str]) -> Iterable[tuple]:
+        owner = bytes(Pubkey.from_string(owner))
+        mint = bytes(Pubkey.from_string(mint)) if mint is not None else None
+        program = str(TOKEN_PROGRAM_ID)
+        size = ACCOUNT_LAYOUT.sizeof()
+        for pubkey, account in self.accounts.items():
+            if account.owner != program or len(account.data) != size:
+                continue
+            if account.data[32:64] != owner:
+                continue
+            if mint is not None and account.data[:32] != mint:
+                continue
+            yield pubkey, account
+
+    def apply(self, raw: bytes) -> None:
+        """Executes the lookup table instructions of a sent transaction; the rest is only recorded."""
+        message = VersionedTransaction.from_bytes(raw).message
+        keys = message.account_keys
+        for instruction in message.instructions:
+            if keys[instruction.program_id_index] != LOOKUP_TABLE_PROGRAM_ID:
+                continue
+            data = bytes(instruction.data)
+            table = str(keys[instruction.accounts[0]])
+            tag = int.from_bytes(data[:4], "little")
+            if tag == 0:
+                authority = keys[instruction.accounts[1]]
+                data = lookup_table_data(authority, [], self.slot)
+                self.set_account(
+                    table, Account(1_000_000, str(LOOKUP_TABLE_PROGRAM_ID), data)
+                )
+            elif tag == 2 and table in self.accounts:
+                account = self.accounts[table]
+                data = account.data + data[12:]
+                # Keep the authority, update last_extended_slot
+                data = data[:12] + struct.pack("<Q", self.slot) + data[20:]
+                self.set_account(table, Account(account.lamports, account.owner, data))
+
+    def add_amm_v4(self, base_mint, reserve_base: int, reserve_quote: int) -> Pubkey:
+        """An AMM v4 pool of ``base_mint``/WSOL with an empty OpenBook market; returns its address."""
+        pool, market, open_orders, target_orders, lp_mint = (
+            Pubkey.new_unique() for _ in range(5)
+        )
+        base_vault, quote_vault, bids, asks, event_queue, request_queue = (
+            Pubkey.new_unique() for _ in range(6)
+        )
+        market_base_vault, market_quote_vault = Pubkey.new_unique(), Pubkey.new_unique()
+        base_mint = Pubkey.from_string(str(base_mint))
+        wsol = Pubkey.from_string(WSOL)
+        openbook = Pubkey.from_string(OPEN_BOOK_PROGRAM_ID)
+        authority = Pubkey.from_string(RAYDIUM_AUTHORITY)
+        # The vault signer nonce must give an off-curve address
+        nonce = next(
+            nonce
+            for nonce in range(256)
+            if _is_program_address([bytes(market), nonce.to_bytes(8, "little")], openbook)
+        )
+        amm = _blank(AMM_INFO_LAYOUT_V4_1)
+        amm.update(
+            status=6,
+            coinDecimals=9,
+            pcDecimals=9,
+            tradeFeeNumerator=25,
+            tradeFeeDenominator=10_000,
+            swapFeeNumerator=25,
+            swapFeeDenominator=10_000,
+            minSeparateDenominator=10_000,
+            pnlDenominator=100,
+            poolCoinTokenAccount=bytes(base_vault),
+            poolPcTokenAccount=bytes(quote_vault),
+            coinMintAddress=bytes(base_mint),
+            pcMintAddress=bytes(wsol),
+            lpMintAddress=bytes(lp_mint),
+            ammOpenOrders=bytes(open_orders),
+            serumMarket=bytes(market),
+            serumProgramId=bytes(openbook),
+            ammTargetOrders=bytes(target_orders),
+        )
+        data = AMM_INFO_LAYOUT_V4_1.build(amm)
+        self.accounts[str(pool)] = Account(
+            10**7, RAYDIUM_LIQUIDITY_POOL, data + bytes(752 - len(data))
+        )
+        fields = _blank(MARKET_LAYOUT)
+        fields.update(
+            own_address=bytes(market),
+            vault_signer_nonce=nonce,
+            base_mint=bytes(base_mint),
+            quote_mint=bytes(wsol),
+            base_vault=bytes(market_base_vault),
+            quote_vault=bytes(market_quote_vault),
+            request_queue=bytes(request_queue),
+            event_queue=bytes(event_queue),
+            bids=bytes(bids),
+            asks=bytes(asks),
+            base_lot_size=1,
+            quote_lot_size=1,
+        )
+        self.accounts[str(market)] = Account(10**7, openbook, MARKET_LAYOUT.build(fields))
+        fields = _blank(OPEN_ORDERS_LAYOUT)
+        fields.update(market=bytes(market), owner=bytes(authority))
+        data = OPEN_ORDERS_LAYOUT.build(fields)
+        self.accounts[str(open_orders)] = Account(
+            10**7, openbook, data + bytes(3228 - len(data))
+        )
+        for vault, vault_mint, amount in (
+            (base_vault, base_mint, reserve_base),
+            (quote_vault, wsol, reserve_quote),
+        ):
+            self.accounts[str(vault)] = Account(
+                2_039_280, TOKEN_PROGRAM_ID, token_account_data(vault_mint, authority, amount)
+            )
+        return pool
+
+    def program_accounts(self, program: str, filters: List[dict]) -> Iterable[tuple]:
+        """Accounts owned by ``program`` that pass getProgramAccounts filters."""
+        for pubkey, account in self.accounts.items():
+            if account.owner != program:
+                continue
+            for check in filters:
+                if "dataSize" in check and len(account.data) != check["dataSize"]:
+                    break
+                memcmp = check.get("memcmp")
+                if memcmp is not None:
+                    if memcmp.get("encoding") == "base64":
+                        expected = base64.b64decode(memcmp["bytes"])
+                    else:
+                        expected = b58decode(memcmp["bytes"])
+                    offset = memcmp["offset"]
+                    if account.data[offset : offset + len(expected)] != expected:
+                        break
+            else:
+                yield pubkey, account
+
+    def decimals(self, mint: str) -> int:
+        account = self.accounts.get(mint)
+        return account.data[44] if account is not None and len(account.data) > 44 else 9
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as file:
+            json.dump(
+                {
+                    pubkey: {
+                        "lamports": account.lamports,
+                        "owner": account.owner,
+                        "data": base64.b64encode(account.data).decode(),
+                        "executable": account.executable,
+                    }
+                    for pubkey, account in self.accounts.items()
+                },
+                file,
+            )
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "MockChain":
+        with open(path) as file:
+            fixture = json.load(file)
+        accounts = {
+            pubkey: Account(
+                entry["lamports"],
+                entry["owner"],
+                base64.b64decode(entry["data"]),
+                entry.get("executable", False),
+            )
+            for pubkey, entry in fixture.items()
+        }
+        return cls(accounts, **kwargs)
+
+    @classmethod
+    def synthetic(
+        cls,
+        owners: Iterable[Pubkey] = (),
+        pool: Pubkey = TEST_AMM_KEY,
+        mint: Pubkey = TEST_TOKEN,
+        token_balance: int = 1_000_000 * 10**9,
+        decimals: int = 9,
+        reserve_sol: int = 500 * 10**9,
+        reserve_token: int = 50_000_000 * 10**9,
+        trade_fee_rate: int = 2500,
+        v4_reserve_sol: int = 0,
+        v4_reserve_token: int = 0,
+        **kwargs,
+    ) -> "MockChain":
+        """
+        A CPMM pool of WSOL/``mint`` plus funded wallets and token accounts.
+        ``mint`` has ``decimals`` decimals, WSOL 9.
+
+        With ``v4_reserve_sol`` an AMM v4 pool of ``mint``/WSOL (and its
+        market and open orders) is added as well.
+        """
+        chain = cls(**kwargs)
+        wsol = Pubkey.from_string(WSOL)
+        config, vault_a, vault_b, mint_lp, observation, authority = (
+            Pubkey.new_unique() for _ in range(6)
+        )
+        # CPMM pools order their mints by address
+        mint_a, mint_b = sorted((wsol, mint), key=bytes)
+        reserve_a, reserve_b = (
+            (reserve_sol, reserve_token) if mint_a == wsol else (reserve_token, reserve_sol)
+        )
+        chain.accounts[str(config)] = Account(
+            10**7,
+            RAYDIUM_CPMM,
+            CPMM_CONFIG_INFO_LAYOUT.build(
+                {
+                    "blob_8": bytes(8),
+                    "bump": 255,
+                    "disableCreatePool": False,
+                    "index": 0,
+                    "tradeFeeRate": trade_fee_rate,
+                    "protocolFeeRate": 120_000,
+                    "fundFeeRate": 40_000,
+                    "createPoolFee": 0,
+                    "protocolOwner": bytes(authority),
+                    "fundOwner": bytes(authority),
+                    "seq_u64_16": [0] * 16,
+                }
+            ),
+        )
+        chain.accounts[str(pool)] = Account(
+            10**7,
+            RAYDIUM_CPMM,
+            CPMM_POOL_INFO_LAYOUT.build(
+                {
+                    "blob_8": bytes(8),
+                    "configId": bytes(config),
+                    "poolCreator": bytes(authority),
+                    "vaultA": bytes(vault_a),
+                    "vaultB": bytes(vault_b),
+                    "mintLp": bytes(mint_lp),
+                    "mintA": bytes(mint_a),
+                    "mintB": bytes(mint_b),
+                    "mintProgramA": bytes(TOKEN_PROGRAM_ID),
+                    "mintProgramB": bytes(TOKEN_PROGRAM_ID),
+                    "observationId": bytes(observation),
+                    "bump": 255,
+                    "status": 0,
+                    "lpDecimals": 9,
+                    "mintDecimalA": 9 if mint_a == wsol else decimals,
+                    "mintDecimalB": 9 if mint_b == wsol else decimals,
+                    "lpAmount": 10**12,
+                    "protocolFeesMintA": 0,
+                    "protocolFeesMintB": 0,
+                    "fundFeesMintA": 0,
+                    "fundFeesMintB": 0,
+                    "openTime": 0,
+                    "seq_u64_32": [0] * 32,
+                }
+            ),
+        )
+        for vault, vault_mint, amount in (
+            (vault_a, mint_a, reserve_a),
+            (vault_b, mint_b, reserve_b),
+        ):
+            chain.accounts[str(vault)] = Account(
+                2_039_280, TOKEN_PROGRAM_ID, token_account_data(vault_mint, authority, amount)
+            )
+        for token_mint in (mint_a, mint_b):
+            chain.accounts[str(token_mint)] = Account(
+                1_461_600, TOKEN_PROGRAM_ID, mint_data(9 if token_mint == wsol else decimals)
+            )
+        if v4_reserve_sol:
+            chain.add_amm_v4(mint, v4_reserve_token, v4_reserve_sol)
+        for owner in owners:
+            chain.accounts[str(owner)] = Account(10**9, SYSTEM_PROGRAM)
+            chain.accounts[str(get_associated_token_address(owner, mint))] = Account(
+                2_039_280, TOKEN_PROGRAM_ID, token_account_data(mint, owner, token_balance)
+            )
+        return chain
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+
+
+class MockRpcServer:
+    """HTTP JSON-RPC and websocket front end of a ``MockChain``"""
+
+    def __init__(
+        self,
+        chain: MockChain,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.chain = chain
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests: Dict[str, int] = {}
+        self.errors = 0
+        self._subscriptions = {}
+        self._servers = []
+        self._writers = set()
+        chain.subscribers.append(self._notify)
+
+    def _context(self, value) -> dict:
+        return {"context": {"apiVersion": "1.18.0", "slot": self.chain.slot}, "value": value}
+
+    def _account(self, pubkey: str) -> Optional[dict]:
+        account = self.chain.accounts.get(pubkey)
+        return account.to_json() if account is not None else None
+
+    def _token_amount(self, account: Account) -> dict:
+        mint = str(Pubkey.from_bytes(account.data[:32]))
+        decimals = self.chain.decimals(mint)
+        amount = int.from_bytes(account.data[64:72], "little")
+        return {
+            "amount": str(amount),
+            "decimals": decimals,
+            "uiAmount": amount / 10**decimals,
+            "uiAmountString": str(amount / 10**decimals),
+        }
+
+    def _parsed_token_account(self, account: Account) -> dict:
+        info = {
+            "isNative": False,
+            "mint": str(Pubkey.from_bytes(account.data[:32])),
+            "owner": str(Pubkey.from_bytes(account.data[32:64])),
+            "state": "initialized",
+            "tokenAmount": self._token_amount(account),
+        }
+        parsed = account.to_json()
+        parsed["data"] = {
+            "parsed": {"info": info, "type": "account"},
+            "program": "spl-token",
+            "space": len(account.data),
+        }
+        return parsed
+
+    def _signature_status(self, signature: str) -> Optional[dict]:
+        sent_at = self.chain.signatures.get(signature)
+        if sent_at is None:
+            return None
+        age = time.monotonic() - sent_at
+        status = "processed"
+        if age >= self.chain.confirm_delay:
+            status = "finalized" if age >= self.chain.confirm_delay * 30 else "confirmed"
+        return {
+            "slot": self.chain.slot,
+            "confirmations": None if status == "finalized" else 1,
+            "err": None,
+            "status": {"Ok": None},
+            "confirmationStatus": status,
+        }
+
+    def call(self, method: str, params: list):
+        chain = self.chain
+        if method in ("getAccountInfo",):
+            return self._context(self._account(params[0]))
+        if method == "getMultipleAccounts":
+            return self._context([self._account(pubkey) for pubkey in params[0]])
+        if method == "getBalance":
+            account = chain.accounts.get(params[0])
+            return self._context(account.lamports if account else 0)
+        if method == "getTokenAccountBalance":
+            account = chain.accounts.get(params[0])
+            if account is None:
+                raise RpcError(-32602, "Invalid param: could not find account")
+            return self._context(self._token_amount(account))
+        if method == "getTokenAccountsByOwner":
+            mint = params[1].get("mint")
+            options = params[2] if len(params) > 2 else {}
+            parsed = options.get("encoding") == "jsonParsed"
+            return self._context(
+                [
+                    {
+                        "pubkey": pubkey,
+                        "account": self._parsed_token_account(account)
+                        if parsed
+                        else account.to_json(),
+                    }
+                    for pubkey, account in chain.token_accounts(params[0], mint)
+                ]
+            )
+        if method == "getProgramAccounts":
+            options = params[1] if len(params) > 1 else {}
+            data_slice = options.get("dataSlice")
+            accounts = []
+            for pubkey, account in chain.program_accounts(
+                params[0], options.get("filters", [])
+            ):
+                account = account.to_json()
+                if data_slice is not None:
+                    data = base64.b64decode(account["data"][0])
+                    start = data_slice["offset"]
+                    data = data[start : start + data_slice["length"]]
+                    account["data"] = [base64.b64encode(data).decode(), "base64"]
+                accounts.append({"pubkey": pubkey, "account": account})
+            return self._context(accounts) if options.get("withContext") else accounts
+        if method == "getLatestBlockhash":
+            slot = chain.slot
+            blockhash = Hash(hashlib.sha256(slot.to_bytes(8, "little")).digest())
+            return self._context(
+                {"blockhash": str(blockhash), "lastValidBlockHeight": slot + 150}
+            )
+        if method == "sendTransaction":
+            raw = base64.b64decode(params[0])
+            # Compact-u16 signature count, then the fee payer's signature
+            signature = str(Signature.from_bytes(raw[1:65]))
+            if signature not in chain.signatures:
+                chain.apply(raw)
+            chain.signatures.setdefault(signature, time.monotonic())
+            return signature
+        if method == "getSignatureStatuses":
+            return self._context([self._signature_status(sig) for sig in params[0]])
+        if method == "getRecentPrioritizationFees":
+            slot = chain.slot
+            return [
+                {
+                    "slot": slot - age,
+                    "prioritizationFee": int(self.random.lognormvariate(11, 1.5)),
+                }
+                for age in range(150)
+            ]
+        if method == "simulateTransaction":
+            return self._context(
+                {
+                    "err": None,
+                    "logs": [],
+                    "accounts": None,
+                    "unitsConsumed": self.random.randrange(40_000, 60_000),
+                    "returnData": None,
+                }
+            )
+        if method in ("getSlot", "getBlockHeight"):
+            return chain.slot
+        if method == "getHealth":
+            return "ok"
+        raise RpcError(-32601, f"Method not found: {method}")
+
+    def _reply(self, request: dict) -> dict:
+        method = request.get("method", "")
+        self.requests[method] = self.requests.get(method, 0) + 1
+        reply = {"jsonrpc": "2.0", "id": request.get("id")}
+        try:
+            reply["result"] = self.call(method, request.get("params") or [])
+        except RpcError as e:
+            reply["error"] = {"code": e.code, "message": str(e)}
+        return reply
+
+    async def _respond(self, body: bytes):
+        """(status, payload) for one HTTP POST body"""
+        delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.errors += 1
+            kind = self.random.randrange(3)
+            if kind == 0:
+                return 429, b'{"error":"Too many requests"}'
+            if kind == 1:
+                return 503, b'{"error":"Service unavailable"}'
+            request = json.loads(body)
+            request = request[0] if isinstance(request, list) else request
+            error = {
+                "code": -32005,
+                "message": "Node is behind by 42 slots",
+                "data": {"numSlotsBehind": 42},
+            }
+            return 200, json.dumps(
+                {"jsonrpc": "2.0", "id": request.get("id"), "error": error}
+            ).encode()
+        request = json.loads(body)
+        if isinstance(request, list):
+            return 200, json.dumps([self._reply(item) for item in request]).encode()
+        return 200, json.dumps(self._reply(request)).encode()
+
+    async def _handle_http(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._writers.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = (await reader.readline()).decode("latin-1").strip()
+                    if not line:
+                        break
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                if request_line.startswith(b"GET"):
+                    status, payload = 200, b"ok"
+                else:
+                    status, payload = await self._respond(body)
+                writer.write(
+                    b"HTTP/1.1 %d %s\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: %d\r\n\r\n"
+                    % (status, b"OK" if status == 200 else b"Error", len(payload))
+                    + payload
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Client went away, or the server is shutting down
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    def _notify(self, pubkey: str, account: Account) -> None:
+        for (websocket, subscription), watched in list(self._subscriptions.items()):
+            if watched != pubkey:
+                continue
+            message = {
+                "jsonrpc": "2.0",
+                "method": "accountNotification",
+                "params": {
+                    "result": self._context(account.to_json()),
+                    "subscription": subscription,
+                },
+            }
+            asyncio.ensure_future(websocket.send(json.dumps(message)))
+
+    async def _handle_ws(self, websocket, path=None) -> None:
+        subscriptions = 0
+        try:
+            async for raw in websocket:
+                request = json.loads(raw)
+                method = request.get("method")
+                if method == "accountSubscribe":
+                    subscriptions += 1
+                    self._subscriptions[(websocket, subscriptions)] = request["params"][0]
+                    result = subscriptions
+                elif method == "accountUnsubscribe":
+                    result = self._subscriptions.pop((websocket, request["params"][0]), None) is not None
+                else:
+                    await websocket.send(json.dumps(self._reply(request)))
+                    continue
+                await websocket.send(
+                    json.dumps({"jsonrpc": "2.0", "result": result, "id": request.get("id")})
+                )
+        finally:
+            for key in [key for key in self._subscriptions if key[0] is websocket]:
+                del self._subscriptions[key]
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0, ws_port: Optional[int] = 0):
+        """Starts listening; returns the (http_url, ws_url) actually bound."""
+        http = await asyncio.start_server(self._handle_http, host, port)
+        self._servers.append(http)
+        http_url = f"http://{host}:{http.sockets[0].getsockname()[1]}"
+        ws_url = None
+        if ws_port is not None:
+            ws = await websockets.serve(self._handle_ws, host, ws_port)
+            self._servers.append(ws)
+            ws_url = f"ws://{host}:{list(ws.sockets)[0].getsockname()[1]}"
+        return http_url, ws_url
+
+    async def close(self) -> None:
+        # Keep-alive connections would otherwise outlive the listening socket
+        for writer in list(self._writers):
+            writer.close()
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+
+
+async def record(rpc_url: str, pubkeys: List[str], path: str) -> None:
+    """Saves the current state of ``pubkeys`` from a live RPC node as a fixture."""
+    from solana.rpc.async_api import AsyncClient
+
+    async with AsyncClient(rpc_url) as client:
+        response = await client.get_multiple_accounts(
+            [Pubkey.from_string(pubkey) for pubkey in pubkeys]
+        )
+    chain = MockChain()
+    for pubkey, account in zip(pubkeys, response.value):
+        if account is not None:
+            chain.accounts[pubkey] = Account(
+                account.lamports, account.owner, bytes(account.data), account.executable
+            )
+    chain.save(path)
+    print(f"Recorded {len(chain.accounts)} of {len(pubkeys)} accounts to {path}")
+
+
+async def serve(args) -> None:
+    if args.fixture:
+        chain = MockChain.load(args.fixture, confirm_delay=args.confirm_delay)
+    else:
+        chain = MockChain.synthetic(confirm_delay=args.confirm_delay)
+    server = MockRpcServer(chain, args.latency, args.jitter, args.error_rate, args.seed)
+    http_url, ws_url = await server.start(args.host, args.port, args.ws_port)
+    print(f"Mock RPC on {http_url}, websocket on {ws_url}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve")
+    serve_parser.add_argument("--fixture")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8899)
+    serve_parser.add_argument("--ws-port", type=int, default=8900)
+    serve_parser.add_argument("--latency", type=float, default=0.0)
+    serve_parser.add_argument("--jitter", type=float, default=0.0)
+    serve_parser.add_argument("--error-rate", type=float, default=0.0)
+    serve_parser.add_argument("--confirm-delay", type=float, default=0.4)
+    serve_parser.add_argument("--seed", type=int)
+    record_parser = commands.add_parser("record")
+    record_parser.add_argument("path")
+    record_parser.add_argument("pubkeys", nargs="+")
+    record_parser.add_argument("--rpc", default=None)
+    args = parser.parse_args()
+    if args.command == "record":
+        from utils.config import RPC_NODES
+
+        rpc_url = args.rpc or (RPC_NODES[0] if RPC_NODES else "http://localhost:8899")
+        asyncio.run(record(rpc_url, args.pubkeys, args.path))
+    else:
+        try:
+            asyncio.run(serve(args))
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
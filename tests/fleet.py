@@ -0,0 +1,63 @@
+"""``RaydiumClient`` pointed at an in-process ``benchmarks.mock_rpc`` server."""
+from typing import Optional
+from unittest import mock
+
+from benchmarks.mock_rpc import MockChain, MockRpcServer
+from utils.ammv4 import AmmV4Pools
+from utils.blockhash import BlockhashProvider
+from utils.cache import PoolCache
+from utils.fees import FeeOracle
+from utils.journal import TradeJournal
+from utils.lookup import LookupTableManager
+from utils.pools import PoolRegistry
+from utils.raydium import RaydiumClient
+from utils.signing import Signer
+from utils.submit import TransactionSubmitter
+from utils.templates import TemplateCache
+from utils.transport import make_client
+from utils.wsol import WsolAccounts
+
+
+class MockFleet:
+    """
+    Starts a MockRpcServer for ``chain`` and swaps every shared service of
+    ``RaydiumClient`` for one that talks to it, until ``close``.
+    """
+
+    def __init__(self, chain: MockChain, journal: str = "", **server_options) -> None:
+        self.chain = chain
+        self.journal = journal
+        self.server = MockRpcServer(chain, **server_options)
+        self.ws_url: Optional[str] = None
+        self._patch = None
+
+    async def start(self) -> "MockFleet":
+        http_url, self.ws_url = await self.server.start()
+        client = make_client([http_url], budget=None, health_interval=0)
+        pool_cache = PoolCache()
+        blockhash = BlockhashProvider(client, on_slot=pool_cache.observe_slot)
+        self._patch = mock.patch.multiple(
+            RaydiumClient,
+            client=client,
+            pool_cache=pool_cache,
+            blockhash=blockhash,
+            submitter=TransactionSubmitter(client, blockhash, poll_interval=0.05),
+            fees=FeeOracle(client),
+            lookup_tables=LookupTableManager(client, path=""),
+            pools=PoolRegistry(client, path=""),
+            signer=Signer(workers=0),
+            journal=TradeJournal(self.journal),
+            amm_configs={},
+            templates=TemplateCache(),
+            wsol=WsolAccounts(),
+            amm_v4=AmmV4Pools(client),
+        )
+        self._patch.start()
+        return self
+
+    async def close(self) -> None:
+        await RaydiumClient.blockhash.stop()
+        await RaydiumClient.journal.close()
+        await RaydiumClient.client.close()
+        self._patch.stop()
+        await self.server.close()
@@ -0,0 +1,89 @@
+"""Local stub servers for transport and watcher tests."""
+import asyncio
+import json
+from typing import Dict, List, Optional
+
+from solders.signature import Signature  # type: ignore
+
+RESULTS = {
+    "getSlot": 1,
+    "getBlockHeight": 1,
+    "sendTransaction": str(Signature.default()),
+}
+
+
+class StubRpcServer:
+    """
+    JSON-RPC over HTTP/1.1 on 127.0.0.1 with scriptable behaviour.
+
+    ``delay`` holds every RPC reply back, ``status`` other than 200 fails it,
+    and ``healthy`` decides what ``GET /health`` answers. The JSON-RPC methods
+    received are recorded in ``requests``.
+    """
+
+    def __init__(self) -> None:
+        self.delay = 0.0
+        self.status = 200
+        self.healthy = True
+        self.requests: List[str] = []
+        self.url: Optional[str] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: List[asyncio.StreamWriter] = []
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self.url
+
+    async def close(self) -> None:
+        self._server.close()
+        for writer in self._writers:
+            writer.close()
+        await self._server.wait_closed()
+
+    def _reply(self, body: bytes) -> bytes:
+        calls = json.loads(body)
+        batch = isinstance(calls, list)
+        replies = []
+        for call in calls if batch else [calls]:
+            self.requests.append(call["method"])
+            replies.append(
+                {"jsonrpc": "2.0", "id": call["id"], "result": RESULTS.get(call["method"])}
+            )
+        return json.dumps(replies if batch else replies[0]).encode()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._writers.append(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                _, path, _ = request_line.decode().split(" ", 2)
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b""):
+                        break
+                    name, value = line.decode().split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                if path == "/health":
+                    status, payload = (200, b"ok") if self.healthy else (503, b"behind")
+                else:
+                    payload = self._reply(body)
+                    await asyncio.sleep(self.delay)
+                    status = self.status
+                    if status != 200:
+                        payload = b"error"
+                writer.write(
+                    f"HTTP/1.1 {status} Stub\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n\r\n".encode()
+                    + payload
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
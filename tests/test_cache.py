@@ -0,0 +1,151 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from solders.keypair import Keypair  # type: ignore
+
+from benchmarks.mock_rpc import TEST_AMM_KEY, MockChain, MockRpcServer
+from utils.blockchain import SolanaClient
+from utils.blockhash import BlockhashProvider
+from utils.cache import POOL_KEY_FIELDS, POOL_STATE_FIELDS, PoolCache
+from utils.transport import make_client
+
+
+class Client(SolanaClient):
+    """SolanaClient with its own shared services, pointed at the mock server"""
+
+
+def pool(n: int) -> dict:
+    return {field: n for field in POOL_KEY_FIELDS + POOL_STATE_FIELDS}
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class PoolCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch("utils.cache.time")
+        patcher.start().monotonic = self.clock
+        self.addCleanup(patcher.stop)
+        self.cache = PoolCache(maxsize=3, ttl=10, max_slot_age=25)
+
+    def test_evicts_the_least_recently_used_pool(self):
+        for n in range(3):
+            self.cache.put(f"pool{n}", pool(n), slot=100)
+        # Touching pool0 makes pool1 the oldest
+        self.assertIsNotNone(self.cache.get("pool0"))
+        self.cache.put("pool3", pool(3), slot=100)
+        self.assertEqual(len(self.cache), 3)
+        self.assertNotIn("pool1", self.cache)
+        self.assertIn("pool0", self.cache)
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_state_expires_after_the_ttl_but_keys_do_not(self):
+        self.cache.put("pool", pool(1), slot=100)
+        self.clock.now += 10
+        self.assertEqual(self.cache.get("pool")["lpAmount"], 1)
+        self.clock.now += 0.1
+        self.assertIsNone(self.cache.get("pool"))
+        self.assertEqual(self.cache.keys("pool")["vaultA"], 1)
+
+    def test_state_expires_once_the_chain_moves_on(self):
+        self.cache.put("pool", pool(1), slot=100)
+        self.cache.observe_slot(125)
+        self.assertIsNotNone(self.cache.get("pool"))
+        self.cache.observe_slot(126)
+        self.assertIsNone(self.cache.get("pool"))
+        # An older slot never moves the cache back
+        self.cache.observe_slot(90)
+        self.assertEqual(self.cache.latest_slot, 126)
+
+    def test_a_put_refreshes_the_state(self):
+        self.cache.put("pool", pool(1), slot=100)
+        self.clock.now += 20
+        self.cache.put("pool", {**pool(1), "lpAmount": 2}, slot=130)
+        self.assertEqual(self.cache.get("pool")["lpAmount"], 2)
+
+    def test_invalidate(self):
+        self.cache.put("pool0", pool(0))
+        self.cache.put("pool1", pool(1))
+        self.cache.invalidate("pool0")
+        self.assertIsNone(self.cache.keys("pool0"))
+        self.assertIsNotNone(self.cache.keys("pool1"))
+        self.cache.invalidate()
+        self.assertEqual(len(self.cache), 0)
+
+    def test_counts_hits_but_leaves_misses_to_the_reader(self):
+        self.assertIsNone(self.cache.get("pool"))
+        self.assertIsNone(self.cache.keys("pool"))
+        self.cache.put("pool", pool(1))
+        self.cache.get("pool")
+        self.cache.keys("pool")
+        self.assertEqual(
+            self.cache.stats(), {"size": 1, "hits": 2, "misses": 0, "evictions": 0}
+        )
+
+
+class PoolInfoTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.chain = MockChain.synthetic()
+        self.server = MockRpcServer(self.chain, latency=0.05)
+        http_url, _ = await self.server.start(ws_port=None)
+        Client.client = make_client([http_url], budget=None, health_interval=0)
+        Client.pool_cache = PoolCache()
+        self.clients = [Client(keypair=Keypair()) for _ in range(20)]
+
+    async def asyncTearDown(self):
+        await Client.client.close()
+        await self.server.close()
+
+    async def test_concurrent_misses_share_one_read(self):
+        pools = await asyncio.gather(
+            *(client.pool_info(TEST_AMM_KEY) for client in self.clients)
+        )
+        self.assertEqual(self.server.requests.get("getAccountInfo"), 1)
+        self.assertTrue(all(pool == pools[0] for pool in pools))
+        self.assertEqual(Client.pool_cache.fetching, {})
+
+        await self.clients[0].pool_info(TEST_AMM_KEY)
+        self.assertEqual(self.server.requests.get("getAccountInfo"), 1)
+        self.assertEqual(Client.pool_cache.misses, 1)
+
+    async def test_registry_keys_are_not_a_miss(self):
+        keys = await self.clients[0].pool_keys(TEST_AMM_KEY)
+        self.assertEqual(Client.pool_cache.misses, 1)
+        with mock.patch.object(Client.pools, "keys", return_value=keys):
+            Client.pool_cache.invalidate()
+            await self.clients[0].pool_keys(TEST_AMM_KEY)
+        self.assertEqual(Client.pool_cache.misses, 1)
+        self.assertEqual(self.server.requests.get("getAccountInfo"), 1)
+
+    async def test_the_blockhash_prefetcher_ages_cached_state(self):
+        await self.clients[0].pool_info(TEST_AMM_KEY)
+        cached_at = Client.pool_cache.latest_slot
+        blockhash = BlockhashProvider(Client.client, on_slot=Client.pool_cache.observe_slot)
+        # The mock chain's slot follows the clock
+        self.chain.started -= 60
+        await blockhash.refresh()
+        self.assertGreater(
+            Client.pool_cache.latest_slot, cached_at + Client.pool_cache.max_slot_age
+        )
+        await self.clients[0].pool_info(TEST_AMM_KEY)
+        self.assertEqual(self.server.requests.get("getAccountInfo"), 2)
+
+    async def test_a_failed_read_is_not_shared_afterwards(self):
+        await self.server.close()
+        results = await asyncio.gather(
+            *(client.pool_info(TEST_AMM_KEY) for client in self.clients[:5]),
+            return_exceptions=True,
+        )
+        self.assertTrue(all(isinstance(result, Exception) for result in results))
+        self.assertEqual(Client.pool_cache.fetching, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from solders.keypair import Keypair  # type: ignore
+
+from benchmarks.mock_rpc import MockChain
+from tests.fleet import MockFleet
+from utils.config import TEST_AMM_KEY, TEST_TOKEN
+from utils.engine import SellEngine
+from utils.raydium import RaydiumClient
+from utils.submit import SubmitResult
+
+
+class SellEngineTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.keypairs = [Keypair() for _ in range(4)]
+        chain = MockChain.synthetic(
+            [keypair.pubkey() for keypair in self.keypairs], confirm_delay=0
+        )
+        self.fleet = await MockFleet(chain).start()
+        self.engine = SellEngine(
+            [str(keypair) for keypair in self.keypairs],
+            TEST_AMM_KEY,
+            TEST_TOKEN,
+            lambda holding: holding * 0.05,
+        )
+        self.quoted = []
+        quote_sell = RaydiumClient.quote_sell
+
+        async def record(client, pair, amount_in, mint, reserves=None, kind="cpmm"):
+            quote = await quote_sell(client, pair, amount_in, mint, reserves, kind)
+            self.quoted.append((reserves, quote))
+            return quote
+
+        patcher = mock.patch.object(RaydiumClient, "quote_sell", record)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await self.engine.close()
+        await self.fleet.close()
+
+    async def test_quotes_from_the_watcher_on_a_fixed_pool(self):
+        await self.engine.watch(self.fleet.ws_url)
+        while not self.engine.watcher.connected:
+            await asyncio.sleep(0.01)
+        results = await self.engine.run()
+        self.assertTrue(all(result.ok for result in results), results)
+        self.assertEqual(len(self.quoted), len(self.keypairs))
+        for reserves, quote in self.quoted:
+            self.assertIsNotNone(reserves)
+            self.assertGreater(quote.min_amount_out(100), 0)
+
+    async def test_reads_the_pool_without_a_watcher(self):
+        results = await self.engine.run()
+        self.assertTrue(all(result.ok for result in results), results)
+        self.assertEqual(len(self.quoted), len(self.keypairs))
+        self.assertTrue(all(reserves is None for reserves, _ in self.quoted))
+
+    async def test_a_retry_requotes_from_a_fresh_read(self):
+        await self.engine.watch(self.fleet.ws_url)
+        reserves = self.engine.watcher.reserves
+        confirm = RaydiumClient.submitter.confirm
+        expired = []
+
+        async def expire_first(signature):
+            result = await confirm(signature)
+            if not expired:
+                expired.append(signature)
+                return result._replace(status="expired")
+            return result
+
+        client = self.engine.clients[0]
+        with mock.patch.object(RaydiumClient.submitter, "confirm", expire_first):
+            result = await client.make_sell_swap(
+                TEST_AMM_KEY, 10**9, TEST_TOKEN, reserves=reserves
+            )
+        self.assertIsInstance(result, SubmitResult)
+        self.assertEqual([quoted for quoted, _ in self.quoted], [reserves, None])
+
+
+class SellSizingTest(unittest.IsolatedAsyncioTestCase):
+    holding = 1_000_000 * 10**6 + 7
+    # 5% of the holding in tokens, truncated to raw units
+    expected = int(holding / 10**6 * 0.05 * 10**6)
+
+    async def asyncSetUp(self):
+        self.keypairs = [Keypair() for _ in range(2)]
+        chain = MockChain.synthetic(
+            [keypair.pubkey() for keypair in self.keypairs],
+            token_balance=self.holding,
+            decimals=6,
+            confirm_delay=0,
+        )
+        self.fleet = await MockFleet(chain).start()
+        self.engine = SellEngine(
+            [str(keypair) for keypair in self.keypairs],
+            TEST_AMM_KEY,
+            TEST_TOKEN,
+            lambda holding: holding * 0.05,
+        )
+
+    async def asyncTearDown(self):
+        await self.engine.close()
+        await self.fleet.close()
+
+    async def test_sizes_in_the_mints_decimals(self):
+        results = await self.engine.run()
+        self.assertTrue(all(result.ok for result in results), results)
+        self.assertEqual([result.amount for result in results], [self.expected] * 2)
+
+    async def test_sizes_from_the_balance_snapshot(self):
+        await self.engine.refresh_balances()
+        self.assertEqual(len(self.engine.balances), 2)
+        results = await self.engine.run()
+        self.assertTrue(all(result.ok for result in results), results)
+        self.assertEqual([result.amount for result in results], [self.expected] * 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import random
+import unittest
+
+from solders.pubkey import Pubkey  # type: ignore
+
+from benchmarks.bench_layouts import LAYOUTS
+
+
+def parsed(layout, data: bytes) -> dict:
+    return {k: v for k, v in layout.parse(data).items() if k != "_io"}
+
+
+class FastLayoutTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(5)
+
+    def buffers(self, layout, count: int = 100):
+        return [self.rng.randbytes(layout.sizeof()) for _ in range(count)]
+
+    def test_decode_matches_construct(self):
+        for name, layout, fast in LAYOUTS:
+            with self.subTest(name):
+                self.assertEqual(fast.size, layout.sizeof())
+                buffers = self.buffers(layout)
+                for data, record in zip(buffers, fast.decode_many(buffers)):
+                    self.assertEqual(record.to_dict(), parsed(layout, data))
+
+    def test_decode_at_an_offset_and_from_longer_buffers(self):
+        for name, layout, fast in LAYOUTS:
+            with self.subTest(name):
+                data = self.rng.randbytes(7 + layout.sizeof() + 13)
+                record = fast.decode(data, 7)
+                self.assertEqual(
+                    record.to_dict(), parsed(layout, data[7 : 7 + layout.sizeof()])
+                )
+
+    def test_decode_packed_matches_construct(self):
+        for name, layout, fast in LAYOUTS:
+            with self.subTest(name):
+                buffers = self.buffers(layout, 10)
+                records = fast.decode_packed(b"".join(buffers))
+                self.assertEqual(
+                    [record.to_dict() for record in records],
+                    [parsed(layout, data) for data in buffers],
+                )
+
+    def test_read_matches_construct(self):
+        for name, layout, fast in LAYOUTS:
+            with self.subTest(name):
+                [data] = self.buffers(layout, 1)
+                for field, value in parsed(layout, data).items():
+                    self.assertEqual(fast.read(field, data), value, field)
+                    self.assertEqual(fast.read(field, b"\0" * 3 + data, 3), value, field)
+
+    def test_pubkey(self):
+        for name, layout, fast in LAYOUTS:
+            with self.subTest(name):
+                [data] = self.buffers(layout, 1)
+                expected = parsed(layout, data)
+                record = fast.decode(data)
+                for field, value in expected.items():
+                    if isinstance(value, bytes) and len(value) == 32:
+                        self.assertEqual(record.pubkey(field), Pubkey.from_bytes(value))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import asyncio
+import base64
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price  # type: ignore
+from solders.instruction import AccountMeta, Instruction  # type: ignore
+from solders.message import from_bytes_versioned  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+
+from utils.extractor import SWAP_LAYOUT
+from utils.fees import MAX_COMPUTE_UNITS, FeeOracle
+from utils.templates import SwapTemplate
+
+
+class StubTransport:
+    """Answers ``request_json`` from ``results`` (method -> result) and records the calls."""
+
+    def __init__(self, **results) -> None:
+        self.results = results
+        self.calls = []
+
+    async def request_json(self, method, params=None):
+        self.calls.append((method, params))
+        await asyncio.sleep(0)
+        result = self.results[method]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def fees(*values):
+    return [{"slot": slot, "prioritizationFee": fee} for slot, fee in enumerate(values)]
+
+
+def swap_template(unit_limit: int = 200_000) -> SwapTemplate:
+    payer = Pubkey.new_unique()
+    swap = Instruction(
+        Pubkey.new_unique(),
+        SWAP_LAYOUT.build(dict(amountInMax=0, amountOut=0)),
+        [AccountMeta(payer, is_signer=True, is_writable=True)],
+    )
+    return SwapTemplate(
+        payer, [set_compute_unit_limit(unit_limit), set_compute_unit_price(1_000), swap], 2
+    )
+
+
+def unit_limit(message) -> int:
+    return int.from_bytes(bytes(message.instructions[0].data)[1:], "little")
+
+
+class FeeOracleTest(unittest.IsolatedAsyncioTestCase):
+    def oracle(self, transport: StubTransport, **options) -> FeeOracle:
+        options = {"ttl": 10, "min_price": 100, "max_price": 50_000, **options}
+        return FeeOracle(SimpleNamespace(transport=transport), **options)
+
+    async def test_prices_at_the_landing_percentile(self):
+        transport = StubTransport(
+            getRecentPrioritizationFees=fees(*(1_000 * n for n in range(10, 0, -1)))
+        )
+        oracle = self.oracle(transport)
+        # The smallest sample at or above the percentile
+        self.assertEqual(await oracle.price(["pool"], probability=0.5), 6_000)
+        self.assertEqual(await oracle.price(["pool"], probability=0.9), 10_000)
+        self.assertEqual(await oracle.price(["pool"], probability=0.0), 1_000)
+
+    async def test_clamps_to_the_configured_bounds(self):
+        transport = StubTransport(getRecentPrioritizationFees=fees(0, 0, 10))
+        self.assertEqual(await self.oracle(transport).price(["pool"], 0.5), 100)
+        transport = StubTransport(getRecentPrioritizationFees=fees(10**9))
+        self.assertEqual(await self.oracle(transport).price(["pool"], 0.5), 50_000)
+        transport = StubTransport(getRecentPrioritizationFees=[])
+        self.assertEqual(await self.oracle(transport).price(["pool"]), 100)
+        transport = StubTransport(getRecentPrioritizationFees=RuntimeError("down"))
+        self.assertEqual(await self.oracle(transport).price(["pool"]), 50_000)
+
+    async def test_caches_samples_per_account_set(self):
+        transport = StubTransport(getRecentPrioritizationFees=fees(1_000, 2_000))
+        oracle = self.oracle(transport)
+        with mock.patch("utils.fees.time", SimpleNamespace(monotonic=lambda: 100.0)):
+            await asyncio.gather(*(oracle.price(["b", "a"]) for _ in range(5)))
+            await oracle.price(["a", "b", "a"])
+        self.assertEqual(transport.calls, [("getRecentPrioritizationFees", [["a", "b"]])])
+        with mock.patch("utils.fees.time", SimpleNamespace(monotonic=lambda: 109.9)):
+            await oracle.price(["a", "b"])
+        self.assertEqual(len(transport.calls), 1)
+        with mock.patch("utils.fees.time", SimpleNamespace(monotonic=lambda: 110.0)):
+            await oracle.price(["a", "b"])
+            await oracle.price(["c"])
+        self.assertEqual(len(transport.calls), 3)
+
+    def test_step_up(self):
+        oracle = self.oracle(StubTransport(), step_multiplier=2)
+        self.assertEqual(
+            [oracle.step_up(10_000, attempt) for attempt in range(4)],
+            [10_000, 20_000, 40_000, 50_000],
+        )
+
+    async def test_compute_limit_simulates_once(self):
+        transport = StubTransport(
+            simulateTransaction={"value": {"err": None, "unitsConsumed": 50_000}}
+        )
+        oracle = self.oracle(transport, cu_margin=0.5)
+        template = swap_template()
+        self.assertEqual(await oracle.compute_limit(template, 10**9), 75_000)
+        self.assertEqual(await oracle.compute_limit(template, 5 * 10**9), 75_000)
+        self.assertTrue(template.sized)
+        self.assertEqual(oracle.simulations, 1)
+        [(method, params)] = transport.calls
+        self.assertEqual(method, "simulateTransaction")
+        # Simulated at the maximum limit, rendered afterwards with the sized one
+        simulated = from_bytes_versioned(base64.b64decode(params[0])[65:])
+        self.assertEqual(unit_limit(simulated), MAX_COMPUTE_UNITS)
+        rendered = from_bytes_versioned(template.render(10**9, 0, simulated.recent_blockhash))
+        self.assertEqual(unit_limit(rendered), 75_000)
+
+    async def test_compute_limit_keeps_the_built_in_limit_on_failure(self):
+        transport = StubTransport(
+            simulateTransaction={"value": {"err": {"InstructionError": [2, "Custom"]}}}
+        )
+        oracle = self.oracle(transport)
+        template = swap_template(unit_limit=300_000)
+        self.assertEqual(await oracle.compute_limit(template, 10**9), 300_000)
+        self.assertEqual(await oracle.compute_limit(template, 10**9), 300_000)
+        self.assertEqual(len(transport.calls), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from solders.keypair import Keypair  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+from solders.signature import Signature  # type: ignore
+
+from utils.journal import TradeEntry, TradeJournal, TradeJournalReader
+from utils.raydium import RaydiumClient
+from utils.submit import SubmitResult
+
+
+def confirmed(slot: int = 1) -> SubmitResult:
+    return SubmitResult(Signature.default(), "confirmed", 0.0, 0.0, 0.0, slot, 1)
+
+
+class JournalTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        file = tempfile.NamedTemporaryFile(suffix=".journal", delete=False)
+        file.close()
+        os.unlink(file.name)
+        self.path = file.name
+        self.journal = TradeJournal(self.path)
+
+    async def asyncTearDown(self):
+        await self.journal.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def test_daily_counts_tokens_by_mint_decimals(self):
+        for amount, decimals in ((2_500_000, 6), (3 * 10**9, 9)):
+            entry = TradeEntry(0, Pubkey.new_unique(), Pubkey.new_unique(), amount, 0.0)
+            entry.decimals = decimals
+            self.journal.record(entry, 0, confirmed())
+        await self.journal.close()
+        daily = TradeJournalReader(self.path).daily()
+        self.assertAlmostEqual(daily["tokens_sold"][0], 5.5)
+
+    async def test_daily_pnl_leaves_out_unquoted_sells(self):
+        def entry(quoted_out=None):
+            entry = TradeEntry(0, Pubkey.new_unique(), Pubkey.new_unique(), 1_000, 0.0)
+            entry.unit_price, entry.unit_limit = 1_000_000, 10_000
+            if quoted_out is not None:
+                entry.quoted_at, entry.quoted_out = 1.0, quoted_out
+            return entry
+
+        self.journal.record(entry(2_000_000), 0, confirmed())
+        # Landed but failed: paid its fee, received nothing
+        failed = confirmed()._replace(status="failed")
+        self.journal.record(entry(1_000_000), 0, failed)
+        self.journal.record(entry(), 0, confirmed())
+        await self.journal.close()
+        daily = TradeJournalReader(self.path).daily()
+        fee = 5_000 + 10_000
+        self.assertEqual(daily["confirmed"][0], 2)
+        self.assertEqual(daily["unquoted"][0], 1)
+        self.assertEqual(daily["quoted_out"][0], 2_000_000)
+        self.assertEqual(daily["fees"][0], 3 * fee)
+        self.assertEqual(daily["quoted_pnl"][0], 2_000_000 - 2 * fee)
+
+    async def test_an_error_after_a_journaled_attempt_adds_no_record(self):
+        class Client(RaydiumClient):
+            async def _sell_swap(self, entry, *args):
+                self.journal.record(entry, 0, confirmed())
+                entry.journaled = True
+                raise RuntimeError("second attempt failed")
+
+        class Failing(RaydiumClient):
+            async def _sell_swap(self, entry, *args):
+                raise RuntimeError("no pool")
+
+        for cls in (Client, Failing):
+            cls.journal = self.journal
+            with self.assertRaises(RuntimeError):
+                await cls(keypair=Keypair()).make_sell_swap(
+                    Pubkey.new_unique(), 1_000, str(Pubkey.new_unique())
+                )
+        await self.journal.close()
+        reader = TradeJournalReader(self.path)
+        self.assertEqual(len(reader), 2)
+        self.assertEqual(int(reader.status("confirmed").sum()), 1)
+        self.assertEqual(int(reader.status("error").sum()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
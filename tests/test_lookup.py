@@ -0,0 +1,121 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from solders.address_lookup_table_account import ID as LOOKUP_TABLE_PROGRAM_ID  # type: ignore
+from solders.keypair import Keypair  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+from solders.system_program import ID as SYSTEM_PROGRAM_ID  # type: ignore
+
+from benchmarks.mock_rpc import MockChain
+from tests.fleet import MockFleet
+from utils.config import TEST_AMM_KEY
+from utils.lookup import (
+    LookupTableManager,
+    create_lookup_table,
+    extend_lookup_table,
+    pool_addresses,
+)
+from utils.raydium import RaydiumClient
+
+
+class InstructionTest(unittest.TestCase):
+    def setUp(self):
+        self.authority, self.payer = Pubkey.new_unique(), Pubkey.new_unique()
+
+    def test_create_lookup_table(self):
+        slot = 0x0102030405060708
+        table, bump = Pubkey.find_program_address(
+            [bytes(self.authority), bytes([8, 7, 6, 5, 4, 3, 2, 1])], LOOKUP_TABLE_PROGRAM_ID
+        )
+        instruction, address = create_lookup_table(self.authority, self.payer, slot)
+        self.assertEqual(address, table)
+        self.assertEqual(instruction.program_id, LOOKUP_TABLE_PROGRAM_ID)
+        self.assertEqual(
+            bytes(instruction.data),
+            bytes([0, 0, 0, 0]) + bytes([8, 7, 6, 5, 4, 3, 2, 1]) + bytes([bump]),
+        )
+        self.assertEqual(
+            [(meta.pubkey, meta.is_signer, meta.is_writable) for meta in instruction.accounts],
+            [
+                (table, False, True),
+                (self.authority, True, False),
+                (self.payer, True, True),
+                (SYSTEM_PROGRAM_ID, False, False),
+            ],
+        )
+
+    def test_extend_lookup_table(self):
+        table = Pubkey.new_unique()
+        addresses = [Pubkey.new_unique(), Pubkey.new_unique()]
+        instruction = extend_lookup_table(table, self.authority, self.payer, addresses)
+        self.assertEqual(
+            bytes(instruction.data),
+            bytes([2, 0, 0, 0])
+            + bytes([2, 0, 0, 0, 0, 0, 0, 0])
+            + bytes(addresses[0])
+            + bytes(addresses[1]),
+        )
+        self.assertEqual(
+            [meta.pubkey for meta in instruction.accounts],
+            [table, self.authority, self.payer, SYSTEM_PROGRAM_ID],
+        )
+
+
+class LookupTableManagerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "lookup_tables.json")
+        self.fleet = await MockFleet(MockChain.synthetic(confirm_delay=0)).start()
+        self.manager = LookupTableManager(RaydiumClient.client, path=self.path)
+        patcher = mock.patch.object(RaydiumClient, "lookup_tables", self.manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.owner = RaydiumClient(keypair=Keypair())
+
+    async def asyncTearDown(self):
+        await self.fleet.close()
+
+    def sent(self) -> int:
+        return self.fleet.server.requests.get("sendTransaction", 0)
+
+    async def test_creates_a_table_covering_the_pool(self):
+        table = await self.owner.ensure_lookup_table(TEST_AMM_KEY)
+        expected = pool_addresses(TEST_AMM_KEY, await self.owner.pool_keys(TEST_AMM_KEY))
+        self.assertEqual(list(table.addresses), expected)
+        self.assertEqual(self.sent(), 1)
+        self.assertEqual(self.manager.pools, {str(TEST_AMM_KEY): str(table.key)})
+        self.assertEqual(self.manager.authorities, {str(table.key): str(self.owner.pubkey)})
+
+    async def test_reloads_the_pool_map(self):
+        table = await self.owner.ensure_lookup_table(TEST_AMM_KEY)
+        reloaded = LookupTableManager(RaydiumClient.client, path=self.path)
+        self.assertEqual(reloaded.pools, self.manager.pools)
+        self.assertEqual(reloaded.authorities, self.manager.authorities)
+        [fetched] = await reloaded.tables_for(TEST_AMM_KEY)
+        self.assertEqual(fetched.key, table.key)
+        self.assertEqual(list(fetched.addresses), list(table.addresses))
+
+    async def test_does_not_extend_a_table_that_covers_the_pool(self):
+        table = await self.owner.ensure_lookup_table(TEST_AMM_KEY)
+        again = await self.owner.ensure_lookup_table(TEST_AMM_KEY)
+        self.assertEqual(self.sent(), 1)
+        self.assertEqual(again.key, table.key)
+        self.assertEqual(list(again.addresses), list(table.addresses))
+
+    async def test_extends_the_table_with_a_second_pool(self):
+        table = await self.owner.ensure_lookup_table(TEST_AMM_KEY)
+        pool_keys = await self.owner.pool_keys(TEST_AMM_KEY)
+        other = Pubkey.new_unique()
+        addresses = pool_addresses(other, {**pool_keys, "observationId": Pubkey.new_unique()})
+        extended = await self.manager.ensure(self.owner, other, addresses)
+        self.assertEqual(extended.key, table.key)
+        self.assertEqual(self.sent(), 2)
+        # Only the new pool and its observation account were added
+        self.assertEqual(len(extended.addresses), len(table.addresses) + 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import json
+import unittest
+
+import base58
+
+from benchmarks.bench_metadata import comparable, fixture_corpus, legacy
+from utils.extractor import getMetaData
+from utils.metadata import TokenMetadata, decode_metadata, iter_metadata
+
+
+class MetadataTest(unittest.TestCase):
+    def setUp(self):
+        self.corpus = fixture_corpus(300, seed=13)
+
+    def test_matches_the_construct_decoder(self):
+        for payload in self.corpus:
+            expected = comparable(legacy(payload))
+            self.assertEqual(json.loads(getMetaData(payload)), expected)
+            self.assertEqual(decode_metadata(base58.b58decode(payload)), expected)
+
+    def test_iter_metadata(self):
+        self.assertEqual(
+            list(iter_metadata(self.corpus)),
+            [comparable(legacy(payload)) for payload in self.corpus],
+        )
+        records = list(iter_metadata(self.corpus, records=True))
+        self.assertTrue(all(isinstance(record, TokenMetadata) for record in records))
+        for payload, record in zip(self.corpus, records):
+            data = comparable(legacy(payload))["createMetadataAccountArgsV3"]["data"]
+            self.assertEqual(
+                (record.name, record.symbol, record.uri, record.seller_fee_basis_points),
+                (data["name"], data["symbol"], data["uri"], data["sellerFeeBasisPoints"]),
+            )
+
+    def test_invalid_payloads(self):
+        payloads = [self.corpus[0], "", base58.b58encode(b"\x21\x01").decode()]
+        with self.assertRaises(ValueError):
+            list(iter_metadata(payloads))
+        decoded = list(iter_metadata(payloads, skip_invalid=True))
+        self.assertEqual(decoded[1:], [None, None])
+        self.assertIsNotNone(decoded[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
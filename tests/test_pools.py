@@ -0,0 +1,153 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from solders.pubkey import Pubkey  # type: ignore
+
+import app
+from benchmarks.mock_rpc import TEST_AMM_KEY, TEST_TOKEN, Account, MockChain, MockRpcServer
+from utils.config import WSOL
+from utils.pools import INDEX_MAGIC, SWAP_DISABLED, PoolRegistry
+from utils.raydium import RaydiumClient
+from utils.transport import make_client
+
+QUOTE = Pubkey.from_string("EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v")
+# Below and above WSOL, so one is mintA and the other mintB of its pools
+LOW, HIGH = Pubkey(bytes([1] * 32)), Pubkey(bytes([254] * 32))
+
+
+def add_pool(chain: MockChain, mint: Pubkey, reserve_sol: int, quote: str = WSOL) -> Pubkey:
+    """Adds a CPMM pool of ``mint`` against ``quote`` with ``reserve_sol`` on the quote side."""
+    pool = Pubkey.new_unique()
+    with mock.patch("benchmarks.mock_rpc.WSOL", str(quote)):
+        other = MockChain.synthetic(pool=pool, mint=mint, reserve_sol=reserve_sol)
+    chain.accounts.update(other.accounts)
+    return pool
+
+
+def set_status(chain: MockChain, pool: Pubkey, status: int) -> None:
+    account = chain.accounts[str(pool)]
+    data = bytearray(account.data)
+    data[329] = status
+    chain.set_account(pool, Account(account.lamports, account.owner, bytes(data)))
+
+
+class PoolRegistryTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "pools.idx")
+        self.chain = MockChain.synthetic()
+        self.server = MockRpcServer(self.chain, latency=0)
+        http_url, _ = await self.server.start(ws_port=None)
+        self.client = make_client([http_url], budget=None, health_interval=0)
+        self.calls = []
+        call = self.server.call
+
+        def record(method, params):
+            self.calls.append((method, params))
+            return call(method, params)
+
+        self.server.call = record
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.close()
+
+    def registry(self, **options) -> PoolRegistry:
+        return PoolRegistry(self.client, path=self.path, **options)
+
+    def fetched(self) -> list:
+        """Addresses of every getMultipleAccounts call"""
+        return [params[0] for name, params in self.calls if name == "getMultipleAccounts"]
+
+    async def test_index_file_round_trip(self):
+        add_pool(self.chain, LOW, 10**9)
+        registry = self.registry()
+        self.assertEqual(await registry.scan(), 2)
+        with open(self.path, "rb") as file:
+            data = file.read()
+        self.assertEqual(data[:8], INDEX_MAGIC)
+        self.assertEqual(len(data), 8 + 8 + 4 + 2 * 365)
+
+        loaded = self.registry()
+        self.assertEqual(loaded.slot, registry.slot)
+        self.assertEqual(loaded._rows, registry._rows)
+        keys = loaded.keys(TEST_AMM_KEY)
+        self.assertEqual(keys, registry.keys(TEST_AMM_KEY))
+        pool = bytes(self.chain.accounts[str(TEST_AMM_KEY)].data)
+        self.assertEqual(bytes(keys["mintLp"]), pool[136:168])
+        self.assertEqual(bytes(keys["observationId"]), pool[296:328])
+        self.assertEqual(keys["mintDecimalB"], 9)
+
+    async def test_refresh_fetches_only_new_pools(self):
+        old = add_pool(self.chain, LOW, 10**9)
+        registry = self.registry()
+        await registry.scan()
+        new = add_pool(self.chain, HIGH, 10**9)
+        del self.chain.accounts[str(old)]
+        self.calls.clear()
+        self.assertEqual(await registry.refresh(), 1)
+        self.assertEqual(self.fetched(), [[str(new)]])
+        # The listing carries no account data
+        listings = [params for name, params in self.calls if name == "getProgramAccounts"]
+        self.assertTrue(all(params[1]["dataSlice"]["length"] == 0 for params in listings))
+        self.assertIn(new, registry)
+        self.assertNotIn(old, registry)
+        self.assertEqual(len(self.registry()), 2)
+
+    async def test_rank_orders_pools_by_quote_depth(self):
+        shallow = add_pool(self.chain, LOW, 10**9)
+        deep = add_pool(self.chain, LOW, 10**12)
+        registry = self.registry()
+        await registry.scan()
+        self.calls.clear()
+        await registry.rank(LOW)
+        self.assertEqual(registry.pools_for(LOW), [deep, shallow])
+        self.assertEqual(registry.pool_for(LOW), deep)
+        # Both pools and both quote vaults in one call
+        [addresses] = self.fetched()
+        self.assertEqual(len(addresses), 4)
+
+    async def test_pool_for_matches_either_mint_side(self):
+        low = add_pool(self.chain, LOW, 10**9)
+        high = add_pool(self.chain, HIGH, 10**9)
+        quoted = add_pool(self.chain, HIGH, 10**9, quote=str(QUOTE))
+        registry = self.registry(quote_mints=[WSOL, QUOTE])
+        await registry.scan()
+        self.assertEqual(registry.keys(low)["mintA"], LOW)
+        self.assertEqual(registry.keys(high)["mintB"], HIGH)
+        self.assertEqual(registry.pool_for(LOW), low)
+        self.assertEqual(registry.pool_for(HIGH, quote=WSOL), high)
+        self.assertEqual(registry.pool_for(HIGH, quote=QUOTE), quoted)
+        self.assertIsNone(registry.pool_for(LOW, quote=QUOTE))
+        self.assertEqual(registry.pool_for(TEST_TOKEN), TEST_AMM_KEY)
+
+    async def test_rank_rereads_the_pool_status(self):
+        first = add_pool(self.chain, LOW, 10**12)
+        second = add_pool(self.chain, LOW, 10**9)
+        registry = self.registry()
+        await registry.scan()
+        await registry.rank(LOW)
+        self.assertEqual(registry.pool_for(LOW), first)
+        set_status(self.chain, first, SWAP_DISABLED)
+        await registry.rank(LOW)
+        self.assertEqual(registry.pool_for(LOW), second)
+        set_status(self.chain, first, 0)
+        await registry.rank(LOW)
+        self.assertEqual(registry.pool_for(LOW), first)
+
+    async def test_prepare_survives_a_failed_ranking(self):
+        registry = self.registry()
+        engine = SimpleNamespace(pair=None, mint=LOW, refresh_pools=registry.refresh)
+        with mock.patch.object(RaydiumClient, "pools", registry), mock.patch.object(
+            registry, "rank", side_effect=RuntimeError("getMultipleAccounts failed")
+        ):
+            await app.prepare(engine)
+        self.assertEqual(len(registry), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
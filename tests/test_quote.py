@@ -0,0 +1,82 @@
+import unittest
+
+import numpy as np
+
+from utils.quote import (
+    AmmV4Fees,
+    CpmmFees,
+    min_amount_out,
+    quote_exact_in,
+    quote_many,
+    quote_v4_exact_in,
+)
+
+# raydium-cp-swap's default config: 0.25% trade fee, 12% / 4% of it to protocol / fund
+FEES = CpmmFees(2500, 120_000, 40_000)
+
+
+class QuoteTest(unittest.TestCase):
+    def test_cpmm_exact_in(self):
+        # trade fee = ceil(1_000_001 * 2500 / 1e6) = ceil(2500.0025) = 2501
+        # protocol = floor(2501 * 0.12) = 300, fund = floor(2501 * 0.04) = 100
+        # out = floor(997_500 * 2_000_000_000 / (5_000_000_000 + 997_500)) = 398_920
+        quote = quote_exact_in(1_000_001, 5_000_000_000, 2_000_000_000, FEES)
+        self.assertEqual(quote.trade_fee, 2501)
+        self.assertEqual(quote.protocol_fee, 300)
+        self.assertEqual(quote.fund_fee, 100)
+        self.assertEqual(quote.amount_out, 398_920)
+        self.assertEqual((quote.reserve_in, quote.reserve_out), (5_000_000_000, 2_000_000_000))
+
+    def test_cpmm_fee_rounds_up(self):
+        # 400 * 0.25% = 1 exactly, 401 * 0.25% = 1.0025 rounds up to 2
+        self.assertEqual(quote_exact_in(400, 10**9, 10**9, FEES).trade_fee, 1)
+        self.assertEqual(quote_exact_in(401, 10**9, 10**9, FEES).trade_fee, 2)
+        # Dust still pays a fee
+        quote = quote_exact_in(1, 10**9, 10**9, FEES)
+        self.assertEqual((quote.trade_fee, quote.amount_out), (1, 0))
+
+    def test_v4_exact_in(self):
+        # fee = ceil(123_457 * 25 / 10_000) = ceil(308.6425) = 309
+        # out = floor(123_148 * 7_000_000 / (3_000_000 + 123_148)) = 276_015
+        quote = quote_v4_exact_in(123_457, 3_000_000, 7_000_000, AmmV4Fees(25, 10_000))
+        self.assertEqual(quote.trade_fee, 309)
+        self.assertEqual(quote.amount_out, 276_015)
+        self.assertEqual((quote.protocol_fee, quote.fund_fee), (0, 0))
+
+    def test_empty_pool_quotes_nothing(self):
+        self.assertEqual(quote_exact_in(0, 0, 10**9, FEES).amount_out, 0)
+
+    def test_min_amount_out(self):
+        self.assertEqual(min_amount_out(398_920, 100), 394_930)
+        # fee 2_500_000, out = floor(997_500_000 * 1e12 / (1e12 + 997_500_000))
+        quote = quote_exact_in(10**9, 10**12, 10**12, FEES)
+        self.assertEqual(quote.min_amount_out(0), 996_505_985)
+        self.assertEqual(quote.min_amount_out(50), 991_523_455)
+
+    def test_quote_many_matches_the_scalar_quote(self):
+        rng = np.random.default_rng(3)
+        amounts = rng.integers(1, 10**12, 200)
+        reserves_in = rng.integers(10**9, 10**15, 200)
+        reserves_out = rng.integers(10**9, 10**13, 200)
+        rates = rng.choice([100, 2500, 10_000, 40_000], 200)
+        expected = [
+            quote_exact_in(int(amount), int(pool_in), int(pool_out), CpmmFees(int(rate), 0, 0))
+            .amount_out
+            for amount, pool_in, pool_out, rate in zip(amounts, reserves_in, reserves_out, rates)
+        ]
+        exact = quote_many(amounts, reserves_in, reserves_out, rates, exact=True)
+        self.assertEqual([int(out) for out in exact], expected)
+        approximate = quote_many(amounts, reserves_in, reserves_out, rates)
+        np.testing.assert_allclose(approximate, expected, rtol=1e-9, atol=2)
+
+    def test_quote_many_broadcasts_sizes_against_one_pool(self):
+        amounts = [10**6, 10**9, 10**12]
+        outputs = quote_many(amounts, 5 * 10**12, 10**12, 2500, exact=True)
+        self.assertEqual(
+            list(outputs),
+            [quote_exact_in(amount, 5 * 10**12, 10**12, FEES).amount_out for amount in amounts],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+import unittest
+
+from solders.keypair import Keypair  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+
+from benchmarks.mock_rpc import Account, MockChain
+from tests.fleet import MockFleet
+from utils import ammv4
+from utils.config import (
+    OPEN_BOOK_PROGRAM_ID,
+    RAYDIUM_LIQUIDITY_POOL,
+    TEST_AMM_KEY,
+    TEST_TOKEN,
+    TOKEN_PROGRAM_ID,
+    WSOL,
+)
+from utils.extractor import AMM_INFO_LAYOUT_V4_1, MARKET_LAYOUT, OPEN_ORDERS_LAYOUT
+from utils.quote import AmmV4Fees, CpmmFees, quote_exact_in, quote_v4_exact_in
+from utils.raydium import RaydiumClient
+from utils.router import AMM_V4, CPMM, best_route, quote_routes
+
+
+def update(chain: MockChain, pubkey, layout, **fields) -> None:
+    """Rewrites ``fields`` of the ``layout`` at the head of an account."""
+    account = chain.accounts[str(pubkey)]
+    size = layout.sizeof()
+    parsed = dict(layout.parse(account.data[:size]))
+    parsed.update(fields)
+    data = layout.build(parsed) + account.data[size:]
+    chain.set_account(pubkey, Account(account.lamports, account.owner, data))
+
+
+def v4_pool(chain: MockChain) -> Pubkey:
+    [pool] = [
+        pubkey
+        for pubkey, account in chain.accounts.items()
+        if account.owner == str(RAYDIUM_LIQUIDITY_POOL)
+    ]
+    return Pubkey.from_string(pool)
+
+
+class AmmV4Test(unittest.TestCase):
+    def setUp(self):
+        self.chain = MockChain()
+        self.pool = self.chain.add_amm_v4(TEST_TOKEN, 3_000_000, 2_000_000)
+        self.amm = AMM_INFO_LAYOUT_V4_1.parse(self.data(self.pool))
+        self.market = Pubkey.from_bytes(self.amm.serumMarket)
+
+    def data(self, pubkey) -> bytes:
+        return self.chain.accounts[str(pubkey)].data
+
+    def test_decode_pool(self):
+        keys = ammv4.decode_pool(self.pool, self.data(self.pool), self.data(self.market))
+        self.assertEqual(keys["id"], self.pool)
+        self.assertEqual(keys["baseMint"], TEST_TOKEN)
+        self.assertEqual(keys["quoteMint"], Pubkey.from_string(WSOL))
+        self.assertEqual(keys["baseVault"], Pubkey.from_bytes(self.amm.poolCoinTokenAccount))
+        self.assertEqual(keys["quoteVault"], Pubkey.from_bytes(self.amm.poolPcTokenAccount))
+        self.assertEqual(keys["openOrders"], Pubkey.from_bytes(self.amm.ammOpenOrders))
+        self.assertEqual(keys["targetOrders"], Pubkey.from_bytes(self.amm.ammTargetOrders))
+        self.assertEqual(keys["marketId"], self.market)
+        self.assertEqual(keys["marketProgramId"], Pubkey.from_string(OPEN_BOOK_PROGRAM_ID))
+        self.assertEqual((keys["baseDecimals"], keys["quoteDecimals"]), (9, 9))
+        self.assertEqual(keys["fees"], AmmV4Fees(25, 10_000))
+        self.assertEqual(keys["status"], 6)
+        # The vault signer is derived from the market and its nonce
+        nonce = MARKET_LAYOUT.parse(self.data(self.market)).vault_signer_nonce
+        self.assertEqual(
+            keys["marketAuthority"],
+            Pubkey.create_program_address(
+                [bytes(self.market), nonce.to_bytes(8, "little")],
+                Pubkey.from_string(OPEN_BOOK_PROGRAM_ID),
+            ),
+        )
+
+    def test_reserves_add_open_orders_and_subtract_pending_pnl(self):
+        update(self.chain, self.pool, AMM_INFO_LAYOUT_V4_1, needTakePnlCoin=7, needTakePnlPc=11)
+        open_orders = Pubkey.from_bytes(self.amm.ammOpenOrders)
+        update(
+            self.chain,
+            open_orders,
+            OPEN_ORDERS_LAYOUT,
+            base_token_total=500,
+            quote_token_total=900,
+        )
+        keys = ammv4.decode_pool(self.pool, self.data(self.pool), self.data(self.market))
+        pool, base_vault, quote_vault, orders = (
+            self.data(account) for account in ammv4.reserve_accounts(keys)
+        )
+        self.assertEqual(
+            ammv4.reserves(pool, base_vault, quote_vault, orders),
+            (3_000_000 + 500 - 7, 2_000_000 + 900 - 11),
+        )
+        self.assertEqual(
+            ammv4.reserves(pool, base_vault, quote_vault, None),
+            (3_000_000 - 7, 2_000_000 - 11),
+        )
+
+    def test_swap_base_in_layout(self):
+        keys = ammv4.decode_pool(self.pool, self.data(self.pool), self.data(self.market))
+        token_in, token_out, owner = (Pubkey.new_unique() for _ in range(3))
+        instruction = ammv4.make_swap_instruction(
+            1_000, token_in, token_out, keys, owner, min_amount_out=990
+        )
+        self.assertEqual(instruction.program_id, RAYDIUM_LIQUIDITY_POOL)
+        self.assertEqual(
+            bytes(instruction.data),
+            bytes([9]) + (1_000).to_bytes(8, "little") + (990).to_bytes(8, "little"),
+        )
+        expected = [
+            (TOKEN_PROGRAM_ID, False),
+            (self.pool, True),
+            (ammv4.AMM_V4_AUTHORITY, False),
+            (keys["openOrders"], True),
+            (keys["targetOrders"], True),
+            (keys["baseVault"], True),
+            (keys["quoteVault"], True),
+            (keys["marketProgramId"], False),
+            (self.market, True),
+            (keys["marketBids"], True),
+            (keys["marketAsks"], True),
+            (keys["marketEventQueue"], True),
+            (keys["marketBaseVault"], True),
+            (keys["marketQuoteVault"], True),
+            (keys["marketAuthority"], False),
+            (token_in, True),
+            (token_out, True),
+            (owner, False),
+        ]
+        self.assertEqual(len(instruction.accounts), 18)
+        self.assertEqual(
+            [(meta.pubkey, meta.is_writable) for meta in instruction.accounts], expected
+        )
+        self.assertEqual(
+            [meta.pubkey for meta in instruction.accounts if meta.is_signer], [owner]
+        )
+
+
+class RouterTest(unittest.IsolatedAsyncioTestCase):
+    amount_in = 10**12
+
+    async def start(self, v4_reserve_sol: int, v4_reserve_token: int) -> None:
+        self.chain = MockChain.synthetic(
+            v4_reserve_sol=v4_reserve_sol, v4_reserve_token=v4_reserve_token
+        )
+        self.fleet = await MockFleet(self.chain).start()
+        self.addAsyncCleanup(self.fleet.close)
+        await RaydiumClient.pools.scan()
+        self.client = RaydiumClient(keypair=Keypair())
+        self.v4 = v4_pool(self.chain)
+
+    def quotes(self):
+        """The CPMM and v4 quotes, hand-computed from the mock accounts."""
+        # synthetic(): 500 SOL / 50M tokens, 0.25% trade fee
+        cpmm = quote_exact_in(
+            self.amount_in, 50_000_000 * 10**9, 500 * 10**9, CpmmFees(2500, 120_000, 40_000)
+        )
+        v4 = quote_v4_exact_in(
+            self.amount_in, self.v4_token, self.v4_sol, AmmV4Fees(25, 10_000)
+        )
+        return cpmm, v4
+
+    async def test_ranks_the_deeper_pool_first(self):
+        self.v4_sol, self.v4_token = 1_000 * 10**9, 50_000_000 * 10**9
+        await self.start(self.v4_sol, self.v4_token)
+        cpmm, v4 = self.quotes()
+        routes = await quote_routes(self.client, TEST_TOKEN, self.amount_in)
+        self.assertEqual(
+            [(route.kind, route.pool, route.quote) for route in routes],
+            [(AMM_V4, self.v4, v4), (CPMM, TEST_AMM_KEY, cpmm)],
+        )
+        # One batched read of every account the quotes depend on
+        self.assertEqual(self.fleet.server.requests.get("getMultipleAccounts"), 2)
+
+    async def test_prefers_cpmm_when_it_pays_more(self):
+        self.v4_sol, self.v4_token = 100 * 10**9, 50_000_000 * 10**9
+        await self.start(self.v4_sol, self.v4_token)
+        cpmm, _ = self.quotes()
+        route = await best_route(self.client, TEST_TOKEN, self.amount_in)
+        self.assertEqual((route.kind, route.pool, route.quote), (CPMM, TEST_AMM_KEY, cpmm))
+
+    async def test_skips_a_cpmm_pool_without_its_config(self):
+        self.v4_sol, self.v4_token = 100 * 10**9, 50_000_000 * 10**9
+        await self.start(self.v4_sol, self.v4_token)
+        config = (await self.client.pool_keys(TEST_AMM_KEY))["configId"]
+        del self.chain.accounts[str(config)]
+        routes = await quote_routes(self.client, TEST_TOKEN, self.amount_in)
+        self.assertEqual([route.kind for route in routes], [AMM_V4])
+        self.assertNotIn(str(config), RaydiumClient.amm_configs)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,198 @@
+import asyncio
+import random
+import unittest
+from unittest import mock
+
+from utils.scheduler import Scheduler, TokenBucket
+
+sleep = asyncio.sleep
+
+
+class FakeClock:
+    """Stands in for ``time`` in utils.scheduler; ``sleep`` advances it instead of waiting."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float, *args, **kwargs) -> None:
+        self.now += max(0.0, delay)
+        await sleep(0)
+
+
+class ClockTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        for patcher in (
+            mock.patch("utils.scheduler.time", self.clock),
+            mock.patch("utils.scheduler.asyncio.sleep", self.clock.sleep),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class TokenBucketTest(ClockTestCase):
+    async def test_try_acquire_takes_only_available_credits(self):
+        bucket = TokenBucket(rate=10, capacity=10)
+        self.assertTrue(bucket.try_acquire(10))
+        self.assertFalse(bucket.try_acquire(1))
+        self.clock.now += 0.1
+        self.assertTrue(bucket.try_acquire(1))
+        self.assertEqual(bucket.spent, 11)
+
+    async def test_waiters_are_served_in_arrival_order(self):
+        bucket = TokenBucket(rate=1, capacity=5)
+        bucket.try_acquire(5)
+        served = []
+
+        async def take(name, credits):
+            await bucket.acquire(credits)
+            served.append((name, self.clock.now))
+
+        await asyncio.gather(
+            take("large", 5), take("small1", 1), take("small2", 1), take("small3", 1)
+        )
+        self.assertEqual(
+            served, [("large", 1005), ("small1", 1006), ("small2", 1007), ("small3", 1008)]
+        )
+        # Nobody can jump the queue while someone is waiting
+        waiting = asyncio.ensure_future(bucket.acquire(1))
+        await sleep(0)
+        self.assertFalse(bucket.try_acquire(1))
+        await waiting
+
+    async def test_pause_after_a_429_holds_every_caller(self):
+        bucket = TokenBucket(rate=10, capacity=10)
+        bucket.pause(2)
+        self.assertFalse(bucket.try_acquire(1))
+        waited = await bucket.acquire(1)
+        self.assertEqual(waited, 2)
+        self.clock.now += 0.5
+        self.assertTrue(bucket.try_acquire(1))
+
+    async def test_a_call_above_capacity_leaves_the_bucket_in_debt(self):
+        bucket = TokenBucket(rate=2, capacity=4)
+        self.assertEqual(await bucket.acquire(6), 0)
+        self.assertEqual(bucket.tokens, -2)
+        self.assertEqual(await bucket.acquire(1), 1.5)
+
+    async def test_charges_per_method(self):
+        bucket = TokenBucket(rate=1, costs={"getBalance": 3})
+        self.assertEqual(bucket.cost("GetBalance"), 3)
+        self.assertEqual(bucket.cost("GetProgramAccountsJsonParsed"), 10)
+        self.assertEqual(bucket.cost("getSlot"), 1)
+
+
+class SchedulerTest(ClockTestCase):
+    async def test_runs_jobs_in_jittered_due_order(self):
+        random.seed(7)
+        scheduler = Scheduler(max_in_flight=1)
+        ran = []
+
+        def record(name):
+            async def run():
+                ran.append(name)
+                if len(ran) == 5:
+                    scheduler.stop()
+
+            return run
+
+        jobs = [scheduler.add(f"wallet{n}", record(f"wallet{n}"), interval=10) for n in range(5)]
+        expected = [job.name for _, _, job in sorted(scheduler._queue)]
+        self.assertNotEqual(expected, [job.name for job in jobs])
+        self.clock.now += 10
+        await scheduler.run()
+        self.assertEqual(ran, expected)
+        self.assertTrue(all(job.runs == 1 for job in jobs))
+        # Stopped jobs are not rescheduled
+        self.assertEqual(len(scheduler._queue), 4)
+
+    async def test_holds_due_jobs_until_a_slot_frees_up(self):
+        scheduler = Scheduler(max_in_flight=2)
+        release = asyncio.Event()
+        started = []
+
+        async def job():
+            started.append(scheduler.in_flight)
+            await release.wait()
+            if len(started) == 4:
+                scheduler.stop()
+
+        for n in range(4):
+            scheduler.add(f"wallet{n}", job, interval=10, delay=0)
+        running = asyncio.ensure_future(scheduler.run())
+        for _ in range(10):
+            await sleep(0)
+        self.assertEqual(len(started), 2)
+        self.assertEqual(scheduler.in_flight, 2)
+        release.set()
+        await asyncio.wait_for(running, 5)
+        self.assertEqual(len(started), 4)
+        self.assertLessEqual(max(started), 2)
+
+    async def test_stop_drains_in_flight_jobs(self):
+        scheduler = Scheduler(max_in_flight=4)
+        finished = []
+
+        async def job():
+            scheduler.stop()
+            await sleep(0.01)
+            finished.append(True)
+
+        scheduler.add("wallet", job, interval=10, delay=0)
+        await asyncio.wait_for(scheduler.run(), 5)
+        self.assertEqual(finished, [True])
+        self.assertEqual(scheduler.in_flight, 0)
+        self.assertEqual(scheduler._queue, [])
+
+    async def test_drain_cancels_jobs_past_the_timeout(self):
+        scheduler = Scheduler(max_in_flight=4, drain_timeout=0.05)
+        cancelled = []
+
+        async def job():
+            scheduler.stop()
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        scheduler.add("wallet", job, interval=10, delay=0)
+        await asyncio.wait_for(scheduler.run(), 5)
+        self.assertEqual(cancelled, [True])
+
+    async def test_stop_before_run_is_not_lost(self):
+        scheduler = Scheduler()
+        ran = []
+
+        async def job():
+            ran.append(True)
+
+        scheduler.add("wallet", job, interval=10, delay=0)
+        scheduler.stop()
+        await asyncio.wait_for(scheduler.run(), 5)
+        self.assertEqual(ran, [])
+
+    async def test_a_failing_job_is_rescheduled(self):
+        scheduler = Scheduler()
+
+        async def job():
+            if job_state.runs == 1:
+                scheduler.stop()
+            raise RuntimeError("boom")
+
+        job_state = scheduler.add("wallet", job, interval=10, jitter=0, delay=0)
+        running = asyncio.ensure_future(scheduler.run())
+        while job_state.runs < 1:
+            await sleep(0)
+        self.assertEqual(scheduler._queue[0][0], self.clock.now + 10)
+        self.clock.now += 10
+        scheduler._wakeup.set()
+        await asyncio.wait_for(running, 5)
+        self.assertEqual(job_state.failures, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from solders.hash import Hash  # type: ignore
+from solders.keypair import Keypair  # type: ignore
+from solders.message import MessageV0, to_bytes_versioned  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+from solders.system_program import TransferParams, transfer  # type: ignore
+from solders.transaction import VersionedTransaction  # type: ignore
+
+from utils.signing import Signer, sign_message
+
+
+def instructions(keypair: Keypair):
+    params = TransferParams(
+        from_pubkey=keypair.pubkey(), to_pubkey=Pubkey.new_unique(), lamports=1
+    )
+    return [transfer(params)]
+
+
+def message(keypair: Keypair) -> bytes:
+    return to_bytes_versioned(
+        MessageV0.try_compile(keypair.pubkey(), instructions(keypair), [], Hash.new_unique())
+    )
+
+
+class SignerTest(unittest.IsolatedAsyncioTestCase):
+    def signer(self, **options) -> Signer:
+        options = {"workers": 1, "mode": "thread", "batch_size": 4, "batch_delay": 0.01, **options}
+        signer = Signer(**options)
+        self.addCleanup(signer.shutdown)
+        return signer
+
+    async def test_batches_requests(self):
+        signer = self.signer()
+        keypairs = [Keypair() for _ in range(10)]
+        messages = [message(keypair) for keypair in keypairs]
+        signed = await asyncio.gather(
+            *(signer.sign(keypair, data) for keypair, data in zip(keypairs, messages))
+        )
+        # Two full batches at once, the last two after batch_delay
+        self.assertEqual((signer.batches, signer.signed), (3, 10))
+        self.assertEqual(
+            signed,
+            [sign_message(keypair, data) for keypair, data in zip(keypairs, messages)],
+        )
+
+    async def test_compile_and_sign_matches_a_local_compile(self):
+        keypair = Keypair()
+        blockhash = Hash.new_unique()
+        ixs = instructions(keypair)
+        expected = bytes(
+            VersionedTransaction(
+                MessageV0.try_compile(keypair.pubkey(), ixs, [], blockhash), [keypair]
+            )
+        )
+        self.assertEqual(await self.signer().compile_and_sign(keypair, ixs, blockhash), expected)
+        inline = self.signer(workers=0)
+        self.assertEqual(await inline.compile_and_sign(keypair, ixs, blockhash), expected)
+        self.assertEqual((inline.batches, inline.signed), (0, 1))
+
+    async def test_a_failed_batch_fails_every_request_in_it(self):
+        signer = self.signer()
+        keypairs = [Keypair() for _ in range(4)]
+        with mock.patch("utils.signing.sign_batch", side_effect=RuntimeError("worker died")):
+            results = await asyncio.gather(
+                *(signer.sign(keypair, message(keypair)) for keypair in keypairs),
+                return_exceptions=True,
+            )
+        self.assertEqual([str(result) for result in results], ["worker died"] * 4)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        self.assertEqual(signer.signed, 0)
+        # The signer keeps working afterwards
+        keypair = Keypair()
+        data = message(keypair)
+        self.assertEqual(await signer.sign(keypair, data), sign_message(keypair, data))
+
+    async def test_a_cancelled_request_does_not_affect_its_batch(self):
+        signer = self.signer()
+        keypairs = [Keypair() for _ in range(4)]
+        messages = [message(keypair) for keypair in keypairs]
+        tasks = [
+            asyncio.ensure_future(signer.sign(keypair, data))
+            for keypair, data in zip(keypairs, messages)
+        ]
+        await asyncio.sleep(0)
+        tasks[0].cancel()
+        done = await asyncio.gather(*tasks[1:])
+        self.assertEqual(done, [sign_message(k, m) for k, m in zip(keypairs[1:], messages[1:])])
+        self.assertTrue(tasks[0].cancelled())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from benchmarks.bench_simulator import MINT, exact_replay, fake_accounts
+from utils.quote import CpmmFees, quote_exact_in
+from utils.simulator import MarketSnapshot, fixed_fraction, simulate, uniform_fraction
+
+
+class SimulatorTest(unittest.TestCase):
+    def setUp(self):
+        holdings = np.random.default_rng(1).integers(10**9, 10**11, 40)
+        self.snapshot = MarketSnapshot.from_accounts(
+            MINT, fake_accounts(5 * 10**13, 800 * 10**9), holdings
+        )
+
+    def test_snapshot_excludes_accrued_fees(self):
+        # fake_accounts: vaults hold the reserves plus protocol and fund fees
+        snapshot = self.snapshot
+        self.assertEqual((snapshot.reserve_in, snapshot.reserve_out), (5 * 10**13, 800 * 10**9))
+        self.assertEqual(snapshot.fees, CpmmFees(2_500, 120_000, 40_000))
+        self.assertEqual(snapshot.decimals, 6)
+
+    def test_matches_a_scalar_replay_of_the_curve(self):
+        rounds, percent, seed = 4, 6, 3
+        result = simulate(
+            self.snapshot,
+            fixed_fraction(percent),
+            runs=1,
+            rounds=rounds,
+            seed=seed,
+            every_trade=True,
+        )
+        self.assertEqual(exact_replay(self.snapshot, percent, rounds, seed), 0)
+        # Replay the same sells, in the same wallet orders, with the integer quotes
+        order_rng = np.random.default_rng(np.random.SeedSequence(seed).spawn(2)[0])
+        wallets = len(self.snapshot.holdings)
+        scale = 10**self.snapshot.decimals
+        holdings = self.snapshot.holdings.copy()
+        reserve_in, reserve_out = self.snapshot.reserve_in, self.snapshot.reserve_out
+        reserves_in, reserves_out = [reserve_in], [reserve_out]
+        sol_out = tokens_sold = 0
+        for _ in range(rounds):
+            amounts = np.floor(holdings / scale * (percent / 100) * scale)
+            order = order_rng.permuted(np.tile(np.arange(wallets), (1, 1)), axis=1)[0]
+            for wallet in order:
+                quote = quote_exact_in(
+                    int(amounts[wallet]), reserve_in, reserve_out, self.snapshot.fees
+                )
+                reserve_in += quote.amount_in - quote.protocol_fee - quote.fund_fee
+                reserve_out -= quote.amount_out
+                reserves_in.append(reserve_in)
+                reserves_out.append(reserve_out)
+                sol_out += quote.amount_out
+                tokens_sold += quote.amount_in
+            holdings -= amounts
+        self.assertEqual(result.reserves_in[0].tolist(), reserves_in)
+        self.assertEqual(result.reserves_out[0].tolist(), reserves_out)
+        self.assertEqual((result.sol_out[0], result.tokens_sold[0]), (sol_out, tokens_sold))
+
+    def test_runs_are_independent_and_seeded(self):
+        first = simulate(self.snapshot, uniform_fraction(), runs=200, rounds=3, seed=5)
+        again = simulate(self.snapshot, uniform_fraction(), runs=200, rounds=3, seed=5)
+        np.testing.assert_array_equal(first.sol_out, again.sol_out)
+        self.assertEqual(first.reserves_in.shape, (200, 4))
+        self.assertGreater(len(np.unique(first.sol_out)), 1)
+        # Every run sells into the same starting pool, so impact only lowers proceeds
+        self.assertTrue(np.all(first.sol_out < first.initial_value))
+        self.assertTrue(np.all(first.slippage > 0))
+        self.assertTrue(np.all(first.price_change < 0))
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "snapshot.json")
+            self.snapshot.save(path)
+            loaded = MarketSnapshot.load(path)
+        self.assertEqual(loaded.accounts, self.snapshot.accounts)
+        self.assertEqual(
+            (loaded.reserve_in, loaded.reserve_out, loaded.fees),
+            (self.snapshot.reserve_in, self.snapshot.reserve_out, self.snapshot.fees),
+        )
+        np.testing.assert_array_equal(loaded.holdings, self.snapshot.holdings)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import asyncio
+import base64
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from solders.signature import Signature  # type: ignore
+from solders.transaction_status import TransactionConfirmationStatus  # type: ignore
+
+from utils.submit import SIGNATURE_STATUS_LIMIT, TransactionSubmitter
+
+
+class StubClient:
+    """Answers the submitter's RPC calls from ``statuses`` and records what it sent."""
+
+    def __init__(self) -> None:
+        self.statuses = {}
+        self.block_height = 100
+        self.reject = None
+        self.sent = []
+        self.status_batches = []
+        self.transport = SimpleNamespace(broadcast=self.broadcast)
+
+    async def broadcast(self, method, params):
+        if self.reject is not None:
+            raise self.reject
+        self.sent.append(Signature.from_bytes(base64.b64decode(params[0])[1:65]))
+
+    async def get_signature_statuses(self, signatures):
+        self.status_batches.append(len(signatures))
+        return SimpleNamespace(value=[self.statuses.get(s) for s in signatures])
+
+    async def get_block_height(self, commitment):
+        return SimpleNamespace(value=self.block_height)
+
+
+def transaction() -> bytes:
+    return b"\x01" + bytes(Signature.new_unique()) + b"message"
+
+
+def status(confirmation=TransactionConfirmationStatus.Processed, err=None, slot=7):
+    return SimpleNamespace(confirmation_status=confirmation, err=err, slot=slot)
+
+
+class TransactionSubmitterTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.now = 1_000.0
+        patcher = mock.patch(
+            "utils.submit.time",
+            SimpleNamespace(monotonic=lambda: self.now, time=lambda: self.now),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = StubClient()
+        self.blockhash = SimpleNamespace(block_height=100)
+        # The poller is driven by hand: its own loop never wakes up
+        self.submitter = TransactionSubmitter(
+            self.client, self.blockhash, rebroadcast_interval=2, poll_interval=3600
+        )
+
+    async def asyncTearDown(self):
+        if self.submitter._task is not None:
+            self.submitter._task.cancel()
+
+    async def tick(self, seconds: float) -> None:
+        self.now += seconds
+        await asyncio.gather(self.submitter._poll(), self.submitter._rebroadcast())
+
+    async def test_rebroadcasts_until_the_transaction_is_seen(self):
+        signature = await self.submitter.submit(transaction(), 150, wait=False)
+        await self.tick(1)
+        self.assertEqual(self.client.sent, [signature])
+        await self.tick(1)
+        await self.tick(2)
+        self.assertEqual(self.client.sent, [signature] * 3)
+        self.client.statuses[signature] = status()
+        await self.tick(2)
+        await self.tick(2)
+        self.assertEqual(len(self.client.sent), 3)
+        self.client.statuses[signature] = status(TransactionConfirmationStatus.Confirmed)
+        await self.tick(1)
+        result = await self.submitter.result(signature)
+        self.assertTrue(result.ok)
+        self.assertEqual((result.broadcasts, result.slot), (3, 7))
+        self.assertEqual(result.time_to_confirm, 9)
+        self.assertNotIn(signature, self.submitter.pending)
+
+    async def test_polls_every_pending_signature_in_batches(self):
+        count = 2 * SIGNATURE_STATUS_LIMIT + 10
+        signatures = [
+            await self.submitter.submit(transaction(), 150, wait=False) for _ in range(count)
+        ]
+        failed = signatures[5]
+        self.client.statuses[failed] = status(err="InstructionError")
+        await self.submitter._poll()
+        self.assertEqual(
+            self.client.status_batches, [SIGNATURE_STATUS_LIMIT, SIGNATURE_STATUS_LIMIT, 10]
+        )
+        result = await self.submitter.result(failed)
+        self.assertEqual((result.status, result.error), ("failed", "InstructionError"))
+        self.assertEqual(len(self.submitter.pending), count - 1)
+
+    async def test_expires_only_past_the_cluster_block_height(self):
+        signature = await self.submitter.submit(transaction(), 150, wait=False)
+        # The provider's estimate is past the last valid height, the cluster is not
+        self.blockhash.block_height = 151
+        await self.submitter._poll()
+        self.assertIn(signature, self.submitter.pending)
+        self.client.block_height = 151
+        await self.submitter._poll()
+        result = await self.submitter.result(signature)
+        self.assertEqual(result.status, "expired")
+        self.assertEqual(self.client.status_batches, [1, 1, 1])
+
+    async def test_seen_on_the_last_check_is_not_expired(self):
+        signature = await self.submitter.submit(transaction(), 150, wait=False)
+        self.blockhash.block_height = self.client.block_height = 151
+        statuses = self.client.get_signature_statuses
+
+        async def land_late(signatures):
+            # Lands between the poll and the expiry check
+            if self.client.status_batches:
+                self.client.statuses[signature] = status(TransactionConfirmationStatus.Confirmed)
+            return await statuses(signatures)
+
+        self.client.get_signature_statuses = land_late
+        await self.submitter._poll()
+        self.assertIn(signature, self.submitter.pending)
+        await self.submitter._poll()
+        self.assertTrue((await self.submitter.result(signature)).ok)
+
+    async def test_a_rejected_send_fails_at_once(self):
+        self.client.reject = RuntimeError("preflight failed")
+        result = await self.submitter.submit(transaction(), 150)
+        self.assertEqual((result.status, result.error), ("failed", "preflight failed"))
+        self.assertEqual(self.submitter.pending, {})
+        self.assertIsNone(self.submitter._task)
+
+
+if __name__ == "__main__":
+    unittest.main()
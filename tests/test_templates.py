@@ -0,0 +1,155 @@
+import random
+import unittest
+
+from solders.address_lookup_table_account import AddressLookupTableAccount  # type: ignore
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price  # type: ignore
+from solders.hash import Hash  # type: ignore
+from solders.keypair import Keypair  # type: ignore
+from solders.message import MessageV0, to_bytes_versioned  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+from solders.transaction import VersionedTransaction  # type: ignore
+
+from benchmarks.bench_swap_build import fake_pool_keys
+from benchmarks.mock_rpc import MockChain
+from utils import ammv4
+from utils.config import TEST_TOKEN, UNIT_BUDGET, UNIT_PRICE
+from utils.extractor import AMM_INFO_LAYOUT_V4_1
+from utils.raydium import RaydiumClient
+from utils.router import AMM_V4
+from utils.templates import SwapTemplate
+from utils.wsol import WSOL_MINT
+
+
+class SwapTemplateTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(11)
+        self.client = RaydiumClient(keys=str(Keypair()))
+        self.payer = self.client.keypair.pubkey()
+        self.token_account = Pubkey.new_unique()
+        self.wsol_account = self.client.associated_token_address(WSOL_MINT)
+
+    def cpmm(self):
+        """Sell instructions on a fake CPMM pool and a swap builder for it."""
+        pool_keys, pair = fake_pool_keys(), Pubkey.new_unique()
+        instructions = self.client.make_sell_instructions(
+            0, self.token_account, pool_keys, pair=pair
+        )
+
+        def swap(amount_in, min_amount_out):
+            return self.client.make_swap_instruction(
+                amount_in,
+                self.token_account,
+                self.wsol_account,
+                pool_keys,
+                self.client.keypair,
+                min_amount_out,
+                pair=pair,
+                mint_in=pool_keys["mintA"],
+            )
+
+        return instructions, swap
+
+    def v4(self):
+        chain = MockChain()
+        pool = chain.add_amm_v4(TEST_TOKEN, 3_000_000, 2_000_000)
+        data = chain.accounts[str(pool)].data
+        market = Pubkey.from_bytes(AMM_INFO_LAYOUT_V4_1.parse(data).serumMarket)
+        keys = ammv4.decode_pool(pool, data, chain.accounts[str(market)].data)
+        instructions = self.client.make_sell_instructions(
+            0, self.token_account, keys, pair=pool, kind=AMM_V4
+        )
+
+        def swap(amount_in, min_amount_out):
+            return ammv4.make_swap_instruction(
+                amount_in,
+                self.token_account,
+                self.wsol_account,
+                keys,
+                self.payer,
+                min_amount_out,
+            )
+
+        return instructions, swap
+
+    def compile(self, instructions, swap, lookup_tables=(), **values) -> bytes:
+        """A full compile of the sell with ``values`` built into the instructions."""
+        instructions = list(instructions)
+        instructions[0] = set_compute_unit_limit(values["unit_limit"])
+        instructions[1] = set_compute_unit_price(values["unit_price"])
+        instructions[-2] = swap(values["amount_in"], values["min_amount_out"])
+        message = MessageV0.try_compile(
+            self.payer, instructions, list(lookup_tables), values["blockhash"]
+        )
+        return to_bytes_versioned(message)
+
+    def samples(self, count: int = 50):
+        for _ in range(count):
+            yield dict(
+                amount_in=self.rng.randrange(1, 2**64),
+                min_amount_out=self.rng.randrange(2**64),
+                blockhash=Hash.new_unique(),
+                unit_limit=self.rng.randrange(1, 1_400_000),
+                unit_price=self.rng.randrange(2**64),
+            )
+
+    def assert_renders_like_a_compile(self, template, instructions, swap, lookup_tables=()):
+        for values in self.samples():
+            self.assertEqual(
+                template.render(**values),
+                self.compile(instructions, swap, lookup_tables, **values),
+            )
+
+    def test_cpmm_template_matches_a_full_compile(self):
+        instructions, swap = self.cpmm()
+        template = SwapTemplate(self.payer, instructions, len(instructions) - 2)
+        self.assert_renders_like_a_compile(template, instructions, swap)
+
+    def test_v4_template_matches_a_full_compile(self):
+        instructions, swap = self.v4()
+        template = SwapTemplate(
+            self.payer,
+            instructions,
+            len(instructions) - 2,
+            data_prefix=bytes([ammv4.SWAP_BASE_IN]),
+        )
+        self.assert_renders_like_a_compile(template, instructions, swap)
+
+    def test_template_with_a_lookup_table_matches_a_full_compile(self):
+        instructions, swap = self.cpmm()
+        swap_accounts = [meta.pubkey for meta in instructions[-2].accounts]
+        table = AddressLookupTableAccount(Pubkey.new_unique(), swap_accounts[1:])
+        template = SwapTemplate(self.payer, instructions, len(instructions) - 2, [table])
+        self.assert_renders_like_a_compile(template, instructions, swap, [table])
+
+    def test_defaults_to_the_built_in_compute_budget(self):
+        instructions, swap = self.cpmm()
+        template = SwapTemplate(self.payer, instructions, len(instructions) - 2)
+        self.assertEqual((template.unit_limit, template.unit_price), (UNIT_BUDGET, UNIT_PRICE))
+        blockhash = Hash.new_unique()
+        self.assertEqual(
+            template.render(10**9, 5, blockhash),
+            self.compile(
+                instructions,
+                swap,
+                amount_in=10**9,
+                min_amount_out=5,
+                blockhash=blockhash,
+                unit_limit=UNIT_BUDGET,
+                unit_price=UNIT_PRICE,
+            ),
+        )
+
+    def test_sign_matches_a_signed_compile(self):
+        instructions, swap = self.cpmm()
+        template = SwapTemplate(self.payer, instructions, len(instructions) - 2)
+        blockhash = Hash.new_unique()
+        instructions[-2] = swap(10**9, 5)
+        message = MessageV0.try_compile(self.payer, instructions, [], blockhash)
+        self.assertEqual(
+            template.sign(self.client.keypair, 10**9, 5, blockhash),
+            bytes(VersionedTransaction(message, [self.client.keypair])),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
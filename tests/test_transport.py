@@ -0,0 +1,111 @@
+import time
+import unittest
+
+from solders.pubkey import Pubkey  # type: ignore
+from solders.rpc.requests import SendRawTransaction  # type: ignore
+
+from tests.stubs import StubRpcServer
+from utils.transport import MAX_FAILURES, RpcTransport
+
+
+class RpcTransportTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.first, self.second = StubRpcServer(), StubRpcServer()
+        urls = [await self.first.start(), await self.second.start()]
+        # Health checks are driven by the tests
+        self.transport = RpcTransport(
+            urls, timeout=0.5, hedge_min_delay=0.01, health_interval=0
+        )
+        self.first_endpoint, self.second_endpoint = self.transport.endpoints
+
+    async def asyncTearDown(self):
+        await self.transport.close()
+        await self.first.close()
+        await self.second.close()
+
+    @staticmethod
+    def warm(endpoint, latency: float, samples: int = 30) -> None:
+        """Gives ``endpoint`` a latency history (enough samples for a p95)."""
+        for _ in range(samples):
+            endpoint.observe(latency)
+
+    async def test_routes_to_the_lowest_ewma(self):
+        self.transport.hedge = False
+        self.first.delay = 0.05
+        for _ in range(20):
+            await self.transport.request_json("getSlot")
+        self.assertIs(self.transport.ranked()[0], self.second_endpoint)
+        # The first call measures the first endpoint, the rest go to the faster one
+        self.assertEqual(len(self.first.requests), 1)
+        self.assertEqual(len(self.second.requests), 19)
+
+    async def test_hedges_once_the_leader_exceeds_its_p95(self):
+        self.warm(self.first_endpoint, 0.01)
+        self.warm(self.second_endpoint, 0.02)
+        self.first.delay = 1.0
+        started = time.perf_counter()
+        self.assertEqual(await self.transport.request_json("getSlot"), 1)
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(self.transport.hedged, 1)
+        self.assertEqual(self.first.requests, ["getSlot"])
+        self.assertEqual(self.second.requests, ["getSlot"])
+
+    async def test_does_not_hedge_within_the_p95(self):
+        self.warm(self.first_endpoint, 0.2)
+        self.warm(self.second_endpoint, 0.3)
+        await self.transport.request_json("getSlot")
+        self.assertEqual(self.transport.hedged, 0)
+        self.assertEqual(self.second.requests, [])
+
+    async def test_never_hedges_writes(self):
+        self.warm(self.first_endpoint, 0.01)
+        self.warm(self.second_endpoint, 0.02)
+        self.first.delay = 0.2
+        await self.transport.make_request_unparsed(SendRawTransaction(bytes(64)))
+        self.assertEqual(self.transport.hedged, 0)
+        self.assertEqual(self.first.requests, ["sendTransaction"])
+        self.assertEqual(self.second.requests, [])
+
+    async def test_never_hedges_raw_json_writes(self):
+        self.warm(self.first_endpoint, 0.01)
+        self.warm(self.second_endpoint, 0.02)
+        self.first.delay = 0.2
+        await self.transport.request_json("sendTransaction", ["AAAA"])
+        self.first.requests.clear()
+        self.warm(self.first_endpoint, 0.01)
+        await self.transport.request_json("requestAirdrop", [str(Pubkey.default()), 1])
+        self.assertEqual(self.transport.hedged, 0)
+        self.assertEqual(self.first.requests, ["requestAirdrop"])
+        self.assertEqual(self.second.requests, [])
+
+    async def test_ejects_a_failing_endpoint_and_recovers(self):
+        self.transport.hedge = False
+        # Slower than a failure's penalty, so the failing endpoint stays the leader
+        self.warm(self.second_endpoint, 1.0)
+        self.first.status = 500
+        for _ in range(MAX_FAILURES):
+            # Each call fails over to the second endpoint
+            self.assertEqual(await self.transport.request_json("getSlot"), 1)
+        self.assertFalse(self.first_endpoint.healthy)
+        self.assertEqual(len(self.first.requests), MAX_FAILURES)
+
+        await self.transport.request_json("getSlot")
+        self.assertEqual(len(self.first.requests), MAX_FAILURES)
+
+        self.first.healthy = False
+        self.assertTrue(await self.transport.is_connected())
+        self.assertFalse(self.first_endpoint.healthy)
+
+        self.first.status = 200
+        self.first.healthy = True
+        self.second.healthy = False
+        await self.transport.is_connected()
+        self.assertTrue(self.first_endpoint.healthy)
+        self.assertEqual(self.first_endpoint.failures, 0)
+        # The re-admitted endpoint now leads the ejected one
+        await self.transport.request_json("getSlot")
+        self.assertEqual(len(self.first.requests), MAX_FAILURES + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from solders.keypair import Keypair  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+from spl.token.instructions import get_associated_token_address
+
+from utils.wallets import WalletRegistry
+
+MINTS = [Pubkey.new_unique(), Pubkey.new_unique()]
+
+
+class WalletRegistryTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.keys_path = os.path.join(directory.name, "Wallets.txt")
+        self.index_path = os.path.join(directory.name, "wallets.idx")
+        self.keypairs = [Keypair() for _ in range(3)]
+        self.write_keys(self.keypairs, invalid_at=1)
+
+    def write_keys(self, keypairs, invalid_at=None) -> None:
+        lines = [str(keypair) for keypair in keypairs]
+        if invalid_at is not None:
+            lines.insert(invalid_at, "not-a-key")
+        with open(self.keys_path, "w") as file:
+            file.write("\n".join(lines) + "\n\n")
+
+    def registry(self, mints=MINTS):
+        """A registry and whether it had to rebuild the index"""
+        build = WalletRegistry._build_index
+        with mock.patch.object(
+            WalletRegistry, "_build_index", autospec=True, side_effect=build
+        ) as built:
+            registry = WalletRegistry(mints, self.keys_path, self.index_path)
+        self.addCleanup(lambda: registry._index.close())
+        return registry, built.called
+
+    def test_index_matches_the_keys(self):
+        registry, built = self.registry()
+        self.assertTrue(built)
+        self.assertEqual(len(registry), 4)
+        self.assertEqual(registry.invalid, [1])
+        self.assertEqual(registry.valid_indexes, [0, 2, 3])
+        self.assertIsNone(registry.keypair(1))
+        for index, keypair in zip((0, 2, 3), self.keypairs):
+            owner = keypair.pubkey()
+            self.assertEqual(registry.pubkey(index), owner)
+            self.assertEqual(registry.keypair(index).pubkey(), owner)
+            for mint in MINTS:
+                self.assertEqual(
+                    registry.ata(index, mint), get_associated_token_address(owner, mint)
+                )
+
+    def test_reuses_the_index_while_nothing_changes(self):
+        self.registry()
+        registry, built = self.registry()
+        self.assertFalse(built)
+        self.assertEqual(registry.pubkey(3), self.keypairs[2].pubkey())
+        # Keypairs are parsed on use, not when the index is mapped
+        self.assertEqual(registry._keypairs, {})
+
+    def test_rebuilds_when_wallets_change(self):
+        self.registry()
+        added = Keypair()
+        self.write_keys([*self.keypairs, added])
+        registry, built = self.registry()
+        self.assertTrue(built)
+        self.assertEqual(registry.invalid, [])
+        self.assertEqual(registry.pubkey(3), added.pubkey())
+        self.assertEqual(
+            registry.ata(3, MINTS[0]), get_associated_token_address(added.pubkey(), MINTS[0])
+        )
+
+    def test_rebuilds_when_the_mints_change(self):
+        self.registry()
+        mints = [MINTS[1], Pubkey.new_unique()]
+        registry, built = self.registry(mints)
+        self.assertTrue(built)
+        owner = self.keypairs[0].pubkey()
+        self.assertEqual(registry.ata(0, mints[1]), get_associated_token_address(owner, mints[1]))
+        with self.assertRaises(KeyError):
+            registry.ata(0, MINTS[0])
+        # Same mints in another order are another index too
+        _, built = self.registry(mints[::-1])
+        self.assertTrue(built)
+
+    def test_rebuilds_a_damaged_index(self):
+        self.registry()
+        with open(self.index_path, "r+b") as file:
+            file.truncate(os.path.getsize(self.index_path) - 1)
+        registry, built = self.registry()
+        self.assertTrue(built)
+        self.assertEqual(registry.pubkey(0), self.keypairs[0].pubkey())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import asyncio
+import socket
+import unittest
+from unittest import mock
+
+from solders.keypair import Keypair  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+
+from benchmarks.mock_rpc import TEST_AMM_KEY, Account, MockChain, MockRpcServer
+from utils.blockchain import SolanaClient
+from utils.cache import PoolCache
+from utils.pools import PoolRegistry
+from utils.transport import make_client
+from utils.watcher import PoolWatcher
+
+
+class Client(SolanaClient):
+    """SolanaClient with its own shared services, pointed at the mock server"""
+
+
+def unused_port() -> int:
+    with socket.socket() as listener:
+        listener.bind(("127.0.0.1", 0))
+        return listener.getsockname()[1]
+
+
+class PoolWatcherTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.chain = MockChain.synthetic()
+        self.server = MockRpcServer(self.chain, latency=0)
+        http_url, self.ws_url = await self.server.start()
+        Client.client = make_client([http_url], budget=None, health_interval=0)
+        Client.pool_cache = PoolCache()
+        Client.pools = PoolRegistry(Client.client, path="")
+        self.client = Client(keypair=Keypair())
+
+    async def asyncTearDown(self):
+        await Client.client.close()
+        await self.server.close()
+
+    def set_vault(self, vault: Pubkey, amount: int) -> None:
+        account = self.chain.accounts[str(vault)]
+        data = bytearray(account.data)
+        data[64:72] = amount.to_bytes(8, "little")
+        self.chain.set_account(vault, Account(account.lamports, account.owner, bytes(data)))
+
+    async def subscribed(self, watcher: PoolWatcher) -> None:
+        """Waits for all three subscriptions and for a slot after the watcher's state."""
+        while (
+            len(self.server._subscriptions) < 3
+            or self.chain.slot <= watcher.reserves.slot
+        ):
+            await asyncio.sleep(0.01)
+
+    async def drop_connections(self) -> None:
+        for websocket, _ in list(self.server._subscriptions):
+            await websocket.close()
+
+    async def test_wait_for_update_before_start(self):
+        watcher = PoolWatcher(self.client, TEST_AMM_KEY, ws_url=self.ws_url)
+        waiting = asyncio.ensure_future(watcher.wait_for_update(timeout=5))
+        await asyncio.sleep(0)
+        async with watcher:
+            reserves = await waiting
+        self.assertIsNotNone(reserves)
+        self.assertIs(reserves, watcher.reserves)
+
+    async def test_applies_notifications(self):
+        async with PoolWatcher(self.client, TEST_AMM_KEY, ws_url=self.ws_url) as watcher:
+            vault = (await self.client.pool_keys(TEST_AMM_KEY))["vaultA"]
+            before = watcher.reserves
+            await self.subscribed(watcher)
+            self.set_vault(vault, 123_456)
+            reserves = await watcher.wait_for_update(before.slot, timeout=5)
+            self.assertEqual(reserves.vault_a, 123_456)
+            self.assertEqual(watcher.reconnects, 0)
+
+    async def test_resyncs_after_reconnecting(self):
+        async with PoolWatcher(self.client, TEST_AMM_KEY, ws_url=self.ws_url) as watcher:
+            vault = (await self.client.pool_keys(TEST_AMM_KEY))["vaultB"]
+            before = watcher.reserves
+            await self.subscribed(watcher)
+            await self.drop_connections()
+            # Missed while disconnected, so only the resync can pick it up
+            self.set_vault(vault, 654_321)
+            reserves = await watcher.wait_for_update(before.slot, timeout=5)
+            self.assertEqual(reserves.vault_b, 654_321)
+            self.assertEqual(watcher.reconnects, 1)
+
+    async def test_backs_off_exponentially_up_to_the_maximum(self):
+        delays = []
+        retried = asyncio.Event()
+        sleep = asyncio.sleep
+
+        async def record(delay, *args, **kwargs):
+            delays.append(delay)
+            if len(delays) == 6:
+                retried.set()
+            await sleep(0)
+
+        watcher = PoolWatcher(
+            self.client, TEST_AMM_KEY, ws_url=f"ws://127.0.0.1:{unused_port()}", max_backoff=4
+        )
+        # The initial load is over HTTP, only the websocket is unreachable
+        with mock.patch("utils.watcher.asyncio.sleep", record):
+            async with watcher:
+                await asyncio.wait_for(retried.wait(), 5)
+        self.assertEqual(delays[:6], [0.5, 1, 2, 4, 4, 4])
+        self.assertGreaterEqual(watcher.reconnects, 6)
+        self.assertIsNotNone(watcher.reserves)
+
+
+if __name__ == "__main__":
+    unittest.main()
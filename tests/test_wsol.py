@@ -0,0 +1,89 @@
+import unittest
+from unittest import mock
+
+from solders.keypair import Keypair  # type: ignore
+
+from benchmarks.mock_rpc import MockChain
+from tests.fleet import MockFleet
+from utils.config import TEST_AMM_KEY, TEST_TOKEN
+from utils.engine import SellEngine
+from utils.raydium import RaydiumClient
+
+
+class PersistentWsolTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.keypairs = [Keypair() for _ in range(4)]
+        chain = MockChain.synthetic(
+            [keypair.pubkey() for keypair in self.keypairs], confirm_delay=0
+        )
+        self.fleet = await MockFleet(chain).start()
+        for patcher in (
+            mock.patch("utils.raydium.WSOL_PERSISTENT", True),
+            mock.patch("utils.engine.WSOL_PERSISTENT", True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.engine = SellEngine(
+            [str(keypair) for keypair in self.keypairs],
+            TEST_AMM_KEY,
+            TEST_TOKEN,
+            lambda holding: holding * 0.05,
+        )
+
+    async def asyncTearDown(self):
+        await self.engine.close()
+        await self.fleet.close()
+
+    async def test_refreshing_balances_opens_missing_accounts(self):
+        await self.engine.refresh_balances()
+        # One batch of creations for all four wallets
+        self.assertEqual(self.fleet.server.requests.get("sendTransaction"), 1)
+        self.assertTrue(
+            all(keypair.pubkey() in RaydiumClient.wsol for keypair in self.keypairs)
+        )
+
+    async def test_sells_again_with_the_creation_when_the_account_was_closed(self):
+        client = self.engine.clients[0]
+        owner = client.keypair.pubkey()
+        # Known as open, but the mock chain holds no wSOL account for it
+        RaydiumClient.wsol.mark(owner)
+        confirm = RaydiumClient.submitter.confirm
+        variants = []
+
+        async def fail_first(signature):
+            result = await confirm(signature)
+            variants.append(owner in RaydiumClient.wsol)
+            if len(variants) == 1:
+                return result._replace(status="failed", error="AccountNotInitialized")
+            return result
+
+        with mock.patch.object(RaydiumClient.submitter, "confirm", fail_first):
+            result = await client.make_sell_swap(TEST_AMM_KEY, 10**9, TEST_TOKEN)
+        self.assertTrue(result.ok)
+        self.assertEqual(variants, [True, False])
+        self.assertIsNotNone(
+            RaydiumClient.templates.get(TEST_AMM_KEY, owner, "sell:wsol-create")
+        )
+        self.assertIn(owner, RaydiumClient.wsol)
+
+    async def test_a_failure_with_the_account_open_is_not_retried(self):
+        client = self.engine.clients[0]
+        owner = client.keypair.pubkey()
+        RaydiumClient.wsol.mark(owner)
+        confirm = RaydiumClient.submitter.confirm
+
+        async def fail(signature):
+            result = await confirm(signature)
+            return result._replace(status="failed", error="SlippageExceeded")
+
+        with mock.patch.object(RaydiumClient.submitter, "confirm", fail), mock.patch.object(
+            RaydiumClient, "wsol_closed", return_value=False
+        ) as wsol_closed:
+            result = await client.make_sell_swap(TEST_AMM_KEY, 10**9, TEST_TOKEN)
+        self.assertEqual(result.status, "failed")
+        wsol_closed.assert_awaited_once()
+        self.assertEqual(self.fleet.server.requests.get("sendTransaction"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
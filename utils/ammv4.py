@@ -0,0 +1,256 @@
+"""Raydium AMM v4 (``RAYDIUM_LIQUIDITY_POOL``) pools: keys, reserves and swaps.
+
+A v4 pool is the AMM account plus its OpenBook market: the swap instruction
+needs the market's bids, asks, event queue, vaults and vault signer as well,
+so pool keys combine both accounts. Both are immutable for what the swap
+needs and are fetched once per pool. Reserves are the vault balances plus
+whatever sits in the pool's open orders, minus PnL the pool still has to
+take, as the program computes them.
+"""
+import asyncio
+import base64
+from typing import Dict, List, Sequence, Tuple
+
+from solders.instruction import AccountMeta, Instruction  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+
+from utils.config import (
+    POOL_QUOTE_MINTS,
+    RAYDIUM_AUTHORITY,
+    RAYDIUM_LIQUIDITY_POOL,
+    TOKEN_PROGRAM_ID,
+)
+from utils.extractor import AMM_INFO_LAYOUT_V4_1, AMM_V4_SWAP_LAYOUT
+from utils.fastlayout import (
+    FAST_ACCOUNT_LAYOUT,
+    FAST_AMM_INFO_LAYOUT_V4_1,
+    FAST_MARKET_LAYOUT,
+    FAST_OPEN_ORDERS_LAYOUT,
+)
+from utils.quote import AmmV4Fees
+from utils.snapshot import get_multiple_accounts
+from utils.transport import TransportClient
+
+AMM_V4_AUTHORITY = Pubkey.from_string(RAYDIUM_AUTHORITY)
+
+AMM_V4_ACCOUNT_SIZE = 752
+"""Size of an AMM v4 pool account (AMM_INFO_LAYOUT_V4_1 covers the first 624 bytes)"""
+
+SWAP_BASE_IN = 9
+"""AMM v4 instruction tag of swap_base_in"""
+
+SWAPPABLE_STATUSES = frozenset((1, 6, 7))
+"""Initialized, SwapOnly and WaitingTrade pools accept swaps"""
+
+
+def _offset(layout, name: str) -> int:
+    offset = 0
+    for subcon in layout.subcons:
+        if getattr(subcon, "name", None) == name:
+            return offset
+        offset += subcon.sizeof()
+    raise KeyError(name)
+
+
+BASE_MINT_OFFSET = _offset(AMM_INFO_LAYOUT_V4_1, "coinMintAddress")
+QUOTE_MINT_OFFSET = _offset(AMM_INFO_LAYOUT_V4_1, "pcMintAddress")
+
+
+def decode_pool(pool: Pubkey, amm_data, market_data) -> dict:
+    """Swap keys of a v4 pool from its AMM and market accounts."""
+    amm = FAST_AMM_INFO_LAYOUT_V4_1.decode(amm_data)
+    market = FAST_MARKET_LAYOUT.decode(market_data)
+    market_id = amm.pubkey("serumMarket")
+    market_program = amm.pubkey("serumProgramId")
+    return {
+        "id": pool,
+        "baseMint": amm.pubkey("coinMintAddress"),
+        "quoteMint": amm.pubkey("pcMintAddress"),
+        "baseVault": amm.pubkey("poolCoinTokenAccount"),
+        "quoteVault": amm.pubkey("poolPcTokenAccount"),
+        "baseDecimals": amm.coinDecimals,
+        "quoteDecimals": amm.pcDecimals,
+        "openOrders": amm.pubkey("ammOpenOrders"),
+        "targetOrders": amm.pubkey("ammTargetOrders"),
+        "marketProgramId": market_program,
+        "marketId": market_id,
+        "marketBids": market.pubkey("bids"),
+        "marketAsks": market.pubkey("asks"),
+        "marketEventQueue": market.pubkey("event_queue"),
+        "marketBaseVault": market.pubkey("base_vault"),
+        "marketQuoteVault": market.pubkey("quote_vault"),
+        "marketAuthority": Pubkey.create_program_address(
+            [bytes(market_id), market.vault_signer_nonce.to_bytes(8, "little")],
+            market_program,
+        ),
+        "fees": AmmV4Fees(amm.swapFeeNumerator, amm.swapFeeDenominator),
+        "status": amm.status,
+    }
+
+
+def reserves(amm_data, base_vault_data, quote_vault_data, open_orders_data) -> Tuple[int, int]:
+    """(base, quote) reserves the program swaps against."""
+    amm = FAST_AMM_INFO_LAYOUT_V4_1.decode(amm_data)
+    base = FAST_ACCOUNT_LAYOUT.read("amount", base_vault_data) - amm.needTakePnlCoin
+    quote = FAST_ACCOUNT_LAYOUT.read("amount", quote_vault_data) - amm.needTakePnlPc
+    if open_orders_data is not None:
+        base += FAST_OPEN_ORDERS_LAYOUT.read("base_token_total", open_orders_data)
+        quote += FAST_OPEN_ORDERS_LAYOUT.read("quote_token_total", open_orders_data)
+    return base, quote
+
+
+def reserve_accounts(keys: dict) -> List[Pubkey]:
+    """Accounts ``reserves`` reads, in its argument order."""
+    return [keys["id"], keys["baseVault"], keys["quoteVault"], keys["openOrders"]]
+
+
+def make_swap_instruction(
+    amount_in: int,
+    token_account_in: Pubkey,
+    token_account_out: Pubkey,
+    keys: dict,
+    owner: Pubkey,
+    min_amount_out: int = 0,
+) -> Instruction:
+    """
+    ``swap_base_in`` on a v4 pool.
+
+    The direction follows the mint of ``token_account_in``, so the account
+    list is the same both ways.
+    """
+    data = AMM_V4_SWAP_LAYOUT.build(
+        dict(
+            instruction=SWAP_BASE_IN,
+            amount_in=int(amount_in),
+            min_amount_out=int(min_amount_out),
+        )
+    )
+    writable = dict(is_signer=False, is_writable=True)
+    readonly = dict(is_signer=False, is_writable=False)
+    return Instruction(
+        RAYDIUM_LIQUIDITY_POOL,
+        data,
+        [
+            AccountMeta(TOKEN_PROGRAM_ID, **readonly),
+            AccountMeta(keys["id"], **writable),
+            AccountMeta(AMM_V4_AUTHORITY, **readonly),
+            AccountMeta(keys["openOrders"], **writable),
+            AccountMeta(keys["targetOrders"], **writable),
+            AccountMeta(keys["baseVault"], **writable),
+            AccountMeta(keys["quoteVault"], **writable),
+            AccountMeta(keys["marketProgramId"], **readonly),
+            AccountMeta(keys["marketId"], **writable),
+            AccountMeta(keys["marketBids"], **writable),
+            AccountMeta(keys["marketAsks"], **writable),
+            AccountMeta(keys["marketEventQueue"], **writable),
+            AccountMeta(keys["marketBaseVault"], **writable),
+            AccountMeta(keys["marketQuoteVault"], **writable),
+            AccountMeta(keys["marketAuthority"], **readonly),
+            AccountMeta(token_account_in, **writable),
+            AccountMeta(token_account_out, **writable),
+            AccountMeta(owner, is_signer=True, is_writable=False),
+        ],
+    )
+
+
+class AmmV4Pools:
+    """
+    v4 pool keys, by pool and by mint.
+
+    Pools of a mint are discovered with ``getProgramAccounts`` (pool account
+    size plus the mint and a quote mint as base/quote) the first time the
+    mint is asked for, then kept for the life of the process.
+    """
+
+    def __init__(
+        self, client: TransportClient, quote_mints: Sequence = POOL_QUOTE_MINTS
+    ) -> None:
+        self.client = client
+        self.quote_mints = [Pubkey.from_string(str(mint)) for mint in quote_mints]
+        self._keys: Dict[str, dict] = {}
+        self._by_mint: Dict[str, List[str]] = {}
+        self._discovering: Dict[str, asyncio.Future] = {}
+
+    def __contains__(self, pool) -> bool:
+        return str(pool) in self._keys
+
+    async def _decode_many(self, pools: Sequence[Pubkey], amm_accounts: Sequence) -> List[dict]:
+        markets = await get_multiple_accounts(
+            self.client,
+            [
+                FAST_AMM_INFO_LAYOUT_V4_1.decode(data).pubkey("serumMarket")
+                for data in amm_accounts
+            ],
+        )
+        decoded = []
+        for pool, amm_data, market in zip(pools, amm_accounts, markets):
+            if market is None:
+                continue
+            keys = self._keys[str(pool)] = decode_pool(pool, amm_data, bytes(market.data))
+            decoded.append(keys)
+        return decoded
+
+    async def keys(self, pool) -> dict:
+        """Swap keys of ``pool``, fetched on first use."""
+        keys = self._keys.get(str(pool))
+        if keys is None:
+            pool = Pubkey.from_string(str(pool))
+            account = (await self.client.get_account_info(pool)).value
+            if account is None:
+                raise ValueError(f"AMM v4 pool {pool} not found")
+            decoded = await self._decode_many([pool], [bytes(account.data)])
+            if not decoded:
+                raise ValueError(f"Market of AMM v4 pool {pool} not found")
+            keys = decoded[0]
+        return keys
+
+    async def _discover(self, mint: Pubkey) -> List[str]:
+        found: Dict[str, bytes] = {}
+        for quote in self.quote_mints:
+            for mint_offset, quote_offset in (
+                (BASE_MINT_OFFSET, QUOTE_MINT_OFFSET),
+                (QUOTE_MINT_OFFSET, BASE_MINT_OFFSET),
+            ):
+                accounts = await self.client.transport.request_json(
+                    "getProgramAccounts",
+                    [
+                        str(RAYDIUM_LIQUIDITY_POOL),
+                        {
+                            "encoding": "base64",
+                            "filters": [
+                                {"dataSize": AMM_V4_ACCOUNT_SIZE},
+                                {"memcmp": {"offset": mint_offset, "bytes": str(mint)}},
+                                {"memcmp": {"offset": quote_offset, "bytes": str(quote)}},
+                            ],
+                        },
+                    ],
+                )
+                for entry in accounts:
+                    found[entry["pubkey"]] = entry["account"]["data"][0]
+        pools = [Pubkey.from_string(pool) for pool in found]
+        decoded = await self._decode_many(
+            pools, [base64.b64decode(data) for data in found.values()]
+        )
+        self._by_mint[str(mint)] = [str(keys["id"]) for keys in decoded]
+        return self._by_mint[str(mint)]
+
+    async def pools_for(self, mint) -> List[dict]:
+        """Keys of every swappable v4 pool pairing ``mint`` with a quote mint."""
+        mint = Pubkey.from_string(str(mint))
+        pools = self._by_mint.get(str(mint))
+        if pools is None:
+            # Concurrent sells of a new mint share one discovery
+            discovering = self._discovering.get(str(mint))
+            if discovering is None:
+                discovering = self._discovering[str(mint)] = asyncio.ensure_future(
+                    self._discover(mint)
+                )
+                discovering.add_done_callback(
+                    lambda _: self._discovering.pop(str(mint), None)
+                )
+            pools = await asyncio.shield(discovering)
+        return [
+            self._keys[pool]
+            for pool in pools
+            if self._keys[pool]["status"] in SWAPPABLE_STATUSES
+        ]
@@ -1,6 +1,9 @@
-from solana.rpc.async_api import AsyncClient
+import asyncio
+from typing import Callable, Optional, Tuple
+
 from solana.rpc.types import TokenAccountOpts
 from solders.pubkey import Pubkey  # type: ignore
+from solders.instruction import Instruction  # type: ignore
 from solders.keypair import Keypair  # type: ignore
 from spl.token.instructions import (
     get_associated_token_address,
@@ -8,22 +11,77 @@ from spl.token.instructions import (
 )
 
 from loguru import logger
-from utils.config import (
-    LAMPORTS_PER_SOL,
-    RPC_NODE,
-)
-from utils.extractor import CPMM_POOL_INFO_LAYOUT
+from utils.config import LAMPORTS_PER_SOL
+from utils.blockhash import BlockhashProvider
+from utils.cache import PoolCache
+from utils.fastlayout import FAST_CPMM_POOL_INFO_LAYOUT
+from utils.fees import FeeOracle
+from utils.journal import TradeJournal
+from utils.lookup import LookupTableManager
+from utils.metrics import METRICS
+from utils.pools import PoolRegistry
+from utils.quote import CpmmFees
+from utils.signing import Signer
+from utils.submit import TransactionSubmitter
+from utils.transport import make_client
+from utils.wallets import parse_keypair
+
+
+def create_associated_token_account_idempotent(
+    payer: Pubkey, owner: Pubkey, mint: Pubkey
+) -> Instruction:
+    """CreateIdempotent variant of create_associated_token_account (no-op if it exists)."""
+    instruction = create_associated_token_account(payer, owner, mint)
+    return Instruction(instruction.program_id, bytes([1]), instruction.accounts)
 
 
 class SolanaClient:
-    client = AsyncClient(RPC_NODE)
+    client = make_client()
+    pool_cache = PoolCache()
+    blockhash = BlockhashProvider(client, on_slot=pool_cache.observe_slot)
+    submitter = TransactionSubmitter(client, blockhash)
+    fees = FeeOracle(client)
+    lookup_tables = LookupTableManager(client)
+    pools = PoolRegistry(client)
+    signer = Signer()
+    journal = TradeJournal()
+    amm_configs = {}
 
-    def __init__(self, keys: str = None) -> None:
-        try:
-            self.keypair = Keypair.from_base58_string(str(keys))
-            # logger.info(f"Keypair successfully initialized.{self.keypair.pubkey()}")
-        except Exception as e:
-            logger.error("Class instance error")
+    def __init__(
+        self,
+        keys: str = None,
+        keypair: Keypair = None,
+        pubkey: Pubkey = None,
+        load_keypair: Callable[[], Optional[Keypair]] = None,
+    ) -> None:
+        """
+        ``keys`` is a base58 secret key, or pass a parsed ``keypair``. A
+        WalletRegistry passes the wallet's ``pubkey`` and a ``load_keypair``
+        callback instead, so the secret key is only parsed on first use.
+        """
+        self.token_accounts = {}
+        self.associated_accounts = {}
+        # Position in the wallet file, when the client came from a WalletRegistry
+        self.wallet_index = None
+        self._keypair = keypair
+        self._load_keypair = load_keypair
+        self.pubkey: Optional[Pubkey] = keypair.pubkey() if keypair else pubkey
+        if keypair is None and load_keypair is None:
+            try:
+                # from_base58_string panics (BaseException) on malformed keys
+                self._keypair = parse_keypair(str(keys))
+                self.pubkey = self._keypair.pubkey()
+                # logger.info(f"Keypair successfully initialized.{self.keypair.pubkey()}")
+            except ValueError as e:
+                logger.error("Class instance error")
+
+    @property
+    def keypair(self) -> Optional[Keypair]:
+        """The wallet's keypair (None for an invalid key), parsed on first use."""
+        if self._load_keypair is not None:
+            self._keypair = self._load_keypair()
+            self._load_keypair = None
+        return self._keypair
 
     async def check_health(self):
         """
@@ -43,14 +101,29 @@ class SolanaClient:
         balance = await self.client.get_balance(self.keypair.pubkey())
         return balance.value / LAMPORTS_PER_SOL
 
+    def associated_token_address(self, mint: Pubkey) -> Pubkey:
+        """ATA of this wallet for ``mint``, derived once per mint."""
+        address = self.associated_accounts.get(str(mint))
+        if address is None:
+            address = self.associated_accounts[str(mint)] = (
+                get_associated_token_address(self.pubkey, mint)
+            )
+        return address
+
     async def check_token_balance(self, mint: str):
-        _pubkey = self.keypair.pubkey()
-        associate_token_address = get_associated_token_address(_pubkey, mint)
+        associate_token_address = self.associated_token_address(mint)
         token_balance = await self.client.get_token_account_balance(
             associate_token_address
         )
         return token_balance.value.ui_amount
 
+    async def token_amount(self, mint: str) -> Tuple[int, int]:
+        """Raw token balance of the wallet's associated account, and the mint's decimals."""
+        balance = await self.client.get_token_account_balance(
+            self.associated_token_address(mint)
+        )
+        return int(balance.value.amount), balance.value.decimals
+
     async def get_token_accounts(self, mint: str):
         _pubkey = self.keypair.pubkey()
         try:
@@ -70,32 +143,74 @@ class SolanaClient:
             return token_account, token_account_instructions
 
     async def get_token_account(self, mint: str):
-        return (
-            (
-                await self.client.get_token_accounts_by_owner_json_parsed(
-                    self.keypair.pubkey(),
-                    TokenAccountOpts(mint=mint),
+        token_account = self.token_accounts.get(str(mint))
+        if token_account is None:
+            token_account = self.token_accounts[str(mint)] = (
+                (
+                    await self.client.get_token_accounts_by_owner_json_parsed(
+                        self.keypair.pubkey(),
+                        TokenAccountOpts(mint=mint),
+                    )
                 )
+                .value[0]
+                .pubkey
             )
-            .value[0]
-            .pubkey
-        )
+        return token_account
+
+    async def amm_config(self, config_id: Pubkey) -> CpmmFees:
+        """Fee rates of a CPMM config account (fetched once per config)."""
+        fees = self.amm_configs.get(str(config_id))
+        if fees is None:
+            account = (await self.client.get_account_info(config_id)).value
+            fees = self.amm_configs[str(config_id)] = CpmmFees.from_account(account.data)
+        return fees
+
+    async def pool_keys(self, amm_id: str):
+        """
+        Returns the immutable keys of a pool (config, vaults, mints, observation).
+
+        These never change for a pool, so after the first fetch no RPC call is
+        made, and none at all for pools in the pool registry. Only that fetch
+        counts as a pool cache miss.
+        """
+        keys = self.pool_cache.keys(amm_id)
+        if keys is None:
+            keys = self.pools.keys(amm_id)
+        if keys is None:
+            keys = await self.pool_info(amm_id, refresh=True)
+        return keys
 
-    async def pool_info(self, amm_id: str):
-        amm_data = (await self.client.get_account_info_json_parsed(amm_id)).value.data
-        pool = CPMM_POOL_INFO_LAYOUT.parse(amm_data)
+    async def pool_info(self, amm_id: str, refresh: bool = False):
+        cache = self.pool_cache
+        if not refresh:
+            cached = cache.get(amm_id)
+            if cached is not None:
+                return cached
+        # Concurrent misses on one pool (every wallet's first sell) share a read
+        key, fetches = str(amm_id), cache.fetching
+        fetching = fetches.get(key)
+        if fetching is None:
+            cache.misses += 1
+            fetching = fetches[key] = asyncio.ensure_future(self._fetch_pool(amm_id))
+            fetching.add_done_callback(lambda _: fetches.pop(key, None))
+        return await asyncio.shield(fetching)
+
+    async def _fetch_pool(self, amm_id: str) -> dict:
+        response = await self.client.get_account_info_json_parsed(amm_id)
+        amm_data = response.value.data
+        pool = FAST_CPMM_POOL_INFO_LAYOUT.decode(amm_data)
 
         pool_keys = {
-            "configId": Pubkey.from_bytes(pool.configId),
-            "poolCreator": Pubkey.from_bytes(pool.poolCreator),
-            "vaultA": Pubkey.from_bytes(pool.vaultA),
-            "vaultB": Pubkey.from_bytes(pool.vaultB),
-            "mintLp": Pubkey.from_bytes(pool.mintLp),
-            "mintA": Pubkey.from_bytes(pool.mintA),
-            "mintB": Pubkey.from_bytes(pool.mintB),
-            "mintProgramA": Pubkey.from_bytes(pool.mintProgramA),
-            "mintProgramB": Pubkey.from_bytes(pool.mintProgramB),
-            "observationId": Pubkey.from_bytes(pool.observationId),
+            "configId": pool.pubkey("configId"),
+            "poolCreator": pool.pubkey("poolCreator"),
+            "vaultA": pool.pubkey("vaultA"),
+            "vaultB": pool.pubkey("vaultB"),
+            "mintLp": pool.pubkey("mintLp"),
+            "mintA": pool.pubkey("mintA"),
+            "mintB": pool.pubkey("mintB"),
+            "mintProgramA": pool.pubkey("mintProgramA"),
+            "mintProgramB": pool.pubkey("mintProgramB"),
+            "observationId": pool.pubkey("observationId"),
             "bump": pool.bump,
             "status": pool.status,
             "lpDecimals": pool.lpDecimals,
@@ -108,4 +223,22 @@ class SolanaClient:
             "fundFeesMintB": pool.fundFeesMintB,
             "openTime": pool.openTime,
         }
+        self.pool_cache.put(amm_id, pool_keys, response.context.slot)
         return pool_keys
+
+
+METRICS.callback(
+    "pool_cache_hits_total",
+    "Pool lookups served from cache",
+    lambda: SolanaClient.pool_cache.hits,
+)
+METRICS.callback(
+    "pool_cache_misses_total",
+    "Pool lookups that went to the RPC",
+    lambda: SolanaClient.pool_cache.misses,
+)
+METRICS.callback(
+    "pool_cache_evictions_total",
+    "Pools evicted from the cache",
+    lambda: SolanaClient.pool_cache.evictions,
+)
@@ -0,0 +1,116 @@
+import asyncio
+import time
+from typing import Callable, Optional, Tuple
+
+from loguru import logger
+from solana.rpc.async_api import AsyncClient
+from solders.hash import Hash  # type: ignore
+
+from utils.config import BLOCKHASH_EXPIRY_MARGIN, BLOCKHASH_REFRESH_INTERVAL
+
+MAX_PROCESSING_AGE = 150
+"""Blocks a blockhash stays valid for after it is returned by the RPC"""
+
+SLOT_TIME = 0.4
+"""Target seconds per slot, used to estimate the current block height"""
+
+
+class BlockhashProvider:
+    """
+    Keeps a recent blockhash warm for every transaction builder.
+
+    A background task refreshes the hash every ``interval`` seconds. The
+    current block height is estimated from the time since the last fetch, and
+    a hash within ``expiry_margin`` blocks of its ``last_valid_block_height``
+    is refetched before it is handed out. The slot of every fetch is passed
+    to ``on_slot``, which keeps the pool cache's slot age moving.
+    """
+
+    def __init__(
+        self,
+        client: AsyncClient,
+        interval: float = BLOCKHASH_REFRESH_INTERVAL,
+        expiry_margin: int = BLOCKHASH_EXPIRY_MARGIN,
+        on_slot: Optional[Callable[[int], None]] = None,
+    ) -> None:
+        self.client = client
+        self.interval = interval
+        self.expiry_margin = expiry_margin
+        self.on_slot = on_slot
+        self.blockhash: Optional[Hash] = None
+        self.last_valid_block_height = 0
+        self.fetched_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def block_height(self) -> int:
+        """
+        Estimated current block height. It counts every SLOT_TIME as a block,
+        so it runs ahead of the chain when slots are skipped: good for
+        refetching early, never proof that a blockhash has expired.
+        """
+        elapsed = time.monotonic() - self.fetched_at
+        fetched_height = self.last_valid_block_height - MAX_PROCESSING_AGE
+        return fetched_height + int(elapsed / SLOT_TIME)
+
+    @property
+    def blocks_left(self) -> int:
+        if self.blockhash is None:
+            return 0
+        return self.last_valid_block_height - self.block_height
+
+    def current(self) -> Optional[Hash]:
+        """The cached blockhash, without waiting (None if stale or missing)."""
+        if self.blocks_left <= self.expiry_margin:
+            return None
+        return self.blockhash
+
+    async def refresh(self) -> Hash:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        fetched_at = time.monotonic()
+        async with self._lock:
+            # Another caller refreshed while we waited for the lock
+            if self.fetched_at >= fetched_at:
+                return self.blockhash
+            response = await self.client.get_latest_blockhash()
+            self.blockhash = response.value.blockhash
+            self.last_valid_block_height = response.value.last_valid_block_height
+            self.fetched_at = time.monotonic()
+            if self.on_slot is not None:
+                self.on_slot(response.context.slot)
+        return self.blockhash
+
+    async def latest(self) -> Hash:
+        """A blockhash safe to sign with; only hits the RPC when the cache is cold or expiring."""
+        return (await self.latest_with_expiry())[0]
+
+    async def latest_with_expiry(self) -> Tuple[Hash, int]:
+        """Like ``latest``, plus the last block height the hash is valid for."""
+        self.start()
+        if self.current() is None:
+            await self.refresh()
+        return self.blockhash, self.last_valid_block_height
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Blockhash refresh failed: {e!r}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._lock = asyncio.Lock()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
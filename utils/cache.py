@@ -0,0 +1,145 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from utils.config import POOL_CACHE_SIZE, POOL_STATE_MAX_SLOTS, POOL_STATE_TTL
+
+
+POOL_KEY_FIELDS = (
+    "configId",
+    "poolCreator",
+    "vaultA",
+    "vaultB",
+    "mintLp",
+    "mintA",
+    "mintB",
+    "mintProgramA",
+    "mintProgramB",
+    "observationId",
+    "bump",
+    "lpDecimals",
+    "mintDecimalA",
+    "mintDecimalB",
+)
+"""CPMM pool fields fixed at pool creation"""
+
+POOL_STATE_FIELDS = (
+    "status",
+    "lpAmount",
+    "protocolFeesMintA",
+    "protocolFeesMintB",
+    "fundFeesMintA",
+    "fundFeesMintB",
+    "openTime",
+)
+"""CPMM pool fields that change while the pool trades"""
+
+
+class _PoolEntry:
+    __slots__ = ("keys", "state", "slot", "fetched_at")
+
+    def __init__(self, keys: dict, state: dict, slot: int, fetched_at: float):
+        self.keys = keys
+        self.state = state
+        self.slot = slot
+        self.fetched_at = fetched_at
+
+
+class PoolCache:
+    """LRU cache of decoded CPMM pools.
+
+    Immutable keys (config, vaults, mints, observation) are kept for as long
+    as the pool stays in the cache. Mutable state is only served while it is
+    younger than ``ttl`` seconds and ``max_slot_age`` slots behind the newest
+    slot the cache has seen, from its own reads, pool watchers and the
+    blockhash prefetcher. ``fetching`` holds the reads in flight, so that
+    callers missing on the same pool at once share one of them. Misses are
+    counted by the caller, once per RPC read.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = POOL_CACHE_SIZE,
+        ttl: float = POOL_STATE_TTL,
+        max_slot_age: int = POOL_STATE_MAX_SLOTS,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_slot_age = max_slot_age
+        self.latest_slot = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, _PoolEntry]" = OrderedDict()
+        self.fetching: Dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, amm_id) -> bool:
+        return str(amm_id) in self._entries
+
+    def observe_slot(self, slot: int) -> None:
+        """Record a slot seen elsewhere (e.g. another RPC response)."""
+        if slot and slot > self.latest_slot:
+            self.latest_slot = slot
+
+    def _lookup(self, amm_id) -> Optional[_PoolEntry]:
+        entry = self._entries.get(str(amm_id))
+        if entry is not None:
+            self._entries.move_to_end(str(amm_id))
+        return entry
+
+    def _is_fresh(self, entry: _PoolEntry) -> bool:
+        if time.monotonic() - entry.fetched_at > self.ttl:
+            return False
+        return self.latest_slot - entry.slot <= self.max_slot_age
+
+    def keys(self, amm_id) -> Optional[dict]:
+        """Immutable pool keys, regardless of how old the state is."""
+        entry = self._lookup(amm_id)
+        if entry is None:
+            return None
+        self.hits += 1
+        return entry.keys
+
+    def get(self, amm_id) -> Optional[dict]:
+        """Full pool info if the mutable state is still fresh."""
+        entry = self._lookup(amm_id)
+        if entry is None or not self._is_fresh(entry):
+            return None
+        self.hits += 1
+        return {**entry.keys, **entry.state}
+
+    def put(self, amm_id, pool: dict, slot: int = 0) -> None:
+        self.observe_slot(slot)
+        key = str(amm_id)
+        state = {field: pool[field] for field in POOL_STATE_FIELDS}
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.state = state
+            entry.slot = slot
+            entry.fetched_at = time.monotonic()
+            self._entries.move_to_end(key)
+            return
+        keys = {field: pool[field] for field in POOL_KEY_FIELDS}
+        self._entries[key] = _PoolEntry(keys, state, slot, time.monotonic())
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, amm_id=None) -> None:
+        """Drop one pool, or every pool when ``amm_id`` is None."""
+        if amm_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(str(amm_id), None)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -7,12 +7,59 @@ from solders.pubkey import Pubkey  # type: ignore
 
 BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
 KEYS_PATH = os.path.join(BASE_DIR, "Wallets.txt")
+WALLET_INDEX_PATH = os.path.join(BASE_DIR, "Wallets.idx")
+LOOKUP_TABLE_PATH = os.path.join(BASE_DIR, "LookupTables.json")
+POOL_INDEX_PATH = os.path.join(BASE_DIR, "Pools.idx")
+SIMULATION_SNAPSHOT_PATH = os.path.join(BASE_DIR, "Snapshot.json")
 # Load our environment variables
 load_dotenv(os.path.join(BASE_DIR, ".env"))
 
 RPC_NODE = os.getenv("RPC")
 """ RPC Node url"""
 
+RPC_NODES = [
+    url.strip() for url in os.getenv("RPC_NODES", RPC_NODE or "").split(",") if url.strip()
+]
+"""All RPC node urls, comma separated (defaults to RPC)"""
+
+RPC_TIMEOUT = float(os.getenv("RPC_TIMEOUT", 10))
+RPC_MAX_CONNECTIONS = int(os.getenv("RPC_MAX_CONNECTIONS", 100))
+RPC_MAX_KEEPALIVE = int(os.getenv("RPC_MAX_KEEPALIVE", 20))
+RPC_KEEPALIVE_EXPIRY = float(os.getenv("RPC_KEEPALIVE_EXPIRY", 30))
+"""httpx connection pool settings, per RPC endpoint"""
+
+RPC_HEDGE = os.getenv("RPC_HEDGE", "1") not in ("0", "false", "False", "")
+"""Duplicate slow read calls onto the next fastest endpoint"""
+
+RPC_HEDGE_MIN_DELAY = float(os.getenv("RPC_HEDGE_MIN_DELAY", 0.05))
+"""Never hedge a call that has been pending for less than this many seconds"""
+
+RPC_HEALTH_INTERVAL = float(os.getenv("RPC_HEALTH_INTERVAL", 15))
+"""Seconds between /health checks of every RPC endpoint"""
+
+RPC_CREDITS_PER_SEC = float(os.getenv("RPC_CREDITS_PER_SEC", 0))
+"""Sustained RPC credit quota of the provider (0 disables the budget)"""
+
+RPC_CREDITS_BURST = float(os.getenv("RPC_CREDITS_BURST", 0)) or RPC_CREDITS_PER_SEC
+"""Credits that may be spent at once after an idle period"""
+
+RPC_METHOD_COSTS = {
+    method.strip(): float(cost)
+    for method, _, cost in (
+        item.partition("=") for item in os.getenv("RPC_METHOD_COSTS", "").split(",")
+    )
+    if method.strip() and cost
+}
+"""Per-method credit overrides, e.g. ``getProgramAccounts=10,sendTransaction=2``"""
+
+WS_NODE = os.getenv("WS") or (RPC_NODES[0] if RPC_NODES else "http://localhost:8899").replace(
+    "http", "ws", 1
+)
+""" Websocket RPC url (defaults to the first RPC url with a ws scheme)"""
+
+WATCHER_MAX_BACKOFF = float(os.getenv("WATCHER_MAX_BACKOFF", 30))
+"""Maximum seconds between websocket reconnect attempts"""
+
 LAMPORTS_PER_SOL = 1_000_000_000  # canalso be 10**9
 """Number of decimals for WSOL"""
 
@@ -48,9 +95,141 @@ UNIT_PRICE = 10_000_000
 UNIT_BUDGET = 100_000
 TOKEN_SUPPLY = 1_000_000_000
 
+WSOL_PERSISTENT = os.getenv("WSOL_PERSISTENT", "0") not in ("0", "false", "False", "")
+"""Keep each wallet's wSOL account open instead of creating/closing it on every sell"""
+
+WSOL_UNWRAP_INTERVAL = float(os.getenv("WSOL_UNWRAP_INTERVAL", 600))
+"""Seconds between batched unwraps in persistent wSOL mode (daemon)"""
+
+WSOL_UNWRAP_MIN_SOL = float(os.getenv("WSOL_UNWRAP_MIN_SOL", 0.05))
+"""Only unwrap wSOL accounts holding at least this much"""
+
+WSOL_UNWRAP_BATCH = int(os.getenv("WSOL_UNWRAP_BATCH", 6))
+"""Wallets unwrapped per transaction (each adds a signature)"""
+
+FEE_ORACLE = os.getenv("FEE_ORACLE", "1") not in ("0", "false", "False", "")
+"""Size priority fees and compute limits from the network instead of UNIT_PRICE/UNIT_BUDGET"""
+
+FEE_LANDING_PROBABILITY = float(os.getenv("FEE_LANDING_PROBABILITY", 0.75))
+"""Target share of recent slots in which the chosen priority fee would have landed"""
+
+FEE_CACHE_TTL = float(os.getenv("FEE_CACHE_TTL", 5))
+"""Seconds recent priority fees are cached per account set"""
+
+FEE_MIN_PRICE = int(os.getenv("FEE_MIN_PRICE", 10_000))
+FEE_MAX_PRICE = int(os.getenv("FEE_MAX_PRICE", UNIT_PRICE))
+"""Bounds of the compute unit price, in micro-lamports per unit"""
+
+FEE_STEP_MULTIPLIER = float(os.getenv("FEE_STEP_MULTIPLIER", 1.5))
+"""Price multiplier for each resubmission of an expired sell"""
+
+FEE_MAX_ATTEMPTS = int(os.getenv("FEE_MAX_ATTEMPTS", 3))
+"""Times a sell is signed and submitted before giving up on expiry"""
+
+FEE_CU_MARGIN = float(os.getenv("FEE_CU_MARGIN", 0.15))
+"""Headroom added to simulated compute units"""
+
+SELL_SLIPPAGE_BPS = int(os.getenv("SELL_SLIPPAGE_BPS", 100))
+"""Slippage tolerance for the min output of a sell, in basis points"""
+
+SELL_WATCH_POOL = os.getenv("SELL_WATCH_POOL", "1") not in ("0", "false", "False", "")
+"""Quote sells on a fixed CPMM pool from a PoolWatcher instead of reading the pool per sell"""
+
+SELL_CONCURRENCY = int(os.getenv("SELL_CONCURRENCY", 32))
+"""Maximum number of wallets selling at the same time"""
+
+SELL_RESULTS_KEPT = int(os.getenv("SELL_RESULTS_KEPT", 10_000))
+"""Most recent sell results kept for latency percentiles (counts are kept in full)"""
+
+POOL_CACHE_SIZE = int(os.getenv("POOL_CACHE_SIZE", 1024))
+"""Number of pools kept in the pool cache"""
+
+POOL_STATE_TTL = float(os.getenv("POOL_STATE_TTL", 10))
+"""Seconds before cached pool state (status, fees, openTime) is refetched"""
+
+POOL_STATE_MAX_SLOTS = int(os.getenv("POOL_STATE_MAX_SLOTS", 25))
+"""Slots cached pool state may lag the newest observed slot"""
+
+BLOCKHASH_REFRESH_INTERVAL = float(os.getenv("BLOCKHASH_REFRESH_INTERVAL", 2))
+"""Seconds between background blockhash refreshes"""
+
+BLOCKHASH_EXPIRY_MARGIN = int(os.getenv("BLOCKHASH_EXPIRY_MARGIN", 60))
+"""Refetch a blockhash once it has fewer than this many blocks left"""
+
+SEND_REBROADCAST_INTERVAL = float(os.getenv("SEND_REBROADCAST_INTERVAL", 2))
+"""Seconds between rebroadcasts of a transaction that has not been seen yet"""
+
+SEND_POLL_INTERVAL = float(os.getenv("SEND_POLL_INTERVAL", 0.5))
+"""Seconds between getSignatureStatuses polls of pending transactions"""
+
+SEND_CONFIRM_TIMEOUT = float(os.getenv("SEND_CONFIRM_TIMEOUT", 90))
+"""Give up waiting for a confirmation after this many seconds"""
+
+TEMPLATE_CACHE_SIZE = int(os.getenv("TEMPLATE_CACHE_SIZE", 4096))
+"""Number of precompiled swap transactions kept per process"""
+
+SCHEDULER_INTERVAL = float(os.getenv("SCHEDULER_INTERVAL", 60))
+"""Average seconds between two sells of the same wallet in daemon mode"""
+
+SCHEDULER_JITTER = float(os.getenv("SCHEDULER_JITTER", 0.2))
+"""Random spread of each interval, as a fraction of it"""
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+"""Port of the Prometheus text endpoint (0 disables it)"""
+
+METRICS_FILE = os.getenv("METRICS_FILE", "")
+"""File the metrics are written to every METRICS_INTERVAL seconds"""
+
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", 15))
+"""Seconds between metric file dumps"""
+
+METRICS_ENABLED = os.getenv("METRICS", "0") not in ("0", "false", "False", "") or bool(
+    METRICS_PORT or METRICS_FILE
+)
+"""Record metrics (implied by METRICS_PORT or METRICS_FILE)"""
+
+SCHEDULER_DRAIN_TIMEOUT = float(os.getenv("SCHEDULER_DRAIN_TIMEOUT", 120))
+"""Seconds to let in-flight sells finish on shutdown before cancelling them"""
+
+POOL_QUOTE_MINTS = [
+    mint.strip() for mint in os.getenv("POOL_QUOTE_MINTS", WSOL).split(",") if mint.strip()
+]
+"""Mints the pool registry indexes pools against (sells swap into these)"""
+
+POOL_REFRESH_INTERVAL = float(os.getenv("POOL_REFRESH_INTERVAL", 900))
+"""Seconds between incremental pool index refreshes in daemon mode"""
+
+ROUTE_SELLS = os.getenv("ROUTE_SELLS", "1") not in ("0", "false", "False", "")
+"""Sell a mint without a fixed pool on the CPMM or AMM v4 pool with the best output"""
+
+LOOKUP_TABLES = os.getenv("LOOKUP_TABLES", "1") not in ("0", "false", "False", "")
+"""Compile sells against the pool's address lookup table when one is known"""
+
+SIGNING_WORKERS = int(os.getenv("SIGNING_WORKERS", 0))
+"""Processes signing sell transactions off the event loop (0 = sign inline)"""
+
+SIGNING_MODE = os.getenv("SIGNING_MODE", "process")
+"""Signing pool kind: "process", or "thread" (signing holds the GIL, so threads only move it off the loop)"""
+
+SIGNING_BATCH = int(os.getenv("SIGNING_BATCH", 64))
+"""Sign requests handed to a signing worker at once"""
+
+SIGNING_BATCH_DELAY = float(os.getenv("SIGNING_BATCH_DELAY", 0.002))
+"""Seconds a sign request may wait for a batch to fill"""
+
+JOURNAL_PATH = os.getenv("JOURNAL_PATH", "Trades.journal")
+JOURNAL_PATH = JOURNAL_PATH and os.path.join(BASE_DIR, JOURNAL_PATH)
+"""Binary journal of every sell attempt, relative to the repository root (empty disables it)"""
+
+JOURNAL_FLUSH_BYTES = int(os.getenv("JOURNAL_FLUSH_BYTES", 64 * 1024))
+"""Buffered trade journal bytes that trigger a write"""
+
+JOURNAL_FLUSH_INTERVAL = float(os.getenv("JOURNAL_FLUSH_INTERVAL", 1.0))
+"""Longest seconds a trade journal record stays buffered in memory"""
+
 
 def read_private_keys():
     with open(KEYS_PATH, "r") as file:
-        return [line.strip() for line in file.readlines()]
+        return [line.strip() for line in file.readlines() if line.strip()]
 
 
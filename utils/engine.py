@@ -0,0 +1,254 @@
+import asyncio
+import time
+from collections import deque
+from functools import partial
+from typing import Callable, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from loguru import logger
+from solders.pubkey import Pubkey  # type: ignore
+
+from utils import wsol
+from utils.config import (
+    POOL_REFRESH_INTERVAL,
+    SCHEDULER_INTERVAL,
+    SELL_CONCURRENCY,
+    SELL_RESULTS_KEPT,
+    SELL_WATCH_POOL,
+    WSOL_PERSISTENT,
+    WSOL_UNWRAP_INTERVAL,
+    WS_NODE,
+)
+from utils.raydium import RaydiumClient
+from utils.scheduler import Scheduler
+from utils.snapshot import WalletBalance, fleet_snapshot
+from utils.wallets import WalletRegistry
+from utils.watcher import PoolWatcher
+
+
+class SellResult(NamedTuple):
+    """Outcome of a single wallet sell"""
+
+    wallet: Optional[Pubkey]
+    amount: int
+    started: float
+    elapsed: float
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+class SellEngine:
+    """Runs balance check, sizing and sell for a whole fleet of wallets at once.
+
+    Every wallet gets its own task; a semaphore caps how many are in flight so
+    a slow RPC call only holds up its own wallet. Failures are recorded per
+    wallet and never cancel the rest of the run. Without a ``pair`` every sell
+    goes through the mint's deepest pool in the pool registry. With one, ``watch``
+    follows it so sells quote their min output without reading the pool.
+    """
+
+    def __init__(
+        self,
+        keys: Union[WalletRegistry, Iterable[str]],
+        pair: Optional[Pubkey],
+        mint: Pubkey,
+        sizer: Callable[[float], float],
+        concurrency: int = SELL_CONCURRENCY,
+    ) -> None:
+        self.pair = pair
+        self.mint = mint
+        self.sizer = sizer
+        self.concurrency = max(1, int(concurrency))
+        if isinstance(keys, WalletRegistry):
+            self.clients = keys.clients(RaydiumClient)
+        else:
+            self.clients = [RaydiumClient(keys=key) for key in keys]
+            for index, client in enumerate(self.clients):
+                client.wallet_index = index
+        self.balances: Dict[Pubkey, WalletBalance] = {}
+        self.watcher: Optional[PoolWatcher] = None
+        # Bounded, so a long daemon run does not grow without limit
+        self.results: Deque[SellResult] = deque(maxlen=SELL_RESULTS_KEPT)
+        self.succeeded = 0
+        self.failed = 0
+        self.elapsed = 0.0
+
+    def record(self, result: SellResult) -> None:
+        self.results.append(result)
+        if result.ok:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+    async def token_balance(self, client: RaydiumClient) -> Tuple[int, int]:
+        """Raw token balance of ``client``'s wallet and the mint's decimals."""
+        balance = self.balances.get(client.pubkey)
+        if balance is not None:
+            return balance.token_amount, balance.decimals
+        return await client.token_amount(self.mint)
+
+    async def sell(self, client: RaydiumClient) -> SellResult:
+        started = time.perf_counter()
+        wallet = client.pubkey
+        amount = 0
+        try:
+            if wallet is None:
+                raise ValueError("Invalid private key")
+            holding, decimals = await self.token_balance(client)
+            # The sizer works in tokens; amounts are truncated to raw units and
+            # capped at the holding, as in utils.simulator.simulate
+            scale = 10**decimals
+            amount = min(int(self.sizer(holding / scale) * scale), holding)
+            if amount <= 0:
+                raise ValueError("Invalid sell amount")
+            reserves = self.watcher.live_reserves if self.watcher is not None else None
+            result = await client.make_sell_swap(
+                self.pair, amount, self.mint, reserves=reserves
+            )
+            if not result.ok:
+                raise RuntimeError(f"Transaction {result.signature} {result.status}")
+        except Exception as e:
+            logger.error(f"Sell failed for {wallet}: {e!r}")
+            return SellResult(
+                wallet, amount, started, time.perf_counter() - started, repr(e)
+            )
+        return SellResult(wallet, amount, started, time.perf_counter() - started)
+
+    async def watch(self, ws_url: str = WS_NODE) -> None:
+        """
+        Starts a PoolWatcher on the fixed CPMM pool (``SELL_WATCH_POOL``). Sells
+        quote from its reserves while it is connected and read the pool otherwise.
+        """
+        if self.pair is None or not SELL_WATCH_POOL or self.watcher is not None:
+            return
+        if self.pair in RaydiumClient.amm_v4:
+            # Watchers follow CPMM pools only
+            return
+        watcher = PoolWatcher(self.clients[0], self.pair, ws_url)
+        try:
+            await watcher.start()
+        except Exception as e:
+            logger.error(f"Pool watcher for {self.pair} did not start: {e!r}")
+            return
+        self.watcher = watcher
+
+    async def close(self) -> None:
+        """Stops the pool watcher, if any."""
+        if self.watcher is not None:
+            await self.watcher.stop()
+            self.watcher = None
+
+    async def refresh_balances(self) -> None:
+        """Snapshots every wallet balance; sells fall back to per-wallet checks on error."""
+        if WSOL_PERSISTENT:
+            await self.sync_wsol()
+        wallets = [client for client in self.clients if client.pubkey is not None]
+        owners = [client.pubkey for client in wallets]
+        token_accounts = [client.associated_token_address(self.mint) for client in wallets]
+        try:
+            self.balances = await fleet_snapshot(
+                RaydiumClient.client, owners, self.mint, token_accounts
+            )
+        except Exception as e:
+            logger.error(f"Fleet snapshot failed: {e!r}")
+            self.balances = {}
+
+    async def sync_wsol(self) -> None:
+        """
+        Learns which wallets have an open wSOL account and opens the missing
+        ones in batched transactions (persistent mode), so sells use the
+        template without the account creation.
+        """
+        try:
+            opened = await wsol.open_missing(self.clients)
+        except Exception as e:
+            logger.error(f"wSOL account sync failed: {e!r}")
+            return
+        if opened:
+            logger.info(f"Opened {opened} wSOL accounts")
+
+    async def refresh_pools(self) -> None:
+        try:
+            await RaydiumClient.pools.refresh()
+        except Exception as e:
+            logger.error(f"Pool index refresh failed: {e!r}")
+
+    async def unwrap_wsol(self) -> None:
+        try:
+            await wsol.unwrap(self.clients)
+        except Exception as e:
+            logger.error(f"wSOL unwrap failed: {e!r}")
+
+    async def run(self) -> List[SellResult]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(client: RaydiumClient) -> SellResult:
+            async with semaphore:
+                return await self.sell(client)
+
+        started = time.perf_counter()
+        await self.refresh_balances()
+        results = await asyncio.gather(*(bounded(client) for client in self.clients))
+        self.results.clear()
+        self.succeeded = self.failed = 0
+        for result in results:
+            self.record(result)
+        if WSOL_PERSISTENT:
+            await self.unwrap_wsol()
+        self.elapsed = time.perf_counter() - started
+        return results
+
+    def schedule(self, scheduler: Scheduler, interval: float = SCHEDULER_INTERVAL) -> None:
+        """
+        Registers one recurring sell per wallet, plus a balance snapshot, on ``scheduler``.
+
+        A wallet's snapshot entry is dropped once it has sold, so its next
+        sell reads a fresh balance even if the snapshot has not run again.
+        """
+
+        async def sell(client: RaydiumClient) -> None:
+            result = await self.sell(client)
+            self.balances.pop(client.pubkey, None)
+            self.record(result)
+            self.elapsed = time.monotonic() - scheduler.started
+
+        scheduler.add("balances", self.refresh_balances, interval, delay=0)
+        if self.pair is None:
+            scheduler.add("pools", self.refresh_pools, POOL_REFRESH_INTERVAL)
+        if WSOL_PERSISTENT:
+            scheduler.add("wsol-unwrap", self.unwrap_wsol, WSOL_UNWRAP_INTERVAL)
+        for client in self.clients:
+            if client.pubkey is not None:
+                scheduler.add(
+                    str(client.pubkey), partial(sell, client), interval
+                )
+
+    def summary(self) -> dict:
+        """Throughput and latency figures for the last run (latencies of the recent results)"""
+        latencies = [result.elapsed for result in self.results if result.ok]
+        return {
+            "wallets": self.succeeded + self.failed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "elapsed": self.elapsed,
+            "sells_per_sec": self.succeeded / self.elapsed if self.elapsed else 0.0,
+            "p50": percentile(latencies, 50),
+            "p99": percentile(latencies, 99),
+        }
+
+    def log_summary(self) -> None:
+        stats = self.summary()
+        logger.info(
+            f"""Sell run finished \n\nWallets: {stats['wallets']}\nSucceeded: {stats['succeeded']}\nFailed: {stats['failed']}\nElapsed: {stats['elapsed']:.2f}s\nSells/sec: {stats['sells_per_sec']:.2f}\np50: {stats['p50'] * 1000:.1f}ms\np99: {stats['p99'] * 1000:.1f}ms"""
+        )
@@ -1,6 +1,12 @@
-from io import BytesIO
+"""construct layouts of the accounts and instructions the bot reads and builds.
 
-from borsh_construct import CStruct, String, U8, U16, U64, Vec, Option, Bool, Enum
+Layouts are built on first access (PEP 562 module ``__getattr__``), so
+importing this module costs only the ``construct`` import; the borsh schema
+of the metadata instruction, the only user of ``borsh_construct``, is not
+even imported until asked for. The swap instruction layouts, built on every
+sell, are compiled with ``construct.compile``.
+"""
+from io import BytesIO
 
 from construct import (
     Bytes,
@@ -20,10 +26,15 @@ from construct import (
 )
 from construct import Struct as cStruct
 
-import base58, json
+import json
 
 from solders.pubkey import Pubkey  # type: ignore
 
+from utils.lazy import lazy_attributes
+from utils.metadata import decode_metadata
+
+PUBLIC_KEY_LAYOUT = Bytes(32)
+
 
 class MyEncoder(json.JSONEncoder):
     def default(self, o):
@@ -54,10 +65,11 @@ def convert_bytes_to_pubkey(obj):
         return obj
 
 
-def getMetaData(data):
-    decoded_info = base58.b58decode(data)
-    # structure of the instruction
-    instruction_structure = CStruct(
+def _metadata_instruction_layout():
+    """borsh schema of a CreateMetadataAccountV3 instruction (see utils.metadata for the fast decoder)"""
+    from borsh_construct import CStruct, String, U8, U16, U64, Vec, Option, Bool, Enum
+
+    return CStruct(
         "instructionDiscriminator" / U8,
         "createMetadataAccountArgsV3"
         / CStruct(
@@ -68,15 +80,12 @@ def getMetaData(data):
                 "uri" / String,
                 "sellerFeeBasisPoints" / U16,
                 "creators"
-                / Option(
-                    Vec(CStruct("address" / Bytes(32), "verified" / Bool, "share" / U8))
-                ),
+                / Option(Vec(CStruct("address" / Bytes(32), "verified" / Bool, "share" / U8))),
                 "collection" / Option(CStruct("verified" / Bool, "key" / Bytes(32))),
                 "uses"
                 / Option(
                     CStruct(
-                        "useMethod"
-                        / Enum("Burn", "Multiple", "Single", enum_name="UseMethod"),
+                        "useMethod" / Enum("Burn", "Multiple", "Single", enum_name="UseMethod"),
                         "remaining" / U64,
                         "total" / U64,
                     )
@@ -87,181 +96,228 @@ def getMetaData(data):
             / Option(String),  # fixme: string is not correct, insert correct type
         ),
     )
-    metadata = instruction_structure.parse(decoded_info)
-    # for key, value in metadata.items():
-    #     if isinstance(value, BytesIO):
-    #         metadata[key] = base64.b64encode(value.read()).decode('utf-8')
 
-    metadata = remove_bytesio(metadata)
-    metadata = convert_bytes_to_pubkey(metadata)
 
-    return json.dumps(metadata)
+def getMetaData(data):
+    return json.dumps(decode_metadata(data))
 
 
-SWAP_LAYOUT = cStruct(
-    "instruction" / Int8ul, "amount_in" / Int64ul, "min_amount_out" / Int64ul
-)
+def _amm_v4_swap_layout():
+    return cStruct(
+        "instruction" / Int8ul, "amount_in" / Int64ul, "min_amount_out" / Int64ul
+    ).compile()
 
 
-AMM_INFO_LAYOUT_V4_1 = cStruct(
-    "status" / Int64ul,
-    "nonce" / Int64ul,
-    "orderNum" / Int64ul,
-    "depth" / Int64ul,
-    "coinDecimals" / Int64ul,
-    "pcDecimals" / Int64ul,
-    "state" / Int64ul,
-    "resetFlag" / Int64ul,
-    "minSize" / Int64ul,
-    "volMaxCutRatio" / Int64ul,
-    "amountWaveRatio" / Int64ul,
-    "coinLotSize" / Int64ul,
-    "pcLotSize" / Int64ul,
-    "minPriceMultiplier" / Int64ul,
-    "maxPriceMultiplier" / Int64ul,
-    "systemDecimalsValue" / Int64ul,
-    #   // Fees
-    "minSeparateNumerator" / Int64ul,
-    "minSeparateDenominator" / Int64ul,
-    "tradeFeeNumerator" / Int64ul,
-    "tradeFeeDenominator" / Int64ul,
-    "pnlNumerator" / Int64ul,
-    "pnlDenominator" / Int64ul,
-    "swapFeeNumerator" / Int64ul,
-    "swapFeeDenominator" / Int64ul,
-    #   // OutPutData
-    "needTakePnlCoin" / Int64ul,
-    "needTakePnlPc" / Int64ul,
-    "totalPnlPc" / Int64ul,
-    "totalPnlCoin" / Int64ul,
-    "poolOpenTime" / Int64ul,
-    "punishPcAmount" / Int64ul,
-    "punishCoinAmount" / Int64ul,
-    "orderbookToInitTime" / Int64ul,
-    "swapCoinInAmount" / BytesInteger(16, signed=False, swapped=True),
-    "swapPcOutAmount" / BytesInteger(16, signed=False, swapped=True),
-    "swapCoin2PcFee" / Int64ul,
-    "swapPcInAmount" / BytesInteger(16, signed=False, swapped=True),
-    "swapCoinOutAmount" / BytesInteger(16, signed=False, swapped=True),
-    "swapPc2CoinFee" / Int64ul,
-    "poolCoinTokenAccount" / Bytes(32),
-    "poolPcTokenAccount" / Bytes(32),
-    "coinMintAddress" / Bytes(32),
-    "pcMintAddress" / Bytes(32),
-    "lpMintAddress" / Bytes(32),
-    "ammOpenOrders" / Bytes(32),
-    "serumMarket" / Bytes(32),
-    "serumProgramId" / Bytes(32),
-    "ammTargetOrders" / Bytes(32),
-    # "poolWithdrawQueue" / Bytes(32),
-    # "poolTempLpTokenAccount" / Bytes(32),
-    # "ammOwner" / Bytes(32),
-    # "pnlOwner" / Bytes(32),
-)
+def _amm_info_layout_v4_1():
+    return cStruct(
+        "status" / Int64ul,
+        "nonce" / Int64ul,
+        "orderNum" / Int64ul,
+        "depth" / Int64ul,
+        "coinDecimals" / Int64ul,
+        "pcDecimals" / Int64ul,
+        "state" / Int64ul,
+        "resetFlag" / Int64ul,
+        "minSize" / Int64ul,
+        "volMaxCutRatio" / Int64ul,
+        "amountWaveRatio" / Int64ul,
+        "coinLotSize" / Int64ul,
+        "pcLotSize" / Int64ul,
+        "minPriceMultiplier" / Int64ul,
+        "maxPriceMultiplier" / Int64ul,
+        "systemDecimalsValue" / Int64ul,
+        #   // Fees
+        "minSeparateNumerator" / Int64ul,
+        "minSeparateDenominator" / Int64ul,
+        "tradeFeeNumerator" / Int64ul,
+        "tradeFeeDenominator" / Int64ul,
+        "pnlNumerator" / Int64ul,
+        "pnlDenominator" / Int64ul,
+        "swapFeeNumerator" / Int64ul,
+        "swapFeeDenominator" / Int64ul,
+        #   // OutPutData
+        "needTakePnlCoin" / Int64ul,
+        "needTakePnlPc" / Int64ul,
+        "totalPnlPc" / Int64ul,
+        "totalPnlCoin" / Int64ul,
+        "poolOpenTime" / Int64ul,
+        "punishPcAmount" / Int64ul,
+        "punishCoinAmount" / Int64ul,
+        "orderbookToInitTime" / Int64ul,
+        "swapCoinInAmount" / BytesInteger(16, signed=False, swapped=True),
+        "swapPcOutAmount" / BytesInteger(16, signed=False, swapped=True),
+        "swapCoin2PcFee" / Int64ul,
+        "swapPcInAmount" / BytesInteger(16, signed=False, swapped=True),
+        "swapCoinOutAmount" / BytesInteger(16, signed=False, swapped=True),
+        "swapPc2CoinFee" / Int64ul,
+        "poolCoinTokenAccount" / Bytes(32),
+        "poolPcTokenAccount" / Bytes(32),
+        "coinMintAddress" / Bytes(32),
+        "pcMintAddress" / Bytes(32),
+        "lpMintAddress" / Bytes(32),
+        "ammOpenOrders" / Bytes(32),
+        "serumMarket" / Bytes(32),
+        "serumProgramId" / Bytes(32),
+        "ammTargetOrders" / Bytes(32),
+        # "poolWithdrawQueue" / Bytes(32),
+        # "poolTempLpTokenAccount" / Bytes(32),
+        # "ammOwner" / Bytes(32),
+        # "pnlOwner" / Bytes(32),
+    )
 
 
-# We will use a bitstruct with 64 bits instead of the widebits implementation in serum-js.
-ACCOUNT_FLAGS_LAYOUT = BitsSwapped(  # Swap to little endian
-    BitStruct(
-        "initialized" / Flag,
-        "market" / Flag,
-        "open_orders" / Flag,
-        "request_queue" / Flag,
-        "event_queue" / Flag,
-        "bids" / Flag,
-        "asks" / Flag,
-        Const(0, BitsInteger(57)),  # Padding
+def _account_flags_layout():
+    # We will use a bitstruct with 64 bits instead of the widebits implementation in serum-js.
+    return BitsSwapped(  # Swap to little endian
+        BitStruct(
+            "initialized" / Flag,
+            "market" / Flag,
+            "open_orders" / Flag,
+            "request_queue" / Flag,
+            "event_queue" / Flag,
+            "bids" / Flag,
+            "asks" / Flag,
+            Const(0, BitsInteger(57)),  # Padding
+        )
     )
-)
 
-MARKET_LAYOUT = cStruct(
-    Padding(5),
-    # "account_flags" / ACCOUNT_FLAGS_LAYOUT,
-    # "own_address" / Bytes(32),
-    "vault_signer_nonce" / Int64ul,
-    "base_mint" / Bytes(32),
-    "quote_mint" / Bytes(32),
-    "base_vault" / Bytes(32),
-    # "base_deposits_total" / Int64ul,
-    # "base_fees_accrued" / Int64ul,
-    "quote_vault" / Bytes(32),
-    # "quote_deposits_total" / Int64ul,
-    # "quote_fees_accrued" / Int64ul,
-    # "quote_dust_threshold" / Int64ul,
-    # "request_queue" / Bytes(32),
-    # "event_queue" / Bytes(32),
-    # "bids" / Bytes(32),
-    # "asks" / Bytes(32),
-    # "base_lot_size" / Int64ul,
-    # "quote_lot_size" / Int64ul,
-    # "fee_rate_bps" / Int64ul,
-    # "referrer_rebate_accrued" / Int64ul,
-    Padding(7),
-)
 
-MINT_LAYOUT = cStruct(Padding(44), "decimals" / Int8ul, Padding(37))
+def _market_layout():
+    return cStruct(
+        Padding(5),
+        # ACCOUNT_FLAGS_LAYOUT, read as a plain u64
+        "account_flags" / Int64ul,
+        "own_address" / Bytes(32),
+        "vault_signer_nonce" / Int64ul,
+        "base_mint" / Bytes(32),
+        "quote_mint" / Bytes(32),
+        "base_vault" / Bytes(32),
+        "base_deposits_total" / Int64ul,
+        "base_fees_accrued" / Int64ul,
+        "quote_vault" / Bytes(32),
+        "quote_deposits_total" / Int64ul,
+        "quote_fees_accrued" / Int64ul,
+        "quote_dust_threshold" / Int64ul,
+        "request_queue" / Bytes(32),
+        "event_queue" / Bytes(32),
+        "bids" / Bytes(32),
+        "asks" / Bytes(32),
+        "base_lot_size" / Int64ul,
+        "quote_lot_size" / Int64ul,
+        "fee_rate_bps" / Int64ul,
+        "referrer_rebate_accrued" / Int64ul,
+        Padding(7),
+    )
+
 
-PUBLIC_KEY_LAYOUT = Bytes(32)
-POOL_INFO_LAYOUT = cStruct("instruction" / Int8ul, "simulate_type" / Int8ul)
+def _open_orders_layout():
+    return cStruct(
+        Padding(5),
+        "account_flags" / Int64ul,
+        "market" / Bytes(32),
+        "owner" / Bytes(32),
+        "base_token_free" / Int64ul,
+        "base_token_total" / Int64ul,
+        "quote_token_free" / Int64ul,
+        "quote_token_total" / Int64ul,
+    )
 
-LIQ_LAYOUT = cStruct("instruction" / Int8ul, "amount_in" / Int64ul)
 
-SWAP_LAYOUT = Struct(
-    # "instruction" / Int8ul,
-    "amountInMax" / Int64ul,
-    "amountOut" / Int64ul,
-)
-ACCOUNT_LAYOUT = cStruct(
-    "mint" / PUBLIC_KEY_LAYOUT,
-    "owner" / PUBLIC_KEY_LAYOUT,
-    "amount" / Int64ul,
-    "delegate_option" / Int32ul,
-    "delegate" / PUBLIC_KEY_LAYOUT,
-    "state" / Int8ul,
-    "is_native_option" / Int32ul,
-    "is_native" / Int64ul,
-    "delegated_amount" / Int64ul,
-    "close_authority_option" / Int32ul,
-    "close_authority" / PUBLIC_KEY_LAYOUT,
-)
+def _mint_layout():
+    return cStruct(Padding(44), "decimals" / Int8ul, Padding(37))
 
-CPMM_CONFIG_INFO_LAYOUT = cStruct(
-    "blob_8" / Bytes(8),
-    "bump" / Int8ul,
-    "disableCreatePool" / Flag,
-    "index" / Int16ul,
-    "tradeFeeRate" / Int64ul,
-    "protocolFeeRate" / Int64ul,
-    "fundFeeRate" / Int64ul,
-    "createPoolFee" / Int64ul,
-    "protocolOwner" / PUBLIC_KEY_LAYOUT,
-    "fundOwner" / PUBLIC_KEY_LAYOUT,
-    "seq_u64_16" / Array(16, Int64ul),
-)
+
+def _pool_info_layout():
+    return cStruct("instruction" / Int8ul, "simulate_type" / Int8ul)
+
+
+def _liq_layout():
+    return cStruct("instruction" / Int8ul, "amount_in" / Int64ul)
+
+
+def _swap_layout():
+    return Struct(
+        # "instruction" / Int8ul,
+        "amountInMax" / Int64ul,
+        "amountOut" / Int64ul,
+    ).compile()
+
+
+def _account_layout():
+    return cStruct(
+        "mint" / PUBLIC_KEY_LAYOUT,
+        "owner" / PUBLIC_KEY_LAYOUT,
+        "amount" / Int64ul,
+        "delegate_option" / Int32ul,
+        "delegate" / PUBLIC_KEY_LAYOUT,
+        "state" / Int8ul,
+        "is_native_option" / Int32ul,
+        "is_native" / Int64ul,
+        "delegated_amount" / Int64ul,
+        "close_authority_option" / Int32ul,
+        "close_authority" / PUBLIC_KEY_LAYOUT,
+    )
+
+
+def _cpmm_config_info_layout():
+    return cStruct(
+        "blob_8" / Bytes(8),
+        "bump" / Int8ul,
+        "disableCreatePool" / Flag,
+        "index" / Int16ul,
+        "tradeFeeRate" / Int64ul,
+        "protocolFeeRate" / Int64ul,
+        "fundFeeRate" / Int64ul,
+        "createPoolFee" / Int64ul,
+        "protocolOwner" / PUBLIC_KEY_LAYOUT,
+        "fundOwner" / PUBLIC_KEY_LAYOUT,
+        "seq_u64_16" / Array(16, Int64ul),
+    )
+
+
+def _cpmm_pool_info_layout():
+    return Struct(
+        "blob_8" / Bytes(8),
+        "configId" / PUBLIC_KEY_LAYOUT,
+        "poolCreator" / PUBLIC_KEY_LAYOUT,
+        "vaultA" / PUBLIC_KEY_LAYOUT,
+        "vaultB" / PUBLIC_KEY_LAYOUT,
+        "mintLp" / PUBLIC_KEY_LAYOUT,
+        "mintA" / PUBLIC_KEY_LAYOUT,
+        "mintB" / PUBLIC_KEY_LAYOUT,
+        "mintProgramA" / PUBLIC_KEY_LAYOUT,
+        "mintProgramB" / PUBLIC_KEY_LAYOUT,
+        "observationId" / PUBLIC_KEY_LAYOUT,
+        "bump" / Int8ul,
+        "status" / Int8ul,
+        "lpDecimals" / Int8ul,
+        "mintDecimalA" / Int8ul,
+        "mintDecimalB" / Int8ul,
+        "lpAmount" / Int64ul,
+        "protocolFeesMintA" / Int64ul,
+        "protocolFeesMintB" / Int64ul,
+        "fundFeesMintA" / Int64ul,
+        "fundFeesMintB" / Int64ul,
+        "openTime" / Int64ul,
+        "seq_u64_32" / Array(32, Int64ul),
+    )
 
 
-CPMM_POOL_INFO_LAYOUT = Struct(
-    "blob_8" / Bytes(8),
-    "configId" / PUBLIC_KEY_LAYOUT,
-    "poolCreator" / PUBLIC_KEY_LAYOUT,
-    "vaultA" / PUBLIC_KEY_LAYOUT,
-    "vaultB" / PUBLIC_KEY_LAYOUT,
-    "mintLp" / PUBLIC_KEY_LAYOUT,
-    "mintA" / PUBLIC_KEY_LAYOUT,
-    "mintB" / PUBLIC_KEY_LAYOUT,
-    "mintProgramA" / PUBLIC_KEY_LAYOUT,
-    "mintProgramB" / PUBLIC_KEY_LAYOUT,
-    "observationId" / PUBLIC_KEY_LAYOUT,
-    "bump" / Int8ul,
-    "status" / Int8ul,
-    "lpDecimals" / Int8ul,
-    "mintDecimalA" / Int8ul,
-    "mintDecimalB" / Int8ul,
-    "lpAmount" / Int64ul,
-    "protocolFeesMintA" / Int64ul,
-    "protocolFeesMintB" / Int64ul,
-    "fundFeesMintA" / Int64ul,
-    "fundFeesMintB" / Int64ul,
-    "openTime" / Int64ul,
-    "seq_u64_32" / Array(32, Int64ul),
+__getattr__ = lazy_attributes(
+    globals(),
+    {
+        "METADATA_INSTRUCTION_LAYOUT": _metadata_instruction_layout,
+        "AMM_V4_SWAP_LAYOUT": _amm_v4_swap_layout,
+        "AMM_INFO_LAYOUT_V4_1": _amm_info_layout_v4_1,
+        "ACCOUNT_FLAGS_LAYOUT": _account_flags_layout,
+        "MARKET_LAYOUT": _market_layout,
+        "OPEN_ORDERS_LAYOUT": _open_orders_layout,
+        "MINT_LAYOUT": _mint_layout,
+        "POOL_INFO_LAYOUT": _pool_info_layout,
+        "LIQ_LAYOUT": _liq_layout,
+        "SWAP_LAYOUT": _swap_layout,
+        "ACCOUNT_LAYOUT": _account_layout,
+        "CPMM_CONFIG_INFO_LAYOUT": _cpmm_config_info_layout,
+        "CPMM_POOL_INFO_LAYOUT": _cpmm_pool_info_layout,
+    },
 )
@@ -0,0 +1,151 @@
+"""struct-based decoders compiled from the construct layouts in utils.extractor.
+
+A construct ``Struct.parse`` builds a Container per call and walks every field
+in Python. ``FastLayout`` compiles the same layout once into a single
+``struct.Struct`` and decodes straight out of a ``memoryview`` with
+``unpack_from``; pubkeys stay raw bytes until asked for.
+"""
+import struct
+from typing import Iterable, List
+
+from construct import Array, Bytes, BytesInteger, FormatField, Padded, Renamed
+from construct import Flag as _Flag
+from solders.pubkey import Pubkey  # type: ignore
+
+from utils import extractor
+from utils.lazy import lazy_attributes
+
+_SCALAR = 0
+_ARRAY = 1
+_U128 = 2
+
+
+def _field_format(subcon):
+    """Returns (struct format, value count, kind) for a single construct field."""
+    if isinstance(subcon, FormatField):
+        return subcon.fmtstr.lstrip("<"), 1, _SCALAR
+    if isinstance(subcon, Bytes) and isinstance(subcon.length, int):
+        return f"{subcon.length}s", 1, _SCALAR
+    if isinstance(subcon, type(_Flag)):
+        return "?", 1, _SCALAR
+    if isinstance(subcon, BytesInteger) and subcon.length == 16:
+        if subcon.signed or not subcon.swapped:
+            raise TypeError("Only unsigned little-endian u128 is supported")
+        return "QQ", 2, _U128
+    if isinstance(subcon, Array) and isinstance(subcon.count, int):
+        fmt, count, kind = _field_format(subcon.subcon)
+        if kind != _SCALAR:
+            raise TypeError("Only arrays of scalar fields are supported")
+        return f"{subcon.count}{fmt}", subcon.count, _ARRAY
+    raise TypeError(f"Unsupported field {subcon!r}")
+
+
+class FastRecord:
+    """Decoded account; fields read like a construct Container."""
+
+    __slots__ = ("_layout", "_values", "_pubkeys")
+
+    def __init__(self, layout: "FastLayout", values: tuple) -> None:
+        self._layout = layout
+        self._values = values
+        self._pubkeys = None
+
+    def __getattr__(self, name):
+        try:
+            return self._layout._value(self._values, name)
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __getitem__(self, name):
+        return self._layout._value(self._values, name)
+
+    def pubkey(self, name: str) -> Pubkey:
+        """Materialises a 32 byte field as a Pubkey, once."""
+        if self._pubkeys is None:
+            self._pubkeys = {}
+        key = self._pubkeys.get(name)
+        if key is None:
+            key = self._pubkeys[name] = Pubkey.from_bytes(self[name])
+        return key
+
+    def to_dict(self) -> dict:
+        return {name: self[name] for name in self._layout.names}
+
+    def __repr__(self) -> str:
+        return f"FastRecord({self.to_dict()!r})"
+
+
+class FastLayout:
+    """A construct ``Struct`` compiled to one precomputed ``struct.Struct``."""
+
+    def __init__(self, layout) -> None:
+        fmt = ["<"]
+        self.names = []
+        self._fields = {}
+        self._readers = {}
+        index = 0
+        offset = 0
+        for subcon in layout.subcons:
+            if isinstance(subcon, Padded):
+                fmt.append(f"{subcon.length}x")
+                offset += subcon.length
+                continue
+            if not isinstance(subcon, Renamed):
+                raise TypeError(f"Unnamed field {subcon!r}")
+            part, count, kind = _field_format(subcon.subcon)
+            fmt.append(part)
+            self.names.append(subcon.name)
+            self._fields[subcon.name] = (index, count, kind)
+            self._readers[subcon.name] = (offset, struct.Struct("<" + part), kind)
+            index += count
+            offset += subcon.subcon.sizeof()
+        self.struct = struct.Struct("".join(fmt))
+        self.size = self.struct.size
+        if self.size != layout.sizeof():
+            raise TypeError("Compiled size does not match construct layout")
+
+    def _value(self, values: tuple, name: str):
+        index, count, kind = self._fields[name]
+        if kind == _SCALAR:
+            return values[index]
+        if kind == _U128:
+            return values[index] | (values[index + 1] << 64)
+        return list(values[index : index + count])
+
+    def decode(self, data, offset: int = 0) -> FastRecord:
+        """Decodes one account; ``data`` may be longer than the layout."""
+        return FastRecord(self, self.struct.unpack_from(memoryview(data), offset))
+
+    def decode_many(self, buffers: Iterable) -> List[FastRecord]:
+        """Decodes a batch of account buffers in one call."""
+        unpack = self.struct.unpack_from
+        return [FastRecord(self, unpack(memoryview(data))) for data in buffers]
+
+    def decode_packed(self, data) -> List[FastRecord]:
+        """Decodes back-to-back records stored in a single contiguous buffer."""
+        return [FastRecord(self, values) for values in self.struct.iter_unpack(data)]
+
+    def read(self, name: str, data, offset: int = 0):
+        """Reads a single field without decoding the rest of the account."""
+        field_offset, reader, kind = self._readers[name]
+        values = reader.unpack_from(memoryview(data), offset + field_offset)
+        if kind == _SCALAR:
+            return values[0]
+        if kind == _U128:
+            return values[0] | (values[1] << 64)
+        return list(values)
+
+
+# Compiled on first use (PEP 562), so importers only pay for the layouts they use
+__getattr__ = lazy_attributes(
+    globals(),
+    {
+        "FAST_CPMM_POOL_INFO_LAYOUT": lambda: FastLayout(extractor.CPMM_POOL_INFO_LAYOUT),
+        "FAST_CPMM_CONFIG_INFO_LAYOUT": lambda: FastLayout(extractor.CPMM_CONFIG_INFO_LAYOUT),
+        "FAST_ACCOUNT_LAYOUT": lambda: FastLayout(extractor.ACCOUNT_LAYOUT),
+        "FAST_AMM_INFO_LAYOUT_V4_1": lambda: FastLayout(extractor.AMM_INFO_LAYOUT_V4_1),
+        "FAST_MINT_LAYOUT": lambda: FastLayout(extractor.MINT_LAYOUT),
+        "FAST_MARKET_LAYOUT": lambda: FastLayout(extractor.MARKET_LAYOUT),
+        "FAST_OPEN_ORDERS_LAYOUT": lambda: FastLayout(extractor.OPEN_ORDERS_LAYOUT),
+    },
+)
@@ -0,0 +1,145 @@
+"""Priority fee and compute unit sizing for sells.
+
+``getRecentPrioritizationFees`` returns, for each of the last ~150 slots, the
+lowest priority fee paid by a landed transaction that wrote to the given
+accounts. Paying the ``p``-th percentile of those fees would have been enough
+in a fraction ``p`` of recent slots, so the landing probability maps directly
+onto a percentile. Samples are cached per account set for ``ttl`` seconds.
+
+The compute unit limit comes from one ``simulateTransaction`` per template,
+plus a safety margin, so the priority fee is only paid on units actually used.
+"""
+import asyncio
+import base64
+import math
+import time
+from typing import Dict, Sequence, Tuple
+
+from loguru import logger
+from solders.hash import Hash  # type: ignore
+
+from utils.config import (
+    FEE_CACHE_TTL,
+    FEE_CU_MARGIN,
+    FEE_LANDING_PROBABILITY,
+    FEE_MAX_PRICE,
+    FEE_MIN_PRICE,
+    FEE_STEP_MULTIPLIER,
+)
+from utils.lazy import lazy_import
+from utils.templates import SwapTemplate
+from utils.transport import TransportClient
+
+np = lazy_import("numpy")
+
+MAX_COMPUTE_UNITS = 1_400_000
+"""Largest compute unit limit a transaction may request"""
+
+MAX_FEE_ACCOUNTS = 128
+"""Maximum number of accounts getRecentPrioritizationFees accepts"""
+
+
+class FeeOracle:
+    """Recent priority fee percentiles and simulated compute unit limits"""
+
+    def __init__(
+        self,
+        client: TransportClient,
+        ttl: float = FEE_CACHE_TTL,
+        min_price: int = FEE_MIN_PRICE,
+        max_price: int = FEE_MAX_PRICE,
+        step_multiplier: float = FEE_STEP_MULTIPLIER,
+        cu_margin: float = FEE_CU_MARGIN,
+    ) -> None:
+        self.client = client
+        self.ttl = ttl
+        self.min_price = min_price
+        self.max_price = max_price
+        self.step_multiplier = step_multiplier
+        self.cu_margin = cu_margin
+        self.simulations = 0
+        self._samples: Dict[Tuple[str, ...], Tuple[float, np.ndarray]] = {}
+        self._fetching: Dict[Tuple[str, ...], asyncio.Future] = {}
+
+    async def _fetch(self, key: Tuple[str, ...]) -> "np.ndarray":
+        result = await self.client.transport.request_json(
+            "getRecentPrioritizationFees", [list(key)]
+        )
+        fees = np.sort(
+            np.fromiter((entry["prioritizationFee"] for entry in result), dtype=np.float64)
+        )
+        self._samples[key] = (time.monotonic(), fees)
+        return fees
+
+    async def recent_fees(self, accounts: Sequence) -> "np.ndarray":
+        """Sorted per-slot minimum fees (micro-lamports per CU) for ``accounts``."""
+        key = tuple(sorted({str(account) for account in accounts}))[:MAX_FEE_ACCOUNTS]
+        cached = self._samples.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.ttl:
+            return cached[1]
+        # Concurrent sells for the same pool share one request
+        fetching = self._fetching.get(key)
+        if fetching is None:
+            fetching = self._fetching[key] = asyncio.ensure_future(self._fetch(key))
+            fetching.add_done_callback(lambda _: self._fetching.pop(key, None))
+        return await asyncio.shield(fetching)
+
+    async def price(
+        self, accounts: Sequence, probability: float = FEE_LANDING_PROBABILITY
+    ) -> int:
+        """Compute unit price expected to land with ``probability``, within the configured bounds."""
+        try:
+            fees = await self.recent_fees(accounts)
+        except Exception as e:
+            logger.warning(f"Priority fee sampling failed: {e!r}")
+            return self.max_price
+        if not len(fees):
+            return self.min_price
+        price = int(np.percentile(fees, probability * 100, method="higher"))
+        return min(max(price, self.min_price), self.max_price)
+
+    def step_up(self, price: int, attempt: int) -> int:
+        """Price for the ``attempt``-th resubmission (0 is the first send)."""
+        return min(int(price * self.step_multiplier**attempt), self.max_price)
+
+    async def compute_limit(self, template: SwapTemplate, amount_in: int) -> int:
+        """
+        Simulates the template once and lowers its compute unit limit to fit.
+
+        The sized limit is stored on the template, so later calls return it
+        without another simulation. Falls back to the built-in limit if the
+        simulation fails.
+        """
+        if template.sized or template.unit_limit_offset is None:
+            return template.unit_limit
+        message = template.render(
+            amount_in, 0, Hash.default(), unit_price=0, unit_limit=MAX_COMPUTE_UNITS
+        )
+        transaction = b"\x01" + bytes(64) + message
+        self.simulations += 1
+        try:
+            result = await self.client.transport.request_json(
+                "simulateTransaction",
+                [
+                    base64.b64encode(transaction).decode(),
+                    {
+                        "encoding": "base64",
+                        "sigVerify": False,
+                        "replaceRecentBlockhash": True,
+                        "commitment": "processed",
+                    },
+                ],
+            )
+            value = result["value"]
+            if value.get("err") is not None or not value.get("unitsConsumed"):
+                raise ValueError(f"simulation failed: {value.get('err')}")
+            template.unit_limit = min(
+                math.ceil(value["unitsConsumed"] * (1 + self.cu_margin)),
+                MAX_COMPUTE_UNITS,
+            )
+        except Exception as e:
+            logger.warning(
+                f"Compute unit simulation failed, keeping {template.unit_limit}: {e!r}"
+            )
+        template.sized = True
+        return template.unit_limit
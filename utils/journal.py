@@ -0,0 +1,375 @@
+"""Append-only binary journal of sell attempts.
+
+Every transaction ``make_sell_swap`` submits (and every sell that raised
+before submitting) becomes one fixed-width record. Records are packed into an
+in-memory buffer, which is written by a single background thread once it
+holds ``flush_bytes`` or has been waiting ``flush_interval`` seconds, so the
+event loop never blocks on the file. ``TradeJournalReader`` memory-maps the
+file as a NumPy structured array: columns are zero-copy views and reports
+over millions of records are a few vectorised passes.
+
+File layout (little endian):
+
+    magic       8 bytes   b"TRADEJNL"
+    record size u32
+    reserved    u32
+    records     RECORD_SIZE bytes each, see ``RECORD_FIELDS``
+
+Timestamps are ``time.time()`` seconds, NaN for stages a record never
+reached. A torn record left by a crash mid-write is ignored by the reader.
+"""
+import asyncio
+import concurrent.futures
+import math
+import os
+import struct
+from typing import Dict, Optional, Sequence
+
+from solders.pubkey import Pubkey  # type: ignore
+
+from utils.config import JOURNAL_FLUSH_BYTES, JOURNAL_FLUSH_INTERVAL, JOURNAL_PATH
+from utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+JOURNAL_MAGIC = b"TRADEJNL"
+_HEADER = struct.Struct("<8sII")
+
+RECORD_FIELDS = (
+    # Stage timestamps
+    ("started_at", "d"),
+    ("template_at", "d"),
+    ("priced_at", "d"),
+    ("quoted_at", "d"),
+    ("signed_at", "d"),
+    ("sent_at", "d"),
+    ("first_seen_at", "d"),
+    ("confirmed_at", "d"),
+    ("slot", "Q"),
+    ("amount_in", "Q"),
+    ("quoted_out", "Q"),
+    ("min_amount_out", "Q"),
+    ("unit_price", "Q"),
+    ("fee", "Q"),
+    ("wallet_index", "I"),
+    ("unit_limit", "I"),
+    ("broadcasts", "H"),
+    ("attempt", "B"),
+    ("kind", "B"),
+    ("status", "B"),
+    ("decimals", "B"),
+    (None, "2x"),
+    ("wallet", "32s"),
+    ("mint", "32s"),
+    ("pool", "32s"),
+    ("signature", "64s"),
+)
+"""Record fields in file order (struct format characters; None is padding)"""
+
+_RECORD = struct.Struct("<" + "".join(code for _, code in RECORD_FIELDS))
+RECORD_SIZE = _RECORD.size
+
+STATUSES = ("confirmed", "failed", "expired", "error")
+"""``status`` codes: the submitter's outcomes, then sells that raised"""
+
+KINDS = ("cpmm", "amm_v4")
+"""``kind`` codes (``utils.router`` pool kinds)"""
+
+NO_WALLET_INDEX = 2**32 - 1
+
+SIGNATURE_FEE = 5_000
+"""Lamports charged per signature of a transaction that lands"""
+
+_NUMPY_TYPES = {"d": "<f8", "Q": "<u8", "I": "<u4", "H": "<u2", "B": "u1"}
+
+
+def record_dtype():
+    """NumPy dtype of one record, matching ``RECORD_FIELDS`` byte for byte."""
+    names, formats, offsets = [], [], []
+    offset = 0
+    for name, code in RECORD_FIELDS:
+        size = struct.calcsize("<" + code)
+        if name is not None:
+            names.append(name)
+            formats.append(f"S{size}" if code.endswith("s") else _NUMPY_TYPES[code])
+            offsets.append(offset)
+        offset += size
+    return np.dtype(
+        {"names": names, "formats": formats, "offsets": offsets, "itemsize": RECORD_SIZE}
+    )
+
+
+def _time(value: Optional[float]) -> float:
+    return math.nan if value is None else value
+
+
+class TradeEntry:
+    """Stage timestamps and amounts of one ``make_sell_swap`` call, filled in as it runs"""
+
+    __slots__ = (
+        "wallet_index",
+        "wallet",
+        "mint",
+        "amount_in",
+        "pool",
+        "kind",
+        "decimals",
+        "started_at",
+        "template_at",
+        "priced_at",
+        "quoted_at",
+        "signed_at",
+        "quoted_out",
+        "min_amount_out",
+        "unit_price",
+        "unit_limit",
+        "journaled",
+    )
+
+    def __init__(
+        self, wallet_index: Optional[int], wallet, mint, amount_in: int, started_at: float
+    ) -> None:
+        self.wallet_index = wallet_index
+        self.wallet = wallet
+        self.mint = mint
+        self.amount_in = amount_in
+        self.pool = None
+        self.kind = KINDS[0]
+        self.decimals = 0
+        self.started_at = started_at
+        self.template_at = None
+        self.priced_at = None
+        self.quoted_at = None
+        self.signed_at = None
+        self.quoted_out = 0
+        self.min_amount_out = 0
+        self.unit_price = 0
+        self.unit_limit = 0
+        # Set once an attempt is recorded; a later error then adds no record
+        self.journaled = False
+
+    def pack(self, attempt: int = 0, result=None) -> bytes:
+        """
+        One journal record: the attempt's ``SubmitResult``, or an ``error``
+        record when ``result`` is None.
+        """
+        if result is None:
+            status, signature, slot, broadcasts = "error", b"", None, 0
+            sent_at = first_seen_at = confirmed_at = None
+        else:
+            status, signature, slot = result.status, bytes(result.signature), result.slot
+            broadcasts = result.broadcasts
+            sent_at, first_seen_at, confirmed_at = (
+                result.sent_at, result.first_seen_at, result.confirmed_at
+            )
+        # Landed transactions pay the base and priority fee whether or not they succeed
+        fee = 0
+        if slot is not None:
+            fee = SIGNATURE_FEE + -(-self.unit_price * self.unit_limit // 1_000_000)
+        return _RECORD.pack(
+            self.started_at,
+            _time(self.template_at),
+            _time(self.priced_at),
+            _time(self.quoted_at),
+            _time(self.signed_at),
+            _time(sent_at),
+            _time(first_seen_at),
+            _time(confirmed_at),
+            slot or 0,
+            self.amount_in,
+            self.quoted_out,
+            self.min_amount_out,
+            self.unit_price,
+            fee,
+            NO_WALLET_INDEX if self.wallet_index is None else self.wallet_index,
+            self.unit_limit,
+            min(broadcasts, 0xFFFF),
+            attempt,
+            KINDS.index(self.kind),
+            STATUSES.index(status),
+            self.decimals,
+            bytes(self.wallet) if self.wallet is not None else b"",
+            bytes(Pubkey.from_string(str(self.mint))),
+            bytes(self.pool) if self.pool is not None else b"",
+            signature,
+        )
+
+
+class TradeJournal:
+    """Buffered appender of journal records; a no-op when ``path`` is empty"""
+
+    def __init__(
+        self,
+        path: str = JOURNAL_PATH,
+        flush_bytes: int = JOURNAL_FLUSH_BYTES,
+        flush_interval: float = JOURNAL_FLUSH_INTERVAL,
+    ) -> None:
+        self.path = path
+        self.enabled = bool(path)
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.records = 0
+        self._buffer = bytearray()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._file = None
+        self._writer: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._written: Optional[concurrent.futures.Future] = None
+
+    def record(self, entry: TradeEntry, attempt: int = 0, result=None) -> None:
+        """Journals ``entry`` (see ``TradeEntry.pack``)."""
+        if self.enabled:
+            self.append(entry.pack(attempt, result))
+
+    def append(self, record: bytes) -> None:
+        """Buffers a packed record; the write happens later, off the event loop."""
+        if not self.enabled:
+            return
+        self._buffer += record
+        self.records += 1
+        if len(self._buffer) >= self.flush_bytes:
+            self.flush()
+        elif self._timer is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.flush()
+                return
+            self._timer = loop.call_later(self.flush_interval, self.flush)
+
+    def flush(self) -> Optional[concurrent.futures.Future]:
+        """Hands the buffer to the writer thread; returns the pending write, if any."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._buffer:
+            data = bytes(self._buffer)
+            self._buffer.clear()
+            if self._writer is None:
+                # One thread keeps writes in order
+                self._writer = concurrent.futures.ThreadPoolExecutor(
+                    1, thread_name_prefix="journal"
+                )
+            self._written = self._writer.submit(self._write, data)
+        return self._written
+
+    def _write(self, data: bytes) -> None:
+        if self._file is None:
+            self._file = open(self.path, "ab")
+            if self._file.tell() == 0:
+                self._file.write(_HEADER.pack(JOURNAL_MAGIC, RECORD_SIZE, 0))
+        self._file.write(data)
+        self._file.flush()
+
+    async def close(self) -> None:
+        """Writes everything buffered and closes the file."""
+        written = self.flush()
+        if written is not None:
+            await asyncio.wrap_future(written)
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class TradeJournalReader:
+    """
+    Read-only, memory-mapped view of a journal.
+
+    ``reader["amount_in"]`` and friends are NumPy views straight onto the
+    file; ``daily`` and ``latency`` aggregate them without Python loops.
+    """
+
+    def __init__(self, path: str = JOURNAL_PATH) -> None:
+        self.path = path
+        size = os.path.getsize(path)
+        if size < _HEADER.size:
+            raise ValueError(f"{path} is not a trade journal")
+        with open(path, "rb") as file:
+            magic, record_size, _ = _HEADER.unpack(file.read(_HEADER.size))
+        if magic != JOURNAL_MAGIC or record_size != RECORD_SIZE:
+            raise ValueError(f"{path} is not a trade journal of this version")
+        count = (size - _HEADER.size) // RECORD_SIZE
+        if count:
+            self.records = np.memmap(
+                path, dtype=record_dtype(), mode="r", offset=_HEADER.size, shape=(count,)
+            )
+        else:
+            self.records = np.zeros(0, dtype=record_dtype())
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, field: str):
+        return self.records[field]
+
+    def status(self, name: str):
+        """Boolean mask of the records with status ``name``."""
+        return self.records["status"] == STATUSES.index(name)
+
+    def daily(self) -> Dict[str, "np.ndarray"]:
+        """
+        Per UTC day (of ``started_at``): attempts, confirmed sells, tokens sold,
+        fees paid and the quoted wSOL output and PnL. Tokens sold are whole
+        tokens (by each record's mint ``decimals``), the rest base units.
+
+        The journal does not parse the landed transaction, so ``quoted_out`` is
+        what confirmed sells were quoted, not what they received, and
+        ``quoted_pnl`` is that minus the fees of quoted attempts. Confirmed
+        sells sent without a quote are counted in ``unquoted`` and left out of
+        both rather than counted as receiving nothing.
+        """
+        days = (self.records["started_at"] // 86_400).astype(np.int64)
+        unique, index = np.unique(days, return_inverse=True)
+        confirmed = self.status("confirmed")
+        quoted = ~np.isnan(self.records["quoted_at"])
+
+        def total(weights):
+            return np.bincount(index, weights=weights, minlength=len(unique))
+
+        quoted_out = total(
+            np.where(confirmed & quoted, self.records["quoted_out"], 0).astype(np.float64)
+        )
+        fees = self.records["fee"].astype(np.float64)
+        return {
+            "day": unique.astype("datetime64[D]"),
+            "attempts": np.bincount(index, minlength=len(unique)),
+            "confirmed": total(confirmed.astype(np.float64)).astype(np.int64),
+            "unquoted": total((confirmed & ~quoted).astype(np.float64)).astype(np.int64),
+            "tokens_sold": total(
+                np.where(
+                    confirmed,
+                    self.records["amount_in"] / 10.0 ** self.records["decimals"],
+                    0,
+                )
+            ),
+            "quoted_out": quoted_out,
+            "fees": total(fees),
+            "quoted_pnl": quoted_out - total(np.where(quoted, fees, 0)),
+        }
+
+    def stages(self) -> Dict[str, "np.ndarray"]:
+        """Seconds spent in each stage, per record (NaN where a stage did not run)."""
+        records = self.records
+        return {
+            "template": records["template_at"] - records["started_at"],
+            "fees": records["priced_at"] - records["template_at"],
+            "quote": records["quoted_at"] - np.fmax(records["priced_at"], records["template_at"]),
+            # Includes waiting for a blockhash
+            "sign": records["signed_at"]
+            - np.fmax(np.fmax(records["quoted_at"], records["priced_at"]), records["template_at"]),
+            "seen": records["first_seen_at"] - records["sent_at"],
+            "confirm": records["confirmed_at"] - records["sent_at"],
+            "total": records["confirmed_at"] - records["started_at"],
+        }
+
+    def latency(self, percentiles: Sequence[float] = (50, 90, 99)) -> Dict[str, list]:
+        """Percentiles (seconds) of every stage over the records that reached it."""
+        report = {}
+        for stage, seconds in self.stages().items():
+            seconds = seconds[~np.isnan(seconds)]
+            report[stage] = (
+                np.percentile(seconds, percentiles).tolist() if len(seconds) else []
+            )
+        return report
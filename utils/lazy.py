@@ -0,0 +1,47 @@
+"""Deferred imports and module attributes, to keep process start cheap.
+
+``lazy_import`` returns a module whose code only runs on first attribute
+access (``importlib.util.LazyLoader``), for heavy dependencies that only a
+few code paths need. ``lazy_attributes`` implements a PEP 562 module
+``__getattr__`` that builds a module-level constant on first access and
+stores it in the module, so later lookups are plain global reads.
+"""
+import importlib.util
+import sys
+from types import ModuleType
+from typing import Callable, Dict
+
+
+def lazy_import(name: str) -> ModuleType:
+    """``import name``, executed when an attribute of the module is first used."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def lazy_attributes(namespace: dict, builders: Dict[str, Callable[[], object]]):
+    """
+    Module ``__getattr__`` building ``builders[name]()`` on first access.
+
+    Usage, at the end of a module: ``__getattr__ = lazy_attributes(globals(), {...})``.
+    """
+    module = namespace["__name__"]
+
+    def __getattr__(name: str):
+        try:
+            builder = builders[name]
+        except KeyError:
+            raise AttributeError(f"module {module!r} has no attribute {name!r}") from None
+        value = namespace[name] = builder()
+        return value
+
+    return __getattr__
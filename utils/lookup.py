@@ -0,0 +1,252 @@
+"""Address lookup tables for swap transactions.
+
+A CPMM swap references 13 accounts, most of which never change for a pool
+(authority, config, pool, vaults, mints, token programs, observation). Listed
+in an address lookup table they cost one byte each in the compiled message
+instead of 32. Tables are created and extended by one authority wallet, can be
+shared by many pools (up to 256 addresses each), and the pool -> table map is
+kept in ``LOOKUP_TABLE_PATH`` so later runs only need to fetch the table.
+
+solders ships the table state types but no instruction builders, so the
+create/extend instructions are encoded here (bincode: u32 tag, then the
+arguments).
+"""
+import asyncio
+import json
+import os
+import struct
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+from solana.rpc.async_api import AsyncClient
+from solders.address_lookup_table_account import (  # type: ignore
+    ID as LOOKUP_TABLE_PROGRAM_ID,
+    LOOKUP_TABLE_MAX_ADDRESSES,
+    AddressLookupTable,
+    AddressLookupTableAccount,
+    derive_lookup_table_address,
+)
+from solders.instruction import AccountMeta, Instruction  # type: ignore
+from solders.message import MessageV0  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+from solders.system_program import ID as SYSTEM_PROGRAM_ID  # type: ignore
+from solders.transaction import VersionedTransaction  # type: ignore
+
+from utils.config import LOOKUP_TABLE_PATH, RAYDIUM_CPMM_AUTHORITY, TOKEN_PROGRAM_ID
+
+_CREATE = struct.Struct("<IQB")
+_EXTEND = struct.Struct("<IQ")
+_CREATE_TAG, _EXTEND_TAG = 0, 2
+
+EXTEND_CHUNK = 20
+"""Addresses added per extend instruction, keeping each transaction under 1232 bytes"""
+
+ACTIVE = 2**64 - 1
+"""Deactivation slot of a table that has not been deactivated"""
+
+SHARED_ADDRESSES = (RAYDIUM_CPMM_AUTHORITY, SYSTEM_PROGRAM_ID, TOKEN_PROGRAM_ID)
+"""Accounts every CPMM sell references, stored once per table"""
+
+
+def create_lookup_table(
+    authority: Pubkey, payer: Pubkey, recent_slot: int
+) -> Tuple[Instruction, Pubkey]:
+    """Instruction creating the table derived from ``authority`` and ``recent_slot``, and its address."""
+    table, bump = derive_lookup_table_address(authority, recent_slot)
+    instruction = Instruction(
+        LOOKUP_TABLE_PROGRAM_ID,
+        _CREATE.pack(_CREATE_TAG, recent_slot, bump),
+        [
+            AccountMeta(table, is_signer=False, is_writable=True),
+            AccountMeta(authority, is_signer=True, is_writable=False),
+            AccountMeta(payer, is_signer=True, is_writable=True),
+            AccountMeta(SYSTEM_PROGRAM_ID, is_signer=False, is_writable=False),
+        ],
+    )
+    return instruction, table
+
+
+def extend_lookup_table(
+    table: Pubkey, authority: Pubkey, payer: Pubkey, addresses: Sequence[Pubkey]
+) -> Instruction:
+    """Instruction appending ``addresses`` to ``table``."""
+    data = _EXTEND.pack(_EXTEND_TAG, len(addresses)) + b"".join(
+        bytes(address) for address in addresses
+    )
+    return Instruction(
+        LOOKUP_TABLE_PROGRAM_ID,
+        data,
+        [
+            AccountMeta(table, is_signer=False, is_writable=True),
+            AccountMeta(authority, is_signer=True, is_writable=False),
+            AccountMeta(payer, is_signer=True, is_writable=True),
+            AccountMeta(SYSTEM_PROGRAM_ID, is_signer=False, is_writable=False),
+        ],
+    )
+
+
+def pool_addresses(pool: Pubkey, pool_keys: dict) -> List[Pubkey]:
+    """Static accounts of a CPMM swap on ``pool``, shared ones first."""
+    addresses = list(SHARED_ADDRESSES) + [
+        pool_keys["configId"],
+        Pubkey.from_string(str(pool)),
+        pool_keys["vaultA"],
+        pool_keys["vaultB"],
+        pool_keys["mintProgramA"],
+        pool_keys["mintProgramB"],
+        pool_keys["mintA"],
+        pool_keys["mintB"],
+        pool_keys["observationId"],
+    ]
+    return list(dict.fromkeys(addresses))
+
+
+class LookupTableManager:
+    """
+    Pool -> lookup table map plus a cache of the fetched tables.
+
+    ``tables_for`` is what the sell path calls: it never creates anything and
+    costs one ``getAccountInfo`` per table and process. ``ensure`` creates or
+    extends a table so it covers a pool, and is meant to run ahead of selling.
+    """
+
+    def __init__(self, client: AsyncClient, path: str = LOOKUP_TABLE_PATH) -> None:
+        self.client = client
+        self.path = path
+        # table address -> authority, pool -> table address
+        self.authorities: Dict[str, str] = {}
+        self.pools: Dict[str, str] = {}
+        self._tables: Dict[str, AddressLookupTableAccount] = {}
+        self._fetching: Dict[str, asyncio.Future] = {}
+        self._lock = asyncio.Lock()
+        self.load()
+
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path) as file:
+            index = json.load(file)
+        self.authorities = index.get("tables", {})
+        self.pools = index.get("pools", {})
+
+    def save(self) -> None:
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as file:
+            json.dump({"tables": self.authorities, "pools": self.pools}, file, indent=2)
+        os.replace(temporary, self.path)
+
+    async def fetch(self, table: Pubkey, refresh: bool = False) -> Optional[AddressLookupTableAccount]:
+        """The table's current addresses, or None if it does not exist or was deactivated."""
+        cached = self._tables.get(str(table))
+        if cached is not None and not refresh:
+            return cached
+        account = (await self.client.get_account_info(table)).value
+        if account is None:
+            self._tables.pop(str(table), None)
+            return None
+        state = AddressLookupTable.deserialize(bytes(account.data))
+        if state.meta.deactivation_slot != ACTIVE:
+            logger.warning(f"Lookup table {table} is deactivated, ignoring it")
+            self._tables.pop(str(table), None)
+            return None
+        cached = self._tables[str(table)] = AddressLookupTableAccount(
+            Pubkey.from_string(str(table)), list(state.addresses)
+        )
+        return cached
+
+    async def tables_for(self, pool) -> List[AddressLookupTableAccount]:
+        """Lookup tables to compile a swap on ``pool`` against (empty if none is known)."""
+        table = self.pools.get(str(pool))
+        if table is None:
+            return []
+        # Every wallet compiles its first template at about the same time;
+        # they share one fetch
+        fetching = self._fetching.get(table)
+        if fetching is None:
+            fetching = self._fetching[table] = asyncio.ensure_future(
+                self.fetch(Pubkey.from_string(table))
+            )
+            fetching.add_done_callback(lambda _: self._fetching.pop(table, None))
+        try:
+            account = await asyncio.shield(fetching)
+        except Exception as e:
+            logger.warning(f"Could not fetch lookup table {table}: {e!r}")
+            return []
+        return [account] if account is not None else []
+
+    async def _send(self, owner, instructions: List[Instruction]):
+        blockhash, last_valid_block_height = await owner.blockhash.latest_with_expiry()
+        message = MessageV0.try_compile(
+            owner.keypair.pubkey(), instructions, [], blockhash
+        )
+        transaction = VersionedTransaction(message, [owner.keypair])
+        result = await owner.submitter.submit(bytes(transaction), last_valid_block_height)
+        if not result.ok:
+            raise RuntimeError(
+                f"Lookup table transaction {result.signature} {result.status}: {result.error}"
+            )
+        return result
+
+    async def _room(self, authority: str, needed: int) -> Optional[AddressLookupTableAccount]:
+        """An existing table of ``authority`` with space for ``needed`` more addresses."""
+        for table, owner in self.authorities.items():
+            if owner != authority:
+                continue
+            account = await self.fetch(Pubkey.from_string(table), refresh=True)
+            if account is not None and len(account.addresses) + needed <= LOOKUP_TABLE_MAX_ADDRESSES:
+                return account
+        return None
+
+    async def ensure(self, owner, pool, addresses: Sequence[Pubkey]) -> AddressLookupTableAccount:
+        """
+        Makes sure a table holds every one of ``addresses`` for ``pool``.
+
+        Reuses the pool's table, or else any table of ``owner`` (a
+        ``SolanaClient``, which signs and pays) with room left, and only
+        creates a new table when none has. Returns the table as fetched after
+        the last transaction confirmed.
+        """
+        authority = owner.keypair.pubkey()
+        async with self._lock:
+            account = None
+            table = self.pools.get(str(pool))
+            if table is not None:
+                account = await self.fetch(Pubkey.from_string(table), refresh=True)
+            if account is None:
+                account = await self._room(str(authority), len(addresses))
+            instructions = []
+            if account is None:
+                slot = (await self.client.get_slot("finalized")).value
+                create, table_address = create_lookup_table(authority, authority, slot)
+                instructions.append(create)
+                present = set()
+                logger.info(f"Creating lookup table {table_address}")
+            else:
+                table_address = account.key
+                present = set(account.addresses)
+            missing = [address for address in addresses if address not in present]
+            for start in range(0, len(missing), EXTEND_CHUNK):
+                instructions.append(
+                    extend_lookup_table(
+                        table_address,
+                        authority,
+                        authority,
+                        missing[start : start + EXTEND_CHUNK],
+                    )
+                )
+                await self._send(owner, instructions)
+                instructions = []
+            if instructions:
+                await self._send(owner, instructions)
+            self.authorities[str(table_address)] = str(authority)
+            self.pools[str(pool)] = str(table_address)
+            if self.path:
+                self.save()
+            account = await self.fetch(table_address, refresh=True)
+            if account is None:
+                raise RuntimeError(f"Lookup table {table_address} not found after creation")
+            logger.info(
+                f"Lookup table {table_address} covers {pool} "
+                f"({len(missing)} added, {len(account.addresses)} total)"
+            )
+            return account
@@ -0,0 +1,204 @@
+"""Single-pass decoder for Metaplex ``CreateMetadataAccountV3`` instruction data.
+
+Reads the borsh payload straight out of a memoryview and produces the same
+structure ``utils.extractor.getMetaData`` returned (pubkeys as base58
+strings), or a flat ``TokenMetadata`` record, without building a construct
+Container or walking the result afterwards.
+"""
+import struct
+from typing import Iterable, Iterator, NamedTuple, Optional, Tuple, Union
+
+from solders.pubkey import Pubkey  # type: ignore
+
+from utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+USE_METHODS = ("Burn", "Multiple", "Single")
+
+_B58_ALPHABET = b"123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_B58_DIGITS = bytes(
+    _B58_ALPHABET.index(byte) if byte in _B58_ALPHABET else 255 for byte in range(256)
+)
+_B58_POWERS = [58**k for k in range(9, -1, -1)]
+_B58_CHUNK = 58**10
+
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_U64_PAIR = struct.Struct("<QQ")
+
+
+class TokenMetadata(NamedTuple):
+    """Compact form of a decoded metadata instruction"""
+
+    name: str
+    symbol: str
+    uri: str
+    seller_fee_basis_points: int
+    creators: Optional[Tuple[Tuple[str, bool, int], ...]]
+    collection: Optional[Tuple[bool, str]]
+    uses: Optional[Tuple[str, int, int]]
+    is_mutable: bool
+    collection_details: Optional[str]
+
+
+def b58decode(data: Union[str, bytes]) -> bytes:
+    """
+    Base58 decode; same output as ``base58.b58decode``, several times faster.
+
+    Digits are folded ten at a time in uint64 (58**10 < 2**64), leaving one
+    big-int step per ten characters instead of one per character.
+    """
+    raw = data.encode("ascii") if isinstance(data, str) else bytes(data)
+    digits = raw.translate(_B58_DIGITS)
+    if 255 in digits:
+        raise ValueError("Invalid base58 character")
+    padded = bytes(-len(digits) % 10) + digits
+    chunks = np.frombuffer(padded, dtype=np.uint8).reshape(-1, 10).astype(np.uint64)
+    value = 0
+    for chunk in (chunks * np.array(_B58_POWERS, dtype=np.uint64)).sum(axis=1).tolist():
+        value = value * _B58_CHUNK + chunk
+    zeros = len(raw) - len(raw.lstrip(b"1"))
+    return bytes(zeros) + value.to_bytes((value.bit_length() + 7) // 8, "big")
+
+
+def _string(view: memoryview, pos: int):
+    (length,) = _U32.unpack_from(view, pos)
+    end = pos + 4 + length
+    if end > len(view):
+        raise ValueError("String runs past the end of the payload")
+    return str(view[pos + 4 : end], "utf-8"), end
+
+
+def _pubkey(view: memoryview, pos: int):
+    if pos + 32 > len(view):
+        raise ValueError("Pubkey runs past the end of the payload")
+    return str(Pubkey.from_bytes(bytes(view[pos : pos + 32]))), pos + 32
+
+
+def _decode(data: bytes) -> TokenMetadata:
+    view = memoryview(data)
+    try:
+        pos = 1  # instruction discriminator
+        name, pos = _string(view, pos)
+        symbol, pos = _string(view, pos)
+        uri, pos = _string(view, pos)
+        (seller_fee_basis_points,) = _U16.unpack_from(view, pos)
+        pos += 2
+
+        creators = None
+        if view[pos]:
+            (count,) = _U32.unpack_from(view, pos + 1)
+            pos += 5
+            creators = []
+            for _ in range(count):
+                address, pos = _pubkey(view, pos)
+                creators.append((address, bool(view[pos]), view[pos + 1]))
+                pos += 2
+            creators = tuple(creators)
+        else:
+            pos += 1
+
+        collection = None
+        if view[pos]:
+            verified = bool(view[pos + 1])
+            key, pos = _pubkey(view, pos + 2)
+            collection = (verified, key)
+        else:
+            pos += 1
+
+        uses = None
+        if view[pos]:
+            method = view[pos + 1]
+            remaining, total = _U64_PAIR.unpack_from(view, pos + 2)
+            uses = (USE_METHODS[method], remaining, total)
+            pos += 18
+        else:
+            pos += 1
+
+        is_mutable = bool(view[pos])
+        pos += 1
+
+        collection_details = None
+        if view[pos]:
+            collection_details, pos = _string(view, pos + 1)
+    except (IndexError, struct.error) as e:
+        raise ValueError(f"Truncated metadata payload: {e}") from None
+
+    return TokenMetadata(
+        name,
+        symbol,
+        uri,
+        seller_fee_basis_points,
+        creators,
+        collection,
+        uses,
+        is_mutable,
+        collection_details,
+    )
+
+
+def metadata_to_dict(metadata: TokenMetadata, discriminator: int) -> dict:
+    """Nested dict in the shape the borsh schema (and getMetaData) produces."""
+    return {
+        "instructionDiscriminator": discriminator,
+        "createMetadataAccountArgsV3": {
+            "data": {
+                "name": metadata.name,
+                "symbol": metadata.symbol,
+                "uri": metadata.uri,
+                "sellerFeeBasisPoints": metadata.seller_fee_basis_points,
+                "creators": None
+                if metadata.creators is None
+                else [
+                    {"address": address, "verified": verified, "share": share}
+                    for address, verified, share in metadata.creators
+                ],
+                "collection": None
+                if metadata.collection is None
+                else {"verified": metadata.collection[0], "key": metadata.collection[1]},
+                "uses": None
+                if metadata.uses is None
+                else {
+                    "useMethod": metadata.uses[0],
+                    "remaining": metadata.uses[1],
+                    "total": metadata.uses[2],
+                },
+            },
+            "isMutable": metadata.is_mutable,
+            "collectionDetails": metadata.collection_details,
+        },
+    }
+
+
+def decode_metadata(data: Union[str, bytes], records: bool = False):
+    """
+    Decodes one instruction payload (raw bytes or base58 string).
+
+    Returns a TokenMetadata when ``records`` is True, else the nested dict.
+    """
+    if isinstance(data, str):
+        data = b58decode(data)
+    if not data:
+        raise ValueError("Empty metadata payload")
+    metadata = _decode(data)
+    return metadata if records else metadata_to_dict(metadata, data[0])
+
+
+def iter_metadata(
+    payloads: Iterable[Union[str, bytes]], records: bool = False, skip_invalid: bool = False
+) -> Iterator:
+    """
+    Streams decoded metadata for an iterable of instruction payloads.
+
+    With ``skip_invalid`` malformed payloads yield None instead of raising, so
+    one bad mint does not stop a scan.
+    """
+    for payload in payloads:
+        try:
+            yield decode_metadata(payload, records)
+        except ValueError:
+            if not skip_invalid:
+                raise
+            yield None
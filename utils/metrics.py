@@ -0,0 +1,277 @@
+"""In-process metrics with Prometheus text exposition.
+
+Counters, histograms and spans are cheap enough for the swap hot path, and
+become a single attribute check when metrics are disabled (the default; see
+``METRICS`` in the config). Values that other objects already count, such as
+cache hits, are read through callbacks at export time instead of being
+incremented twice.
+
+Metrics can be scraped from ``serve(port)`` or written to a file every few
+seconds by ``write_periodically(path)``.
+"""
+import asyncio
+import bisect
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from loguru import logger
+
+from utils.config import METRICS_ENABLED, METRICS_FILE, METRICS_INTERVAL, METRICS_PORT
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+"""Default histogram buckets, in seconds"""
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic count per label combination"""
+
+    kind = "counter"
+
+    def __init__(self, registry: "Registry", name: str, help: str, labels: Sequence[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, value: float = 1) -> None:
+        if self.registry.enabled:
+            self.values[labels] = self.values.get(labels, 0) + value
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self.values.items():
+            yield f"{self.name}{_labels(self.labels, labels)} {value}"
+
+
+class Histogram:
+    """Bucketed distribution per label combination"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        registry: "Registry",
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # per label combination: [count per bucket..., +Inf count, sum]
+        self.values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        if not self.registry.enabled:
+            return
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> Iterable[str]:
+        for labels, series in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                bucket = _labels(self.labels, labels, 'le="%s"' % bound)
+                yield f"{self.name}_bucket{bucket} {cumulative}"
+            cumulative += series[len(self.buckets)]
+            bucket = _labels(self.labels, labels, 'le="+Inf"')
+            yield f"{self.name}_bucket{bucket} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, labels)} {series[-1]}"
+            yield f"{self.name}_count{_labels(self.labels, labels)} {cumulative}"
+
+
+class Callback:
+    """Value read from ``func`` at export time (a number, or a dict of label tuple to number)"""
+
+    def __init__(self, name: str, help: str, func: Callable, kind: str, labels: Sequence[str]):
+        self.name = name
+        self.help = help
+        self.func = func
+        self.kind = kind
+        self.labels = tuple(labels)
+
+    def samples(self) -> Iterable[str]:
+        value = self.func()
+        if not isinstance(value, dict):
+            value = {(): value}
+        for labels, sample in value.items():
+            yield f"{self.name}{_labels(self.labels, labels)} {sample}"
+
+
+class _Span:
+    __slots__ = ("histogram", "errors", "phase", "started")
+
+    def __init__(self, histogram: Histogram, errors: Counter, phase: str) -> None:
+        self.histogram = histogram
+        self.errors = errors
+        self.phase = phase
+
+    def __enter__(self) -> "_Span":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.histogram.observe(time.perf_counter() - self.started, self.phase)
+        if exc_type is not None:
+            self.errors.inc(self.phase)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Registry:
+    """Named metrics plus their Prometheus text rendering"""
+
+    def __init__(self, enabled: bool = METRICS_ENABLED) -> None:
+        self.enabled = enabled
+        self.metrics: Dict[str, object] = {}
+        self.phases = self.histogram(
+            "sell_phase_seconds", "Time spent in each phase of a sell", ["phase"]
+        )
+        self.phase_errors = self.counter(
+            "sell_phase_errors_total", "Exceptions raised in each phase of a sell", ["phase"]
+        )
+
+    def _register(self, metric):
+        existing = self.metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self, name, help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(self, name, help, labels, buckets))
+
+    def callback(
+        self,
+        name: str,
+        help: str,
+        func: Callable,
+        kind: str = "counter",
+        labels: Sequence[str] = (),
+    ) -> Callback:
+        return self._register(Callback(name, help, func, kind, labels))
+
+    def span(self, phase: str):
+        """Times a ``with`` block into ``sell_phase_seconds{phase=...}``."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self.phases, self.phase_errors, phase)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            try:
+                samples = list(metric.samples())
+            except Exception as e:
+                logger.error(f"Metric {metric.name} failed: {e!r}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str) -> None:
+        """Writes the current metrics to ``path`` atomically."""
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as file:
+            file.write(self.render())
+        os.replace(temporary, path)
+
+    async def write_periodically(self, path: str, interval: float = METRICS_INTERVAL) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.dump(path)
+
+    async def serve(self, port: int, host: str = "0.0.0.0") -> asyncio.AbstractServer:
+        """Serves the metrics as Prometheus text on every HTTP GET."""
+
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            try:
+                # Only the request line matters; drain the headers
+                while (await reader.readline()).strip():
+                    pass
+                body = self.render().encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: text/plain; version=0.0.4\r\n"
+                    b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+                    b"Connection: close\r\n\r\n" + body
+                )
+                await writer.drain()
+            finally:
+                writer.close()
+
+        server = await asyncio.start_server(handle, host, port)
+        logger.info(f"Serving metrics on {host}:{port}")
+        return server
+
+
+METRICS = Registry()
+"""Process-wide registry"""
+
+span = METRICS.span
+
+
+async def start_exporters(
+    registry: Registry = METRICS, port: int = METRICS_PORT, path: str = METRICS_FILE
+) -> List:
+    """Starts the configured HTTP endpoint and/or file writer; returns what to close."""
+    exporters = []
+    if not registry.enabled:
+        return exporters
+    if port:
+        exporters.append(await registry.serve(port))
+    if path:
+        exporters.append(
+            asyncio.get_running_loop().create_task(registry.write_periodically(path))
+        )
+    return exporters
+
+
+async def stop_exporters(exporters: List, registry: Registry = METRICS, path: str = METRICS_FILE) -> None:
+    for exporter in exporters:
+        if isinstance(exporter, asyncio.Task):
+            exporter.cancel()
+        else:
+            exporter.close()
+            await exporter.wait_closed()
+    if registry.enabled and path:
+        registry.dump(path)
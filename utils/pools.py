@@ -0,0 +1,299 @@
+"""Registry of Raydium CPMM pools, indexed by mint.
+
+Pools are discovered with ``getProgramAccounts`` on ``RAYDIUM_CPMM``, filtered
+on the pool account size and on each quote mint (once as mintA, once as
+mintB), and only the immutable head of every pool account is downloaded. The
+rows are kept in a fixed-width file so later starts read it instead of
+scanning again, and ``refresh`` only fetches pools created since: it lists the
+pool addresses without their data and reads the new ones with
+getMultipleAccounts.
+
+Index layout (little endian):
+
+    magic    8 bytes   b"POOLIDX1"
+    slot     u64       context slot of the last refresh
+    pools    u32
+    rows               pool address, then bytes 8..341 of the pool account
+                       (configId .. observationId, bump, status, decimals,
+                       lpAmount), 365 bytes each
+"""
+import base64
+import os
+import struct
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from loguru import logger
+from solders.pubkey import Pubkey  # type: ignore
+
+from utils.cache import POOL_KEY_FIELDS
+from utils.config import POOL_INDEX_PATH, POOL_QUOTE_MINTS, RAYDIUM_CPMM
+from utils.extractor import CPMM_POOL_INFO_LAYOUT
+from utils.fastlayout import FAST_ACCOUNT_LAYOUT
+from utils.snapshot import get_multiple_accounts
+from utils.transport import TransportClient
+
+INDEX_MAGIC = b"POOLIDX1"
+_HEADER = struct.Struct("<8sQI")
+
+_ROW_FIELDS = (
+    "pool",
+    "configId",
+    "poolCreator",
+    "vaultA",
+    "vaultB",
+    "mintLp",
+    "mintA",
+    "mintB",
+    "mintProgramA",
+    "mintProgramB",
+    "observationId",
+    "bump",
+    "status",
+    "lpDecimals",
+    "mintDecimalA",
+    "mintDecimalB",
+    "lpAmount",
+)
+_ROW = struct.Struct("<" + "32s" * 11 + "5BQ")
+_PUBKEY_FIELDS = frozenset(_ROW_FIELDS[:11])
+
+POOL_ACCOUNT_SIZE = CPMM_POOL_INFO_LAYOUT.sizeof()
+"""Size of a CPMM pool account (getProgramAccounts dataSize filter)"""
+
+_SLICE_OFFSET, _SLICE_LENGTH = 8, _ROW.size - 32
+_MINT_A_OFFSET = 8 + 5 * 32
+_MINT_B_OFFSET = _MINT_A_OFFSET + 32
+_STATUS_OFFSET = 8 + 10 * 32 + 1
+_STATUS = _ROW_FIELDS.index("status")
+
+SWAP_DISABLED = 1 << 2
+"""Pool status bit set when swaps are disabled"""
+
+
+class PoolRegistry:
+    """
+    Every CPMM pool quoted in ``quote_mints``, with O(1) lookup by pool or mint.
+
+    Rows hold the pool keys that never change, so ``keys`` can stand in for a
+    ``getAccountInfo``. Pools of a mint are ranked by the balance of their
+    quote-side vault once ``rank`` has read it, and ``refresh`` reads it
+    again for every mint ranked so far. Status is as of the scan, or of the
+    last ``rank`` for the pools it read.
+    """
+
+    def __init__(
+        self,
+        client: TransportClient,
+        path: str = POOL_INDEX_PATH,
+        quote_mints: Sequence = POOL_QUOTE_MINTS,
+    ) -> None:
+        self.client = client
+        self.path = path
+        self.quote_mints = [Pubkey.from_string(str(mint)) for mint in quote_mints]
+        self.slot = 0
+        self._rows: List[tuple] = []
+        self._by_pool: Dict[bytes, int] = {}
+        self._by_mint: Dict[bytes, List[int]] = {}
+        self._depth: Dict[bytes, int] = {}
+        self._ranked: Set[bytes] = set()
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, pool) -> bool:
+        return bytes(Pubkey.from_string(str(pool))) in self._by_pool
+
+    def _index(self) -> None:
+        self._by_pool = {row[0]: index for index, row in enumerate(self._rows)}
+        by_mint: Dict[bytes, List[int]] = {}
+        for index, row in enumerate(self._rows):
+            by_mint.setdefault(row[6], []).append(index)
+            by_mint.setdefault(row[7], []).append(index)
+        for indexes in by_mint.values():
+            self._sort(indexes)
+        self._by_mint = by_mint
+
+    def _sort(self, indexes: List[int]) -> None:
+        # Deepest quote-side vault first; pools never ranked keep scan order
+        indexes.sort(key=lambda index: self._depth.get(self._rows[index][0], 0), reverse=True)
+
+    def _quote_vault(self, row: tuple) -> Optional[bytes]:
+        for quote in self.quote_mints:
+            if row[6] == bytes(quote):
+                return row[3]
+            if row[7] == bytes(quote):
+                return row[4]
+        return None
+
+    async def rank(self, *mints) -> None:
+        """
+        Orders the pools of ``mints`` by their quote-side vault balance and
+        updates their status, read with one batched getMultipleAccounts.
+        """
+        keys = [bytes(Pubkey.from_string(str(mint))) for mint in mints]
+        # A pool pairing two of the mints is only read once
+        indexes = list(
+            dict.fromkeys(index for key in keys for index in self._by_mint.get(key, ()))
+        )
+        vaults = []
+        for index in indexes:
+            row = self._rows[index]
+            vault = self._quote_vault(row)
+            if vault is not None:
+                vaults.append((row[0], vault))
+        accounts = await get_multiple_accounts(
+            self.client,
+            [Pubkey.from_bytes(self._rows[index][0]) for index in indexes]
+            + [Pubkey.from_bytes(vault) for _, vault in vaults],
+        )
+        for index, account in zip(indexes, accounts):
+            if account is not None:
+                row = self._rows[index]
+                status = bytes(account.data)[_STATUS_OFFSET]
+                self._rows[index] = row[:_STATUS] + (status,) + row[_STATUS + 1 :]
+        for (pool, _), account in zip(vaults, accounts[len(indexes) :]):
+            self._depth[pool] = (
+                FAST_ACCOUNT_LAYOUT.read("amount", account.data) if account is not None else 0
+            )
+        self._ranked.update(keys)
+        for key in keys:
+            self._sort(self._by_mint.get(key, []))
+
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as file:
+            data = file.read()
+        if len(data) < _HEADER.size:
+            return
+        magic, slot, pools = _HEADER.unpack_from(data, 0)
+        if magic != INDEX_MAGIC or len(data) != _HEADER.size + pools * _ROW.size:
+            logger.warning(f"Ignoring malformed pool index {self.path}")
+            return
+        self.slot = slot
+        self._rows = list(_ROW.iter_unpack(memoryview(data)[_HEADER.size :]))
+        self._index()
+
+    def save(self) -> None:
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(_HEADER.pack(INDEX_MAGIC, self.slot, len(self._rows)))
+            file.write(b"".join(_ROW.pack(*row) for row in self._rows))
+        os.replace(temporary, self.path)
+
+    def keys(self, pool) -> Optional[dict]:
+        """Immutable keys of ``pool`` in the shape of ``SolanaClient.pool_keys``."""
+        index = self._by_pool.get(bytes(Pubkey.from_string(str(pool))))
+        if index is None:
+            return None
+        row = dict(zip(_ROW_FIELDS, self._rows[index]))
+        return {
+            field: Pubkey.from_bytes(row[field]) if field in _PUBKEY_FIELDS else row[field]
+            for field in POOL_KEY_FIELDS
+        }
+
+    def pools_for(self, mint) -> List[Pubkey]:
+        """Pools trading ``mint``, deepest first once ranked."""
+        indexes = self._by_mint.get(bytes(Pubkey.from_string(str(mint))), ())
+        return [Pubkey.from_bytes(self._rows[index][0]) for index in indexes]
+
+    def pool_for(self, mint, quote=None) -> Optional[Pubkey]:
+        """
+        The deepest swappable pool pairing ``mint`` with ``quote`` (any quote
+        mint by default), by depth and status as of the last ``rank`` of
+        ``mint``.
+        """
+        mint = bytes(Pubkey.from_string(str(mint)))
+        quotes = (
+            {bytes(quote_mint) for quote_mint in self.quote_mints}
+            if quote is None
+            else {bytes(Pubkey.from_string(str(quote)))}
+        )
+        for index in self._by_mint.get(mint, ()):
+            row = self._rows[index]
+            other = row[7] if row[6] == mint else row[6]
+            if other in quotes and not row[_STATUS] & SWAP_DISABLED:
+                return Pubkey.from_bytes(row[0])
+        return None
+
+    def _filters(self, quote: Pubkey, offset: int) -> list:
+        return [
+            {"dataSize": POOL_ACCOUNT_SIZE},
+            {"memcmp": {"offset": offset, "bytes": str(quote)}},
+        ]
+
+    async def _program_accounts(self, length: int) -> Tuple[int, Iterable[tuple]]:
+        """(slot, [(pool, data slice)]) of every pool quoted in a quote mint."""
+        accounts = []
+        slot = 0
+        for quote in self.quote_mints:
+            for offset in (_MINT_A_OFFSET, _MINT_B_OFFSET):
+                result = await self.client.transport.request_json(
+                    "getProgramAccounts",
+                    [
+                        str(RAYDIUM_CPMM),
+                        {
+                            "encoding": "base64",
+                            "withContext": True,
+                            "dataSlice": {"offset": _SLICE_OFFSET, "length": length},
+                            "filters": self._filters(quote, offset),
+                        },
+                    ],
+                )
+                slot = max(slot, result["context"]["slot"])
+                accounts.extend(
+                    (
+                        bytes(Pubkey.from_string(entry["pubkey"])),
+                        base64.b64decode(entry["account"]["data"][0]),
+                    )
+                    for entry in result["value"]
+                )
+        return slot, accounts
+
+    def _replace(self, rows: Iterable[tuple], slot: int) -> None:
+        self._rows = list(rows)
+        self.slot = slot
+        self._index()
+        if self.path:
+            self.save()
+
+    async def scan(self) -> int:
+        """Downloads the keys of every pool again; returns how many were found."""
+        slot, accounts = await self._program_accounts(_SLICE_LENGTH)
+        rows = {pool: _ROW.unpack(pool + data) for pool, data in accounts}
+        self._replace(rows.values(), slot)
+        logger.info(f"Indexed {len(self._rows)} CPMM pools at slot {slot}")
+        if self._ranked:
+            await self.rank(*(Pubkey.from_bytes(mint) for mint in self._ranked))
+        return len(self._rows)
+
+    async def refresh(self) -> int:
+        """
+        Adds pools created since the last scan and drops closed ones.
+
+        Only the new pools' accounts are downloaded. Returns how many were added.
+        """
+        if not self._rows:
+            return await self.scan()
+        slot, accounts = await self._program_accounts(0)
+        current = {pool for pool, _ in accounts}
+        new = [pool for pool in current if pool not in self._by_pool]
+        rows = [row for row in self._rows if row[0] in current]
+        removed = len(self._rows) - len(rows)
+        fetched = await get_multiple_accounts(
+            self.client, [Pubkey.from_bytes(pool) for pool in new]
+        )
+        for pool, account in zip(new, fetched):
+            if account is None:
+                continue
+            data = bytes(account.data)[_SLICE_OFFSET : _SLICE_OFFSET + _SLICE_LENGTH]
+            rows.append(_ROW.unpack(pool + data))
+        self._replace(rows, slot)
+        logger.info(
+            f"Pool index refreshed at slot {slot}: {len(new)} new, {removed} closed, "
+            f"{len(self._rows)} total"
+        )
+        if self._ranked:
+            await self.rank(*(Pubkey.from_bytes(mint) for mint in self._ranked))
+        return len(new)
@@ -0,0 +1,133 @@
+"""Off-chain quoting for Raydium CPMM and AMM v4 pools.
+
+Mirrors ``CurveCalculator::swap_base_input`` of the raydium-cp-swap program:
+the trade fee is ``ceil(amount_in * tradeFeeRate / 1e6)``, protocol and fund
+fees are floor shares of the trade fee, and the output is the constant
+product of the vault balances net of accrued protocol/fund fees.
+
+AMM v4 ``swap_base_in`` is the same constant product with a
+``ceil(amount_in * swapFeeNumerator / swapFeeDenominator)`` fee, over
+reserves that include the open orders balances and exclude pending PnL.
+"""
+from typing import NamedTuple
+
+from utils.fastlayout import FAST_CPMM_CONFIG_INFO_LAYOUT
+from utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+FEE_RATE_DENOMINATOR = 1_000_000
+BPS_DENOMINATOR = 10_000
+
+
+class CpmmFees(NamedTuple):
+    """Fee rates of a CPMM config account, in millionths"""
+
+    trade_fee_rate: int
+    protocol_fee_rate: int
+    fund_fee_rate: int
+
+    @classmethod
+    def from_account(cls, data) -> "CpmmFees":
+        config = FAST_CPMM_CONFIG_INFO_LAYOUT.decode(data)
+        return cls(config.tradeFeeRate, config.protocolFeeRate, config.fundFeeRate)
+
+
+class CpmmQuote(NamedTuple):
+    amount_in: int
+    amount_out: int
+    trade_fee: int
+    protocol_fee: int
+    fund_fee: int
+    reserve_in: int
+    reserve_out: int
+
+    @property
+    def price_impact(self) -> float:
+        """Relative shortfall versus the pre-trade spot price (fees included)"""
+        if not self.amount_in or not self.reserve_in:
+            return 0.0
+        spot_out = self.amount_in * self.reserve_out / self.reserve_in
+        return 1 - self.amount_out / spot_out
+
+    def min_amount_out(self, slippage_bps: int) -> int:
+        return min_amount_out(self.amount_out, slippage_bps)
+
+
+def min_amount_out(amount_out: int, slippage_bps: int) -> int:
+    return amount_out * (BPS_DENOMINATOR - slippage_bps) // BPS_DENOMINATOR
+
+
+def quote_exact_in(
+    amount_in: int, reserve_in: int, reserve_out: int, fees: CpmmFees
+) -> CpmmQuote:
+    """Exact integer quote for selling ``amount_in`` into a CPMM pool."""
+    trade_fee = -(-amount_in * fees.trade_fee_rate // FEE_RATE_DENOMINATOR)
+    protocol_fee = trade_fee * fees.protocol_fee_rate // FEE_RATE_DENOMINATOR
+    fund_fee = trade_fee * fees.fund_fee_rate // FEE_RATE_DENOMINATOR
+    amount_in_less_fees = amount_in - trade_fee
+    amount_out = (
+        amount_in_less_fees * reserve_out // (reserve_in + amount_in_less_fees)
+        if reserve_in + amount_in_less_fees
+        else 0
+    )
+    return CpmmQuote(
+        amount_in, amount_out, trade_fee, protocol_fee, fund_fee, reserve_in, reserve_out
+    )
+
+
+class AmmV4Fees(NamedTuple):
+    """Swap fee of an AMM v4 pool, as numerator/denominator"""
+
+    numerator: int
+    denominator: int
+
+    @property
+    def trade_fee_rate(self) -> float:
+        """The fee in millionths, as ``quote_many`` takes it"""
+        return self.numerator * FEE_RATE_DENOMINATOR / self.denominator
+
+
+def quote_v4_exact_in(
+    amount_in: int, reserve_in: int, reserve_out: int, fees: AmmV4Fees
+) -> CpmmQuote:
+    """Exact integer quote for selling ``amount_in`` into an AMM v4 pool."""
+    trade_fee = -(-amount_in * fees.numerator // fees.denominator)
+    amount_in_less_fees = amount_in - trade_fee
+    amount_out = (
+        amount_in_less_fees * reserve_out // (reserve_in + amount_in_less_fees)
+        if reserve_in + amount_in_less_fees
+        else 0
+    )
+    return CpmmQuote(amount_in, amount_out, trade_fee, 0, 0, reserve_in, reserve_out)
+
+
+def quote_many(amounts_in, reserves_in, reserves_out, trade_fee_rates, exact=False):
+    """
+    Vectorised ``quote_exact_in`` output amounts.
+
+    All arguments broadcast against each other, so this quotes many candidate
+    sizes against one pool, one size against many pools, or a full grid.
+
+    With ``exact=False`` the maths runs in float64: outputs can be off by a
+    few units once reserves exceed ~2**53, which is fine for scanning but not
+    for a min-out. ``exact=True`` uses Python integers inside NumPy (object
+    arrays): exact, still a single call, but several times slower.
+    """
+    if exact:
+        amounts_in = np.asarray(amounts_in, dtype=object)
+        reserves_in = np.asarray(reserves_in, dtype=object)
+        reserves_out = np.asarray(reserves_out, dtype=object)
+        trade_fee_rates = np.asarray(trade_fee_rates, dtype=object)
+        trade_fee = -(-amounts_in * trade_fee_rates // FEE_RATE_DENOMINATOR)
+        net_in = amounts_in - trade_fee
+        return net_in * reserves_out // (reserves_in + net_in)
+
+    amounts_in = np.asarray(amounts_in, dtype=np.float64)
+    trade_fee = np.ceil(
+        amounts_in * np.asarray(trade_fee_rates, dtype=np.float64) / FEE_RATE_DENOMINATOR
+    )
+    net_in = amounts_in - trade_fee
+    reserves_in = np.asarray(reserves_in, dtype=np.float64)
+    reserves_out = np.asarray(reserves_out, dtype=np.float64)
+    return np.floor(reserves_out * (net_in / (reserves_in + net_in)))
@@ -1,18 +1,18 @@
-import json, time
-from solana.rpc.types import TxOpts
-from solana.transaction import AccountMeta, Signature, Transaction
-from solders.instruction import Instruction, CompiledInstruction  # type: ignore
+import asyncio
+import time
+from typing import Callable, List, Optional
+from solders.instruction import AccountMeta, Instruction  # type: ignore
 from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price  # type: ignore
 from solders.keypair import Keypair  # type: ignore
 from solders.pubkey import Pubkey  # type: ignore
-from solders.transaction import VersionedTransaction  # type: ignore
-from solders.message import MessageV0  # type: ignore
-from spl.token.instructions import close_account, CloseAccountParams
-from spl.token.constants import TOKEN_2022_PROGRAM_ID
+from spl.token.instructions import (
+    close_account,
+    CloseAccountParams,
+)
 from loguru import logger
-from utils.blockchain import SolanaClient
+from utils import ammv4
+from utils.blockchain import SolanaClient, create_associated_token_account_idempotent
 from utils.config import (
-    TEST_AMM_KEY,
     WSOL,
     TOKEN_PROGRAM_ID,
     UNIT_BUDGET,
@@ -20,15 +20,46 @@ from utils.config import (
     RAYDIUM_CPMM_AUTHORITY,
     RAYDIUM_CPMM,
     RAYDIUM_LIQUIDITY_POOL,
+    SELL_SLIPPAGE_BPS,
+    FEE_ORACLE,
+    FEE_MAX_ATTEMPTS,
+    WSOL_PERSISTENT,
+    LOOKUP_TABLES,
+    ROUTE_SELLS,
 )
 from utils.extractor import SWAP_LAYOUT
+from utils.fastlayout import FAST_ACCOUNT_LAYOUT, FAST_CPMM_POOL_INFO_LAYOUT
+from utils.journal import TradeEntry
+from utils.lookup import pool_addresses
+from utils.metrics import METRICS, span
+from utils.quote import CpmmQuote, quote_exact_in, quote_v4_exact_in
+from utils.router import AMM_V4, CPMM, best_route
+from utils.templates import SwapTemplate, TemplateCache
+from utils.watcher import PoolReserves
+from utils.wsol import WSOL_MINT, WsolAccounts
+
+
+SELLS = METRICS.counter("sells_total", "Submitted sells by final status", ["status"])
+SELL_CONFIRMATION = METRICS.histogram(
+    "sell_confirmation_seconds", "Time from first send to confirmation of a sell"
+)
 
 
 class RaydiumClient(SolanaClient):
     """Raydium helper"""
 
-    def __init__(self, keys: str = None) -> None:
-        super().__init__(keys=keys)
+    templates = TemplateCache()
+    wsol = WsolAccounts()
+    amm_v4 = ammv4.AmmV4Pools(SolanaClient.client)
+
+    def __init__(
+        self,
+        keys: str = None,
+        keypair: Keypair = None,
+        pubkey: Pubkey = None,
+        load_keypair: Callable[[], Optional[Keypair]] = None,
+    ) -> None:
+        super().__init__(keys, keypair, pubkey, load_keypair)
 
     def make_swap_instruction(
         self,
@@ -37,9 +68,23 @@ class RaydiumClient(SolanaClient):
         token_account_out: Pubkey,
         account: dict,
         owner: Keypair,
+        min_amount_out: int = 0,
+        *,
+        pair: Pubkey,
+        mint_in: Pubkey = None,
     ) -> Instruction:
+        """
+        CPMM swap of ``amount_in`` of ``mint_in`` on ``pair``.
 
-        data = SWAP_LAYOUT.build(dict(amountInMax=int(amount_in), amountOut=0))
+        The input vault, token program and mint follow ``mint_in`` (mintA when
+        not given), the output ones are the other side of the pool.
+        """
+        data = SWAP_LAYOUT.build(
+            dict(amountInMax=int(amount_in), amountOut=int(min_amount_out))
+        )
+        side_in, side_out = "A", "B"
+        if mint_in is not None and str(mint_in) == str(account["mintB"]):
+            side_in, side_out = "B", "A"
         swap_instruction = Instruction(
             RAYDIUM_CPMM,
             accounts=[
@@ -50,28 +95,32 @@ class RaydiumClient(SolanaClient):
                 AccountMeta(
                     pubkey=account["configId"], is_signer=False, is_writable=False
                 ),
-                AccountMeta(pubkey=TEST_AMM_KEY, is_signer=False, is_writable=True),
+                AccountMeta(pubkey=pair, is_signer=False, is_writable=True),
                 AccountMeta(pubkey=token_account_in, is_signer=False, is_writable=True),
                 AccountMeta(
                     pubkey=token_account_out, is_signer=False, is_writable=True
                 ),
                 AccountMeta(
-                    pubkey=account["vaultA"], is_signer=False, is_writable=True
+                    pubkey=account["vault" + side_in], is_signer=False, is_writable=True
                 ),
                 AccountMeta(
-                    pubkey=account["vaultB"], is_signer=False, is_writable=True
+                    pubkey=account["vault" + side_out], is_signer=False, is_writable=True
                 ),
                 AccountMeta(
-                    pubkey=account["mintProgramA"], is_signer=False, is_writable=False
+                    pubkey=account["mintProgram" + side_in],
+                    is_signer=False,
+                    is_writable=False,
                 ),
                 AccountMeta(
-                    pubkey=account["mintProgramB"], is_signer=False, is_writable=False
+                    pubkey=account["mintProgram" + side_out],
+                    is_signer=False,
+                    is_writable=False,
                 ),
                 AccountMeta(
-                    pubkey=account["mintA"], is_signer=False, is_writable=False
+                    pubkey=account["mint" + side_in], is_signer=False, is_writable=False
                 ),
                 AccountMeta(
-                    pubkey=account["mintB"], is_signer=False, is_writable=False
+                    pubkey=account["mint" + side_out], is_signer=False, is_writable=False
                 ),
                 AccountMeta(
                     pubkey=account["observationId"], is_signer=False, is_writable=True
@@ -81,21 +130,61 @@ class RaydiumClient(SolanaClient):
         )
         return swap_instruction
 
-    async def make_sell_swap(self, pair: Pubkey, amount_in_lamports: int, mint: str):
-        pool_keys = await self.pool_info(TEST_AMM_KEY)
-        # Convert amount to integer
-        amount_in = int(amount_in_lamports)
-        token_account = await self.get_token_account(mint)
+    def make_sell_instructions(
+        self,
+        amount_in: int,
+        token_account: Pubkey,
+        pool_keys: dict,
+        keep_wsol: bool = False,
+        create_wsol: bool = True,
+        *,
+        pair: Pubkey,
+        kind: str = CPMM,
+    ) -> List[Instruction]:
+        """
+        Compute budget, wSOL account creation, swap and wSOL close.
 
-        # Get wSOL token account and instructions
-        wsol_token_account, wsol_token_account_instructions = (
-            await self.get_token_accounts(WSOL)
+        Sells the non-wSOL side of ``pair`` (held in ``token_account``), a
+        CPMM pool or, with ``kind`` AMM_V4, a v4 pool. With ``keep_wsol`` the
+        wSOL account is left open after the swap, and with ``create_wsol``
+        False it is assumed to exist already.
+        """
+        mint_a, mint_b = (
+            ("baseMint", "quoteMint") if kind == AMM_V4 else ("mintA", "mintB")
         )
+        if str(pool_keys[mint_a]) == WSOL:
+            mint_in = pool_keys[mint_b]
+        elif str(pool_keys[mint_b]) == WSOL:
+            mint_in = pool_keys[mint_a]
+        else:
+            raise ValueError(f"Pool {pair} is not quoted in wSOL")
+        wsol_token_account = self.associated_token_address(WSOL_MINT)
+        # wSOL is closed after every sell, so (re)create it idempotently
+        # instead of looking it up first
+        wsol_token_account_instructions = None
+        if create_wsol:
+            wsol_token_account_instructions = create_associated_token_account_idempotent(
+                self.keypair.pubkey(), self.keypair.pubkey(), WSOL_MINT
+            )
 
-        logger.info("Creating swap instructions...")
-        swap_instructions = self.make_swap_instruction(
-            amount_in, token_account, wsol_token_account, pool_keys, self.keypair
-        )
+        if kind == AMM_V4:
+            swap_instructions = ammv4.make_swap_instruction(
+                amount_in,
+                token_account,
+                wsol_token_account,
+                pool_keys,
+                self.keypair.pubkey(),
+            )
+        else:
+            swap_instructions = self.make_swap_instruction(
+                amount_in,
+                token_account,
+                wsol_token_account,
+                pool_keys,
+                self.keypair,
+                pair=pair,
+                mint_in=mint_in,
+            )
 
         close_account_instructions = close_account(
             CloseAccountParams(
@@ -106,7 +195,6 @@ class RaydiumClient(SolanaClient):
             )
         )
 
-        print(swap_instructions)
         # Initialize instructions list
         instructions = []
         instructions.append(set_compute_unit_limit(UNIT_BUDGET))
@@ -114,25 +202,316 @@ class RaydiumClient(SolanaClient):
         if wsol_token_account_instructions:
             instructions.append(wsol_token_account_instructions)
         instructions.append(swap_instructions)
-        instructions.append(close_account_instructions)
+        if not keep_wsol:
+            instructions.append(close_account_instructions)
+        return instructions
+
+    async def sell_template(
+        self, pair: Pubkey, mint: str, kind: str = CPMM
+    ) -> SwapTemplate:
+        """
+        Precompiled sell transaction for this wallet and pool, built once.
+
+        In persistent wSOL mode the sell is just the compute budget and the
+        swap once the wallet's wSOL account is known to be open. With
+        ``LOOKUP_TABLES`` the message is compiled against the pool's lookup
+        table, if one has been set up (see ``ensure_lookup_table``).
+        """
+        variant = "sell"
+        if WSOL_PERSISTENT:
+            variant = "sell:wsol-create"
+            if self.keypair.pubkey() in self.wsol:
+                variant = "sell:wsol"
+        template = self.templates.get(pair, self.keypair.pubkey(), variant)
+        if template is None:
+            logger.info("Creating swap instructions...")
+            with span("pool"):
+                if kind == AMM_V4:
+                    pool_keys = await self.amm_v4.keys(pair)
+                else:
+                    pool_keys = await self.pool_keys(pair)
+            with span("accounts"):
+                token_account = await self.get_token_account(mint)
+            with span("build"):
+                instructions = self.make_sell_instructions(
+                    0,
+                    token_account,
+                    pool_keys,
+                    keep_wsol=WSOL_PERSISTENT,
+                    create_wsol=variant != "sell:wsol",
+                    pair=pair,
+                    kind=kind,
+                )
+            program = RAYDIUM_LIQUIDITY_POOL if kind == AMM_V4 else RAYDIUM_CPMM
+            swap_index = next(
+                index
+                for index, instruction in enumerate(instructions)
+                if instruction.program_id == program
+            )
+            lookup_tables = []
+            if LOOKUP_TABLES:
+                with span("lookup"):
+                    lookup_tables = await self.lookup_tables.tables_for(pair)
+            with span("compile"):
+                template = SwapTemplate(
+                    self.keypair.pubkey(),
+                    instructions,
+                    swap_index,
+                    lookup_tables,
+                    bytes([ammv4.SWAP_BASE_IN]) if kind == AMM_V4 else b"",
+                )
+            self.templates.put(pair, self.keypair.pubkey(), variant, template)
+        return template
+
+    async def ensure_lookup_table(self, pair: Pubkey):
+        """
+        Creates or extends a lookup table covering ``pair``, paid and owned by
+        this wallet, and drops the sell templates compiled without it.
+        """
+        pool_keys = await self.pool_keys(pair)
+        table = await self.lookup_tables.ensure(
+            self, pair, pool_addresses(pair, pool_keys)
+        )
+        self.templates.invalidate(pool=pair)
+        return table
 
-        # Compile the message
+    async def quote_sell(
+        self,
+        pair: Pubkey,
+        amount_in: int,
+        mint,
+        reserves: PoolReserves = None,
+        kind: str = CPMM,
+    ) -> CpmmQuote:
+        """
+        Quotes selling ``amount_in`` of ``mint`` into a CPMM pool, off-chain.
+
+        Uses ``reserves`` from a PoolWatcher when given, otherwise reads the pool
+        and both vaults in a single getMultipleAccounts call. v4 pools (``kind``
+        AMM_V4) always read the pool, vaults and open orders.
+        """
+        if kind == AMM_V4:
+            pool_keys = await self.amm_v4.keys(pair)
+            accounts = (
+                await self.client.get_multiple_accounts(ammv4.reserve_accounts(pool_keys))
+            ).value
+            base, quote = ammv4.reserves(
+                *(account.data if account is not None else None for account in accounts)
+            )
+            if str(mint) == str(pool_keys["baseMint"]):
+                return quote_v4_exact_in(amount_in, base, quote, pool_keys["fees"])
+            return quote_v4_exact_in(amount_in, quote, base, pool_keys["fees"])
+        pool_keys = await self.pool_keys(pair)
+        fees = await self.amm_config(pool_keys["configId"])
+        if reserves is None:
+            pool, vault_a, vault_b = (
+                await self.client.get_multiple_accounts(
+                    [pair, pool_keys["vaultA"], pool_keys["vaultB"]]
+                )
+            ).value
+            pool = FAST_CPMM_POOL_INFO_LAYOUT.decode(pool.data)
+            reserve_a = (
+                FAST_ACCOUNT_LAYOUT.read("amount", vault_a.data)
+                - pool.protocolFeesMintA
+                - pool.fundFeesMintA
+            )
+            reserve_b = (
+                FAST_ACCOUNT_LAYOUT.read("amount", vault_b.data)
+                - pool.protocolFeesMintB
+                - pool.fundFeesMintB
+            )
+        else:
+            reserve_a, reserve_b = reserves.reserve_a, reserves.reserve_b
+        if str(mint) == str(pool_keys["mintA"]):
+            return quote_exact_in(amount_in, reserve_a, reserve_b, fees)
+        return quote_exact_in(amount_in, reserve_b, reserve_a, fees)
+
+    async def make_sell_swap(
+        self,
+        pair: Pubkey,
+        amount_in_lamports: int,
+        mint: str,
+        slippage_bps: int = SELL_SLIPPAGE_BPS,
+        reserves: PoolReserves = None,
+        kind: str = None,
+    ):
+        """
+        Sells ``amount_in_lamports`` of ``mint`` on ``pair``.
+
+        ``pair`` may be None: with ``ROUTE_SELLS`` the CPMM or v4 pool giving
+        the best output is picked (see ``utils.router``), otherwise the deepest
+        pool of ``mint`` in the pool registry. ``kind`` defaults to AMM_V4 for
+        known v4 pools and CPMM otherwise. The min output is quoted from the
+        router's quote or ``reserves`` (a PoolWatcher's) when there is one,
+        otherwise from a fresh read of the pool. Every submission,
+        and a sell that raises before one was journaled, is recorded in the
+        trade journal.
+
+        In persistent wSOL mode, a sell that fails because the wallet's wSOL
+        account was closed outside the bot is sold again with the template
+        that creates the account.
+        """
+        # Convert amount to integer
+        amount_in = int(amount_in_lamports)
+        owner = self.keypair.pubkey()
+        had_wsol = WSOL_PERSISTENT and owner in self.wsol
+        result = await self._journaled_sell(pair, amount_in, mint, slippage_bps, reserves, kind)
+        if had_wsol and result.status == "failed" and await self.wsol_closed():
+            logger.warning(f"wSOL account of {owner} was closed, selling again with its creation")
+            result = await self._journaled_sell(pair, amount_in, mint, slippage_bps, None, kind)
+        return result
 
-        compiled_message = MessageV0.try_compile(
-            self.keypair.pubkey(),
-            [instruction for instruction in instructions],
-            [],
-            (await self.client.get_latest_blockhash()).value.blockhash,
+    async def wsol_closed(self) -> bool:
+        """True, and the wallet no longer counted as open, if its wSOL account is gone."""
+        wsol_account = self.associated_token_address(WSOL_MINT)
+        if (await self.client.get_account_info(wsol_account)).value is not None:
+            return False
+        self.wsol.forget(self.keypair.pubkey())
+        return True
+
+    async def _journaled_sell(
+        self,
+        pair: Pubkey,
+        amount_in: int,
+        mint: str,
+        slippage_bps: int,
+        reserves: PoolReserves,
+        kind: str,
+    ):
+        entry = TradeEntry(
+            self.wallet_index, self.keypair.pubkey(), mint, amount_in, time.time()
         )
+        try:
+            return await self._sell_swap(
+                entry, pair, amount_in, mint, slippage_bps, reserves, kind
+            )
+        except Exception:
+            # A retry that raises after an attempt was journaled adds no record
+            if not entry.journaled:
+                self.journal.record(entry)
+            raise
 
-        # # Create and send transaction
-        # logger.info("Creating and sending transaction...")
-        transaction = VersionedTransaction(compiled_message, [self.keypair])
+    async def _sell_swap(
+        self,
+        entry: TradeEntry,
+        pair: Pubkey,
+        amount_in: int,
+        mint: str,
+        slippage_bps: int,
+        reserves: PoolReserves,
+        kind: str,
+    ):
+        quote = None
+        if pair is None and ROUTE_SELLS:
+            with span("route"):
+                route = await best_route(self, mint, amount_in)
+            if route is None:
+                raise ValueError(f"No pool found for {mint}")
+            pair, kind, quote = route.pool, route.kind, route.quote
+        elif pair is None:
+            pair = self.pools.pool_for(mint)
+            if pair is None:
+                raise ValueError(f"No indexed pool for {mint}")
+        if kind is None:
+            kind = AMM_V4 if pair in self.amm_v4 else CPMM
+        if kind == AMM_V4:
+            # Watcher reserves describe CPMM pools
+            reserves = None
+        entry.pool, entry.kind = pair, kind
+        with span("total"):
+            template = await self.sell_template(pair, mint, kind)
+            entry.template_at = time.time()
+            # The template already looked these up, so they come from cache
+            if kind == AMM_V4:
+                pool_keys = await self.amm_v4.keys(pair)
+                base = str(mint) == str(pool_keys["baseMint"])
+                entry.decimals = pool_keys["baseDecimals" if base else "quoteDecimals"]
+                fee_accounts = [pair, pool_keys["baseVault"], pool_keys["quoteVault"]]
+            else:
+                pool_keys = await self.pool_keys(pair)
+                side_a = str(mint) == str(pool_keys["mintA"])
+                entry.decimals = pool_keys["mintDecimalA" if side_a else "mintDecimalB"]
+                fee_accounts = [
+                    pair,
+                    pool_keys["vaultA"],
+                    pool_keys["vaultB"],
+                    pool_keys["observationId"],
+                ]
+            unit_price = None
+            if FEE_ORACLE:
+                with span("fees"):
+                    unit_price, _ = await asyncio.gather(
+                        self.fees.price(fee_accounts),
+                        self.fees.compute_limit(template, amount_in),
+                    )
+                entry.priced_at = time.time()
+            for attempt in range(max(1, FEE_MAX_ATTEMPTS)):
+                min_amount_out = 0
+                if slippage_bps is not None:
+                    # The router's quote and the caller's reserves describe the
+                    # pool before the first attempt; a retry re-reads it
+                    if quote is None or attempt:
+                        with span("quote"):
+                            quote = await self.quote_sell(
+                                pair, amount_in, mint, None if attempt else reserves, kind
+                            )
+                    min_amount_out = quote.min_amount_out(slippage_bps)
+                    entry.quoted_at = time.time()
+                    entry.quoted_out = quote.amount_out
 
-        txn_sig = await self.client.send_transaction(
-            transaction,
-            # self.keypair,
-            opts=TxOpts(skip_preflight=False, preflight_commitment="confirmed"),
+                # Patch amount and blockhash into the compiled message and sign it
+                with span("blockhash"):
+                    blockhash, last_valid_block_height = (
+                        await self.blockhash.latest_with_expiry()
+                    )
+                price = None
+                if unit_price is not None:
+                    price = self.fees.step_up(unit_price, attempt)
+                with span("sign"):
+                    message = template.render(amount_in, min_amount_out, blockhash, price)
+                    transaction = await self.signer.sign(self.keypair, message)
+                entry.signed_at = time.time()
+                entry.min_amount_out = min_amount_out
+                entry.unit_price = (price if price is not None else template.unit_price) or 0
+                entry.unit_limit = template.unit_limit or 0
+
+                # The first broadcast and the wait for confirmation are timed apart
+                with span("send"):
+                    signature = await self.submitter.submit(
+                        transaction, last_valid_block_height, wait=False
+                    )
+                with span("confirm"):
+                    result = await self.submitter.confirm(signature)
+                self.journal.record(entry, attempt, result)
+                entry.journaled = True
+                # Only re-sign once the previous blockhash expired: two live
+                # copies at different prices could both land and sell twice.
+                # "expired" means getBlockHeight is past its last valid height
+                # and a final status check did not see it
+                if result.status != "expired" or not FEE_ORACLE:
+                    break
+                logger.info(
+                    f"Sell {result.signature} expired, resubmitting with a higher fee"
+                )
+        if WSOL_PERSISTENT and result.ok:
+            self.wsol.mark(self.keypair.pubkey())
+        SELLS.inc(result.status)
+        if result.time_to_confirm is not None:
+            SELL_CONFIRMATION.observe(result.time_to_confirm)
+        logger.info(
+            f"Transaction Signature: {result.signature} ({result.status}, "
+            f"{result.broadcasts} broadcasts)"
         )
-        logger.info("Transaction Signature:", txn_sig.value)
-        return
+        return result
+
+
+METRICS.callback(
+    "template_cache_hits_total",
+    "Sells signed from a precompiled template",
+    lambda: RaydiumClient.templates.hits,
+)
+METRICS.callback(
+    "template_cache_misses_total",
+    "Sell templates compiled from scratch",
+    lambda: RaydiumClient.templates.misses,
+)
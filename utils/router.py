@@ -0,0 +1,139 @@
+"""Best-output routing of a sell across CPMM and AMM v4 pools.
+
+Candidates are the mint's CPMM pools from the pool registry and its v4 pools
+(discovered once per mint). Every account a quote depends on - CPMM pools and
+vaults, unknown CPMM configs, v4 pools, vaults and open orders - is read in
+one batched ``getMultipleAccounts`` pass, and all candidates are ranked at
+once with ``quote_many``. A candidate with any of these accounts missing is
+skipped. The quotes returned are exact.
+"""
+from typing import List, NamedTuple, Optional
+
+from solders.pubkey import Pubkey  # type: ignore
+
+from utils import ammv4
+from utils.config import WSOL
+from utils.fastlayout import FAST_ACCOUNT_LAYOUT, FAST_CPMM_POOL_INFO_LAYOUT
+from utils.lazy import lazy_import
+from utils.quote import CpmmFees, CpmmQuote, quote_exact_in, quote_many, quote_v4_exact_in
+from utils.snapshot import get_multiple_accounts
+
+np = lazy_import("numpy")
+
+CPMM = "cpmm"
+AMM_V4 = "amm_v4"
+
+
+class Route(NamedTuple):
+    """A pool to sell into and the quote it gave"""
+
+    kind: str
+    pool: Pubkey
+    quote: CpmmQuote
+
+
+async def quote_routes(client, mint, amount_in: int) -> List[Route]:
+    """
+    Exact quotes for selling ``amount_in`` of ``mint`` into wSOL on every
+    candidate pool, best output first.
+
+    ``client`` is a ``RaydiumClient`` (for its pool registry, CPMM configs
+    and v4 pools).
+    """
+    mint = str(mint)
+    cpmm = []
+    for pool in client.pools.pools_for(mint):
+        keys = await client.pool_keys(pool)
+        if WSOL in (str(keys["mintA"]), str(keys["mintB"])):
+            cpmm.append((pool, keys))
+    v4 = [
+        keys
+        for keys in await client.amm_v4.pools_for(mint)
+        if WSOL in (str(keys["baseMint"]), str(keys["quoteMint"]))
+    ]
+    if not cpmm and not v4:
+        return []
+
+    configs = list(
+        {
+            str(keys["configId"]): keys["configId"]
+            for _, keys in cpmm
+            if str(keys["configId"]) not in client.amm_configs
+        }.values()
+    )
+    accounts = list(configs)
+    for pool, keys in cpmm:
+        accounts += [pool, keys["vaultA"], keys["vaultB"]]
+    for keys in v4:
+        accounts += ammv4.reserve_accounts(keys)
+    fetched = await get_multiple_accounts(client.client, accounts)
+    for config, account in zip(configs, fetched):
+        if account is not None:
+            client.amm_configs[str(config)] = CpmmFees.from_account(account.data)
+    position = len(configs)
+
+    candidates = []
+    for pool, keys in cpmm:
+        pool_account, vault_a, vault_b = fetched[position : position + 3]
+        position += 3
+        fees = client.amm_configs.get(str(keys["configId"]))
+        if pool_account is None or vault_a is None or vault_b is None or fees is None:
+            continue
+        state = FAST_CPMM_POOL_INFO_LAYOUT.decode(pool_account.data)
+        reserve_a = (
+            FAST_ACCOUNT_LAYOUT.read("amount", vault_a.data)
+            - state.protocolFeesMintA
+            - state.fundFeesMintA
+        )
+        reserve_b = (
+            FAST_ACCOUNT_LAYOUT.read("amount", vault_b.data)
+            - state.protocolFeesMintB
+            - state.fundFeesMintB
+        )
+        if str(keys["mintA"]) == mint:
+            reserve_in, reserve_out = reserve_a, reserve_b
+        else:
+            reserve_in, reserve_out = reserve_b, reserve_a
+        candidates.append(
+            (CPMM, Pubkey.from_string(str(pool)), reserve_in, reserve_out, fees)
+        )
+    for keys in v4:
+        amm, base_vault, quote_vault, open_orders = fetched[position : position + 4]
+        position += 4
+        if amm is None or base_vault is None or quote_vault is None:
+            continue
+        base, quote = ammv4.reserves(
+            amm.data,
+            base_vault.data,
+            quote_vault.data,
+            open_orders.data if open_orders is not None else None,
+        )
+        if str(keys["baseMint"]) == mint:
+            reserve_in, reserve_out = base, quote
+        else:
+            reserve_in, reserve_out = quote, base
+        candidates.append((AMM_V4, keys["id"], reserve_in, reserve_out, keys["fees"]))
+    if not candidates:
+        return []
+
+    _, _, reserves_in, reserves_out, fees = zip(*candidates)
+    outputs = quote_many(
+        amount_in,
+        reserves_in,
+        reserves_out,
+        [fee.trade_fee_rate for fee in fees],
+    )
+    routes = []
+    for index in np.argsort(-outputs, kind="stable"):
+        kind, pool, reserve_in, reserve_out, fee = candidates[index]
+        quote = (quote_exact_in if kind == CPMM else quote_v4_exact_in)(
+            amount_in, reserve_in, reserve_out, fee
+        )
+        routes.append(Route(kind, pool, quote))
+    return routes
+
+
+async def best_route(client, mint, amount_in: int) -> Optional[Route]:
+    """The pool giving the most wSOL for ``amount_in`` of ``mint``, or None."""
+    routes = await quote_routes(client, mint, amount_in)
+    return routes[0] if routes else None
@@ -0,0 +1,300 @@
+"""Long-running job scheduler with a shared RPC credit budget.
+
+``TokenBucket`` meters RPC credits: every HTTP request the transport sends
+waits until the bucket holds enough credits for that method, so sustained
+throughput sits at the provider quota while bursts up to ``capacity`` go out
+at once. ``Scheduler`` runs per-wallet jobs on jittered intervals. When
+``max_in_flight`` jobs are running, due jobs wait for a slot instead of being
+dropped, and ``stop()`` lets in-flight jobs finish before returning.
+"""
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+
+from loguru import logger
+
+from utils.config import (
+    RPC_CREDITS_BURST,
+    RPC_CREDITS_PER_SEC,
+    RPC_METHOD_COSTS,
+    SCHEDULER_DRAIN_TIMEOUT,
+    SCHEDULER_INTERVAL,
+    SCHEDULER_JITTER,
+    SELL_CONCURRENCY,
+)
+
+DEFAULT_METHOD_COSTS = {
+    "getProgramAccounts": 10,
+    "getTokenAccountsByOwner": 5,
+    "getSignaturesForAddress": 5,
+    "simulateTransaction": 2,
+    "getMultipleAccounts": 2,
+}
+"""Credits charged per call; anything not listed costs 1"""
+
+_METHOD_ALIASES = {
+    "sendRawTransaction": "sendTransaction",
+    "sendLegacyTransaction": "sendTransaction",
+    "sendVersionedTransaction": "sendTransaction",
+}
+
+
+def method_name(name: str) -> str:
+    """JSON-RPC method for a solders request class name (``GetBalance`` -> ``getBalance``)."""
+    name = name[:1].lower() + name[1:]
+    if name.endswith("JsonParsed"):
+        name = name[: -len("JsonParsed")]
+    return _METHOD_ALIASES.get(name, name)
+
+
+class TokenBucket:
+    """
+    Async token bucket refilled at ``rate`` credits per second.
+
+    Waiters are served in arrival order, so a large call is never starved by a
+    stream of cheap ones. A call costing more than ``capacity`` waits for a
+    full bucket and leaves it in debt.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        costs: Optional[Mapping[str, float]] = None,
+    ) -> None:
+        if rate <= 0:
+            raise ValueError("Token bucket rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.costs: Dict[str, float] = {**DEFAULT_METHOD_COSTS, **(costs or {})}
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.spent = 0.0
+        self.waited = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def __repr__(self) -> str:
+        return f"TokenBucket(rate={self.rate}, capacity={self.capacity}, tokens={self.tokens:.1f})"
+
+    def cost(self, method: str) -> float:
+        return self.costs.get(method_name(method), 1)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    @property
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+    def try_acquire(self, credits: float = 1) -> bool:
+        """Takes ``credits`` if they are available right now and nobody is queued."""
+        if self._lock is not None and self._lock.locked():
+            return False
+        self._refill()
+        if self.paused_until > time.monotonic() or self.tokens < min(credits, self.capacity):
+            return False
+        self.tokens -= credits
+        self.spent += credits
+        return True
+
+    async def acquire(self, credits: float = 1) -> float:
+        """Waits until ``credits`` are available and takes them; returns the wait."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                self._refill()
+                delay = self.paused_until - time.monotonic()
+                if delay <= 0:
+                    deficit = min(credits, self.capacity) - self.tokens
+                    if deficit <= 0:
+                        break
+                    delay = deficit / self.rate
+                await asyncio.sleep(delay)
+            self.tokens -= credits
+            self.spent += credits
+        waited = time.monotonic() - started
+        self.waited += waited
+        return waited
+
+    def pause(self, seconds: float) -> None:
+        """Stops handing out credits for ``seconds`` (e.g. after an HTTP 429)."""
+        self.tokens = min(self.tokens, 0.0)
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def make_budget(
+    rate: float = RPC_CREDITS_PER_SEC,
+    capacity: float = RPC_CREDITS_BURST,
+    costs: Mapping[str, float] = RPC_METHOD_COSTS,
+) -> Optional[TokenBucket]:
+    """The configured RPC budget, or None when it is unlimited."""
+    if rate <= 0:
+        return None
+    return TokenBucket(rate, capacity, costs)
+
+
+class Job:
+    """A coroutine function run every ``interval`` (+/- ``jitter``) seconds."""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable],
+        interval: float,
+        jitter: float,
+    ) -> None:
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.runs = 0
+        self.failures = 0
+        self.lateness = 0.0
+
+    def next_delay(self) -> float:
+        spread = self.interval * self.jitter
+        return max(0.0, self.interval + random.uniform(-spread, spread))
+
+
+class Scheduler:
+    """
+    Runs jobs on jittered intervals with at most ``max_in_flight`` at once.
+
+    The first run of every job is spread uniformly over one interval so a
+    fleet of wallets does not fire together. A job is only rescheduled after
+    its previous run finished, so the same wallet never runs twice at once.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = SELL_CONCURRENCY,
+        drain_timeout: float = SCHEDULER_DRAIN_TIMEOUT,
+    ) -> None:
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.drain_timeout = drain_timeout
+        self.jobs: Dict[str, Job] = {}
+        self._queue: List[Tuple[float, int, Job]] = []
+        self._order = itertools.count()
+        self._in_flight: set = set()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping: Optional[asyncio.Event] = None
+        # Set by stop() even before run() has created its events
+        self.stopped = False
+        self.started = 0.0
+
+    def add(
+        self,
+        name: str,
+        func: Callable[[], Awaitable],
+        interval: float = SCHEDULER_INTERVAL,
+        jitter: float = SCHEDULER_JITTER,
+        delay: Optional[float] = None,
+    ) -> Job:
+        """Schedules ``func``; the first run is after ``delay`` (random within one interval by default)."""
+        if name in self.jobs:
+            raise ValueError(f"Job {name} is already scheduled")
+        job = self.jobs[name] = Job(name, func, interval, jitter)
+        if delay is None:
+            delay = random.uniform(0, interval)
+        self._push(job, delay)
+        return job
+
+    def _push(self, job: Job, delay: float) -> None:
+        heapq.heappush(self._queue, (time.monotonic() + delay, next(self._order), job))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    async def _execute(self, job: Job, due: float) -> None:
+        job.lateness = max(0.0, time.monotonic() - due)
+        try:
+            await job.func()
+        except Exception as e:
+            job.failures += 1
+            logger.error(f"Job {job.name} failed: {e!r}")
+        finally:
+            job.runs += 1
+            self._slots.release()
+        if not self._stopping.is_set() and job.name in self.jobs:
+            self._push(job, job.next_delay())
+
+    async def _sleep_until(self, deadline: float) -> None:
+        """Sleeps until ``deadline``, waking early if a job is added or we stop."""
+        self._wakeup.clear()
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            return
+        waiters = [
+            asyncio.ensure_future(self._wakeup.wait()),
+            asyncio.ensure_future(self._stopping.wait()),
+        ]
+        try:
+            await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+    async def run(self) -> None:
+        """Dispatches jobs until ``stop()`` is called, then drains in-flight ones."""
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        if self.stopped:
+            self._stopping.set()
+        self.started = time.monotonic()
+        logger.info(f"Scheduler started with {len(self.jobs)} jobs")
+        try:
+            while not self._stopping.is_set():
+                if not self._queue:
+                    await self._sleep_until(float("inf"))
+                    continue
+                due, _, job = self._queue[0]
+                if due > time.monotonic():
+                    await self._sleep_until(due)
+                    continue
+                # Backpressure: hold due jobs until a slot frees up
+                await self._slots.acquire()
+                if self._stopping.is_set():
+                    self._slots.release()
+                    break
+                heapq.heappop(self._queue)
+                task = asyncio.ensure_future(self._execute(job, due))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+        finally:
+            await self.drain()
+
+    async def drain(self) -> None:
+        if not self._in_flight:
+            return
+        logger.info(f"Waiting for {len(self._in_flight)} in-flight jobs")
+        done, pending = await asyncio.wait(
+            set(self._in_flight), timeout=self.drain_timeout
+        )
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"Cancelled {len(pending)} jobs still running after {self.drain_timeout}s")
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def stop(self) -> None:
+        """
+        Stops dispatching new jobs; ``run()`` returns once in-flight ones finish.
+        Called before ``run()``, it makes ``run()`` return straight away.
+        """
+        self.stopped = True
+        if self._stopping is not None:
+            self._stopping.set()
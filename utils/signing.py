@@ -0,0 +1,170 @@
+"""Transaction signing off the event loop.
+
+ed25519 signing and message compilation are pure CPU work and hold the GIL,
+so with thousands of wallets selling in the same window they delay every
+pending RPC await. ``Signer`` collects sign requests for up to
+``batch_delay`` seconds (or ``batch_size`` requests) and hands each batch to
+a process pool, so the event loop only queues bytes and awaits results.
+
+Workers receive secret keys and serialized messages (or instructions to
+compile) and return wire-format transactions; keypairs are parsed once per
+worker and cached. With ``workers`` 0 everything is signed inline, as before.
+"""
+import asyncio
+import concurrent.futures
+import multiprocessing
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from solders.hash import Hash  # type: ignore
+from solders.instruction import Instruction  # type: ignore
+from solders.keypair import Keypair  # type: ignore
+from solders.message import MessageV0, to_bytes_versioned  # type: ignore
+
+from utils.config import SIGNING_BATCH, SIGNING_BATCH_DELAY, SIGNING_MODE, SIGNING_WORKERS
+
+_keypairs: Dict[bytes, Keypair] = {}
+
+
+def _keypair(secret: bytes) -> Keypair:
+    keypair = _keypairs.get(secret)
+    if keypair is None:
+        keypair = _keypairs[secret] = Keypair.from_bytes(secret)
+    return keypair
+
+
+def sign_message(keypair: Keypair, message: bytes) -> bytes:
+    """Wire-format transaction of a serialized message with one signer."""
+    return b"\x01" + bytes(keypair.sign_message(message)) + message
+
+
+def compile_message(
+    keypair: Keypair,
+    instructions: Sequence[Instruction],
+    blockhash: Hash,
+    lookup_tables: Sequence = (),
+) -> bytes:
+    """Serialized v0 message paid by ``keypair``."""
+    return to_bytes_versioned(
+        MessageV0.try_compile(keypair.pubkey(), list(instructions), list(lookup_tables), blockhash)
+    )
+
+
+def sign_batch(jobs: Sequence[Tuple]) -> List[bytes]:
+    """
+    Signs a batch in one call (the unit of work sent to a pool worker).
+
+    Each job is ``(secret, message)`` for an already serialized message, or
+    ``(secret, instructions, blockhash, lookup_tables)`` to compile first.
+    """
+    transactions = []
+    for job in jobs:
+        keypair = _keypair(job[0])
+        if len(job) == 2:
+            message = job[1]
+        else:
+            message = compile_message(keypair, *job[1:])
+        transactions.append(sign_message(keypair, message))
+    return transactions
+
+
+def make_executor(workers: int, mode: str = SIGNING_MODE) -> Optional[concurrent.futures.Executor]:
+    """Process (or thread) pool for ``Signer``; None signs inline."""
+    if workers <= 0:
+        return None
+    if mode == "thread":
+        return concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix="signer")
+    # spawn: forking a process that runs an event loop and HTTP pools is unsafe
+    return concurrent.futures.ProcessPoolExecutor(
+        workers, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+class Signer:
+    """Micro-batching front end of the signing pool"""
+
+    def __init__(
+        self,
+        workers: int = SIGNING_WORKERS,
+        mode: str = SIGNING_MODE,
+        batch_size: int = SIGNING_BATCH,
+        batch_delay: float = SIGNING_BATCH_DELAY,
+    ) -> None:
+        self.workers = workers
+        self.mode = mode
+        self.batch_size = max(1, batch_size)
+        self.batch_delay = batch_delay
+        self.batches = 0
+        self.signed = 0
+        self._executor: Optional[concurrent.futures.Executor] = None
+        self._pending: List[Tuple[tuple, asyncio.Future]] = []
+        self._flush: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def inline(self) -> bool:
+        return self.workers <= 0
+
+    def _submit(self, job: tuple) -> "asyncio.Future[bytes]":
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((job, future))
+        if len(self._pending) >= self.batch_size:
+            self._dispatch()
+        elif self._flush is None:
+            self._flush = loop.call_later(self.batch_delay, self._dispatch)
+        return future
+
+    def _dispatch(self) -> None:
+        if self._flush is not None:
+            self._flush.cancel()
+            self._flush = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        if self._executor is None:
+            self._executor = make_executor(self.workers, self.mode)
+        self.batches += 1
+        done = asyncio.get_running_loop().run_in_executor(
+            self._executor, sign_batch, [job for job, _ in batch]
+        )
+        done.add_done_callback(lambda done: self._resolve(batch, done))
+
+    def _resolve(self, batch: List[Tuple[tuple, asyncio.Future]], done: asyncio.Future) -> None:
+        error = done.exception() if not done.cancelled() else asyncio.CancelledError()
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(done.result()[index])
+        if error is None:
+            self.signed += len(batch)
+
+    async def sign(self, keypair: Keypair, message: bytes) -> bytes:
+        """Wire-format transaction of ``message`` signed by ``keypair``."""
+        if self.inline:
+            self.signed += 1
+            return sign_message(keypair, message)
+        return await self._submit((bytes(keypair), message))
+
+    async def compile_and_sign(
+        self,
+        keypair: Keypair,
+        instructions: Sequence[Instruction],
+        blockhash: Hash,
+        lookup_tables: Sequence = (),
+    ) -> bytes:
+        """Compiles ``instructions`` into a v0 message paid by ``keypair`` and signs it."""
+        if self.inline:
+            self.signed += 1
+            return sign_message(
+                keypair, compile_message(keypair, instructions, blockhash, lookup_tables)
+            )
+        return await self._submit(
+            (bytes(keypair), list(instructions), blockhash, list(lookup_tables))
+        )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,296 @@
+"""Offline Monte Carlo simulation of a sell strategy against one CPMM pool.
+
+A ``MarketSnapshot`` is a CPMM pool (decoded with ``CPMM_POOL_INFO_LAYOUT``),
+its vault balances and config fees, plus the token holdings of every wallet.
+``simulate`` replays ``runs`` independent schedules of the strategy at once:
+every round each wallet sells what the sizer picks, in a random order (the
+engine sells concurrently, so landing order is arbitrary), and each sell
+moves the constant-product curve exactly as the program would, fees
+included. State is held as NumPy arrays with one row per run, so the only
+Python loop is over the trades of a single schedule.
+
+Sizers take the wallets' holdings in tokens (an array, one row per run) and
+return the amounts to sell in tokens, like ``app.get_sell_amount`` does for
+one wallet; ``scalar_sizer`` adapts such a per-wallet function.
+"""
+import base64
+import json
+import os
+from typing import Callable, Dict, NamedTuple, Optional, Sequence
+
+from solders.pubkey import Pubkey  # type: ignore
+
+from utils.config import SIMULATION_SNAPSHOT_PATH
+from utils.fastlayout import FAST_ACCOUNT_LAYOUT, FAST_CPMM_POOL_INFO_LAYOUT
+from utils.lazy import lazy_import
+from utils.quote import FEE_RATE_DENOMINATOR, CpmmFees, quote_many
+from utils.snapshot import fleet_snapshot, get_multiple_accounts
+
+np = lazy_import("numpy")
+
+Sizer = Callable[["np.ndarray", "np.random.Generator"], "np.ndarray"]
+"""(holdings in tokens, random generator) -> amounts to sell in tokens"""
+
+
+def uniform_fraction(low: float = 2, high: float = 10) -> Sizer:
+    """Sells a uniform ``low``-``high`` percent of each holding (``app.get_sell_amount``)."""
+
+    def sizer(holdings, rng):
+        return rng.uniform(low, high, holdings.shape) / 100 * holdings
+
+    return sizer
+
+
+def fixed_fraction(percent: float) -> Sizer:
+    """Sells the same ``percent`` of each holding every round."""
+
+    def sizer(holdings, rng):
+        return holdings * (percent / 100)
+
+    return sizer
+
+
+def scalar_sizer(sizer: Callable[[float], float]) -> Sizer:
+    """
+    Wraps a per-wallet sizer such as ``app.get_sell_amount``. It runs once per
+    wallet and run in Python, so it is slower than a vectorised sizer, and
+    draws from its own random source rather than the simulation's.
+    """
+
+    def wrapped(holdings, rng):
+        # Built per call: wrapping a sizer at import time must not load numpy
+        return np.frompyfunc(sizer, 1, 1)(holdings).astype(np.float64)
+
+    return wrapped
+
+
+class MarketSnapshot(NamedTuple):
+    """A CPMM pool and the fleet's holdings of the token sold into it, in raw units"""
+
+    mint: str
+    reserve_in: int
+    reserve_out: int
+    fees: CpmmFees
+    decimals: int
+    holdings: "np.ndarray"
+    accounts: Dict[str, bytes]
+
+    @classmethod
+    def from_accounts(cls, mint, accounts: Dict[str, bytes], holdings) -> "MarketSnapshot":
+        """
+        Decodes ``accounts`` (raw data of the ``pool``, ``vaultA``, ``vaultB``
+        and ``config`` accounts) for a sell of ``mint``.
+        """
+        pool = FAST_CPMM_POOL_INFO_LAYOUT.decode(accounts["pool"])
+        reserve_a = (
+            FAST_ACCOUNT_LAYOUT.read("amount", accounts["vaultA"])
+            - pool.protocolFeesMintA
+            - pool.fundFeesMintA
+        )
+        reserve_b = (
+            FAST_ACCOUNT_LAYOUT.read("amount", accounts["vaultB"])
+            - pool.protocolFeesMintB
+            - pool.fundFeesMintB
+        )
+        mint = str(mint)
+        if mint == str(Pubkey.from_bytes(pool.mintA)):
+            reserve_in, reserve_out, decimals = reserve_a, reserve_b, pool.mintDecimalA
+        elif mint == str(Pubkey.from_bytes(pool.mintB)):
+            reserve_in, reserve_out, decimals = reserve_b, reserve_a, pool.mintDecimalB
+        else:
+            raise ValueError(f"{mint} is not traded in this pool")
+        return cls(
+            mint,
+            reserve_in,
+            reserve_out,
+            CpmmFees.from_account(accounts["config"]),
+            decimals,
+            np.asarray(holdings, dtype=np.float64),
+            accounts,
+        )
+
+    def save(self, path: str = SIMULATION_SNAPSHOT_PATH) -> None:
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(
+                {
+                    "mint": self.mint,
+                    "accounts": {
+                        name: base64.b64encode(data).decode()
+                        for name, data in self.accounts.items()
+                    },
+                    "holdings": [int(amount) for amount in self.holdings],
+                },
+                file,
+                indent=2,
+            )
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str = SIMULATION_SNAPSHOT_PATH) -> "MarketSnapshot":
+        with open(path) as file:
+            snapshot = json.load(file)
+        accounts = {
+            name: base64.b64decode(data) for name, data in snapshot["accounts"].items()
+        }
+        return cls.from_accounts(snapshot["mint"], accounts, snapshot["holdings"])
+
+
+async def fetch_snapshot(
+    client, pair, mint, owners: Sequence[Pubkey], token_accounts=None
+) -> MarketSnapshot:
+    """Reads the pool, its vaults and config, and the holdings of ``owners``."""
+    pair = Pubkey.from_string(str(pair))
+    mint = Pubkey.from_string(str(mint))
+    (pool_account,) = await get_multiple_accounts(client, [pair])
+    if pool_account is None:
+        raise ValueError(f"Pool {pair} not found")
+    pool = FAST_CPMM_POOL_INFO_LAYOUT.decode(pool_account.data)
+    names = ("config", "vaultA", "vaultB")
+    keys = [pool.pubkey("configId"), pool.pubkey("vaultA"), pool.pubkey("vaultB")]
+    fetched = await get_multiple_accounts(client, keys)
+    accounts = {"pool": bytes(pool_account.data)}
+    for name, key, account in zip(names, keys, fetched):
+        if account is None:
+            raise ValueError(f"Pool {pair} {name} {key} not found")
+        accounts[name] = bytes(account.data)
+    balances = await fleet_snapshot(client, owners, mint, token_accounts)
+    holdings = [balance.token_amount for balance in balances.values()]
+    return MarketSnapshot.from_accounts(mint, accounts, holdings)
+
+
+class SimulationResult(NamedTuple):
+    """Per run totals (raw units) and reserve paths of a simulation"""
+
+    sol_out: "np.ndarray"
+    """Quote side received"""
+    tokens_sold: "np.ndarray"
+    spot_value: "np.ndarray"
+    """What every sell would have received at the spot price right before it"""
+    initial_value: "np.ndarray"
+    """What the tokens sold were worth at the snapshot's spot price"""
+    max_impact: "np.ndarray"
+    """Worst single-sell shortfall versus its pre-trade spot price, fees included"""
+    reserves_in: "np.ndarray"
+    reserves_out: "np.ndarray"
+    """Reserves after every round (or every sell), column 0 being the snapshot"""
+
+    @property
+    def slippage(self) -> "np.ndarray":
+        """Execution shortfall versus the spot price at each sell (impact and fees)"""
+        return 1 - self.sol_out / np.where(self.spot_value > 0, self.spot_value, np.nan)
+
+    @property
+    def shortfall(self) -> "np.ndarray":
+        """Shortfall versus the snapshot's spot price, which also counts the fleet's own price decline"""
+        return 1 - self.sol_out / np.where(self.initial_value > 0, self.initial_value, np.nan)
+
+    @property
+    def price_change(self) -> "np.ndarray":
+        """Relative change of the spot price over the whole schedule"""
+        prices = self.reserves_out / self.reserves_in
+        return prices[:, -1] / prices[:, 0] - 1
+
+    def summary(self, percentiles: Sequence[float] = (5, 50, 95)) -> Dict[str, list]:
+        """Percentiles over the runs of every per run metric."""
+        metrics = {
+            "sol_out": self.sol_out,
+            "tokens_sold": self.tokens_sold,
+            "slippage": self.slippage,
+            "shortfall": self.shortfall,
+            "max_impact": self.max_impact,
+            "price_change": self.price_change,
+        }
+        return {
+            name: np.nanpercentile(values, percentiles).tolist()
+            for name, values in metrics.items()
+        }
+
+
+def simulate(
+    snapshot: MarketSnapshot,
+    sizer: Sizer,
+    runs: int = 10_000,
+    rounds: int = 1,
+    seed: Optional[int] = None,
+    every_trade: bool = False,
+) -> SimulationResult:
+    """
+    Runs ``runs`` schedules of ``rounds`` fleet-wide sell rounds.
+
+    Amounts are truncated to raw units (as ``SellEngine.sell`` does) and capped
+    at the holding. The curve maths is ``quote_many`` in float64; the protocol
+    and fund shares of each trade fee leave the reserves as on chain. With
+    ``every_trade`` the reserve paths have a column per sell instead of per
+    round. The same ``seed`` gives every sizer the same wallet orders.
+    """
+    order_seed, sizer_seed = np.random.SeedSequence(seed).spawn(2)
+    order_rng = np.random.default_rng(order_seed)
+    sizer_rng = np.random.default_rng(sizer_seed)
+    wallets = len(snapshot.holdings)
+    scale = 10**snapshot.decimals
+    fees = snapshot.fees
+
+    holdings = np.tile(snapshot.holdings, (runs, 1))
+    reserve_in = np.full(runs, float(snapshot.reserve_in))
+    reserve_out = np.full(runs, float(snapshot.reserve_out))
+    sol_out = np.zeros(runs)
+    tokens_sold = np.zeros(runs)
+    spot_value = np.zeros(runs)
+    max_impact = np.zeros(runs)
+    points = rounds * wallets if every_trade else rounds
+    reserves_in = np.empty((runs, points + 1))
+    reserves_out = np.empty((runs, points + 1))
+    reserves_in[:, 0] = reserve_in
+    reserves_out[:, 0] = reserve_out
+    rows = np.arange(runs)
+    point = 0
+
+    for _ in range(rounds):
+        amounts = np.floor(np.asarray(sizer(holdings / scale, sizer_rng)) * scale)
+        amounts = np.clip(amounts, 0, holdings)
+        order = order_rng.permuted(np.tile(np.arange(wallets), (runs, 1)), axis=1)
+        for step in range(wallets):
+            amount = amounts[rows, order[:, step]]
+            out = quote_many(amount, reserve_in, reserve_out, fees.trade_fee_rate)
+            spot = amount * (reserve_out / reserve_in)
+            impact = np.divide(out, spot, out=np.ones(runs), where=spot > 0)
+            np.maximum(max_impact, 1 - impact, out=max_impact)
+            trade_fee = np.ceil(amount * fees.trade_fee_rate / FEE_RATE_DENOMINATOR)
+            accrued = np.floor(
+                trade_fee * fees.protocol_fee_rate / FEE_RATE_DENOMINATOR
+            ) + np.floor(trade_fee * fees.fund_fee_rate / FEE_RATE_DENOMINATOR)
+            reserve_in += amount - accrued
+            reserve_out -= out
+            sol_out += out
+            tokens_sold += amount
+            spot_value += spot
+            if every_trade:
+                point += 1
+                reserves_in[:, point] = reserve_in
+                reserves_out[:, point] = reserve_out
+        holdings -= amounts
+        if not every_trade:
+            point += 1
+            reserves_in[:, point] = reserve_in
+            reserves_out[:, point] = reserve_out
+
+    initial_value = tokens_sold * (snapshot.reserve_out / snapshot.reserve_in)
+    return SimulationResult(
+        sol_out,
+        tokens_sold,
+        spot_value,
+        initial_value,
+        max_impact,
+        reserves_in,
+        reserves_out,
+    )
+
+
+def compare(
+    snapshot: MarketSnapshot, sizers: Dict[str, Sizer], **options
+) -> Dict[str, SimulationResult]:
+    """``simulate`` for every named sizer, with the same options and seed."""
+    if options.get("seed") is None:
+        options["seed"] = np.random.SeedSequence().entropy
+    return {name: simulate(snapshot, sizer, **options) for name, sizer in sizers.items()}
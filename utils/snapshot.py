@@ -0,0 +1,93 @@
+import asyncio
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from solana.rpc.async_api import AsyncClient
+from solders.pubkey import Pubkey  # type: ignore
+from spl.token.instructions import get_associated_token_address
+
+from utils.config import LAMPORTS_PER_SOL
+from utils.fastlayout import FAST_ACCOUNT_LAYOUT, FAST_MINT_LAYOUT
+
+MULTIPLE_ACCOUNTS_LIMIT = 100
+"""Maximum number of keys a single getMultipleAccounts call accepts"""
+
+
+class WalletBalance(NamedTuple):
+    """SOL and token holdings of one wallet, in raw units"""
+
+    lamports: int
+    token_account: Pubkey
+    token_amount: int
+    decimals: int
+
+    @property
+    def sol(self) -> float:
+        return self.lamports / LAMPORTS_PER_SOL
+
+    @property
+    def tokens(self) -> float:
+        return self.token_amount / 10**self.decimals
+
+
+async def get_multiple_accounts(
+    client: AsyncClient, pubkeys: List[Pubkey], concurrency: int = 4
+) -> List[Optional[object]]:
+    """
+    Fetches any number of accounts with chunked getMultipleAccounts calls.
+
+    Returns the accounts in the same order as ``pubkeys`` (None for missing ones).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(chunk: List[Pubkey]):
+        async with semaphore:
+            return (await client.get_multiple_accounts(chunk)).value
+
+    chunks = [
+        pubkeys[start : start + MULTIPLE_ACCOUNTS_LIMIT]
+        for start in range(0, len(pubkeys), MULTIPLE_ACCOUNTS_LIMIT)
+    ]
+    accounts = []
+    for value in await asyncio.gather(*(fetch(chunk) for chunk in chunks)):
+        accounts.extend(value)
+    return accounts
+
+
+async def fleet_snapshot(
+    client: AsyncClient,
+    owners: Iterable[Pubkey],
+    mint: Pubkey,
+    token_accounts: Optional[Sequence[Pubkey]] = None,
+) -> Dict[Pubkey, WalletBalance]:
+    """
+    SOL and token balances for a whole fleet of wallets.
+
+    Derives every associated token account locally and fetches wallets, token
+    accounts and the mint in ``ceil((2n + 1) / 100)`` RPC calls. Precomputed
+    ``token_accounts`` (one per owner, e.g. from a WalletRegistry) skip the
+    derivation.
+
+    Returns:
+        dict: WalletBalance keyed by wallet pubkey.
+    """
+    owners = list(owners)
+    if token_accounts is None:
+        token_accounts = [get_associated_token_address(owner, mint) for owner in owners]
+    token_accounts = list(token_accounts)
+    accounts = await get_multiple_accounts(client, [mint, *owners, *token_accounts])
+    mint_account, accounts = accounts[0], accounts[1:]
+    if mint_account is None:
+        raise ValueError(f"Mint {mint} not found")
+    decimals = FAST_MINT_LAYOUT.read("decimals", mint_account.data)
+
+    snapshot = {}
+    for index, owner in enumerate(owners):
+        wallet = accounts[index]
+        token = accounts[len(owners) + index]
+        snapshot[owner] = WalletBalance(
+            lamports=wallet.lamports if wallet else 0,
+            token_account=token_accounts[index],
+            token_amount=FAST_ACCOUNT_LAYOUT.read("amount", token.data) if token else 0,
+            decimals=decimals,
+        )
+    return snapshot
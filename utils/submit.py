@@ -0,0 +1,284 @@
+import asyncio
+import base64
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+
+from loguru import logger
+from solana.rpc.commitment import Confirmed
+from solders.signature import Signature  # type: ignore
+from solders.transaction_status import TransactionConfirmationStatus  # type: ignore
+
+from utils.blockhash import BlockhashProvider
+from utils.config import (
+    SEND_CONFIRM_TIMEOUT,
+    SEND_POLL_INTERVAL,
+    SEND_REBROADCAST_INTERVAL,
+)
+from utils.transport import TransportClient
+
+SIGNATURE_STATUS_LIMIT = 256
+"""Maximum number of signatures a single getSignatureStatuses call accepts"""
+
+FINISHED_KEPT = 4096
+"""Settled results kept for ``TransactionSubmitter.result`` after they leave ``pending``"""
+
+CONFIRMED = (
+    TransactionConfirmationStatus.Confirmed,
+    TransactionConfirmationStatus.Finalized,
+)
+
+
+class SubmitResult(NamedTuple):
+    """What happened to a submitted transaction (timestamps are ``time.time()``)"""
+
+    signature: Signature
+    status: str
+    sent_at: float
+    first_seen_at: Optional[float]
+    confirmed_at: Optional[float]
+    slot: Optional[int]
+    broadcasts: int
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "confirmed"
+
+    @property
+    def time_to_confirm(self) -> Optional[float]:
+        if self.confirmed_at is None:
+            return None
+        return self.confirmed_at - self.sent_at
+
+
+class _Pending:
+    __slots__ = (
+        "signature",
+        "encoded",
+        "last_valid_block_height",
+        "sent_at",
+        "first_seen_at",
+        "next_broadcast",
+        "broadcasts",
+        "future",
+    )
+
+    def __init__(self, signature, encoded, last_valid_block_height, future) -> None:
+        self.signature = signature
+        self.encoded = encoded
+        self.last_valid_block_height = last_valid_block_height
+        self.sent_at = time.time()
+        self.first_seen_at = None
+        self.next_broadcast = 0.0
+        self.broadcasts = 0
+        self.future = future
+
+    def finish(self, status: str, slot=None, error=None) -> None:
+        if self.future.done():
+            return
+        confirmed_at = time.time() if status == "confirmed" else None
+        self.future.set_result(
+            SubmitResult(
+                self.signature,
+                status,
+                self.sent_at,
+                self.first_seen_at,
+                confirmed_at,
+                slot,
+                self.broadcasts,
+                error,
+            )
+        )
+
+
+class TransactionSubmitter:
+    """
+    Send-and-confirm pipeline shared by every wallet.
+
+    Each transaction is sent to all healthy RPC endpoints at once and
+    rebroadcast every ``rebroadcast_interval`` seconds until it is seen or
+    its blockhash expires. A single poller confirms every pending signature
+    with batched getSignatureStatuses calls, so hundreds of in-flight
+    transactions cost a handful of requests per poll.
+    """
+
+    def __init__(
+        self,
+        client: TransportClient,
+        blockhash: BlockhashProvider,
+        rebroadcast_interval: float = SEND_REBROADCAST_INTERVAL,
+        poll_interval: float = SEND_POLL_INTERVAL,
+        confirm_timeout: float = SEND_CONFIRM_TIMEOUT,
+    ) -> None:
+        # Sends go to every endpoint of the client's RpcTransport
+        self.client = client
+        self.transport = client.transport
+        self.blockhash = blockhash
+        self.rebroadcast_interval = rebroadcast_interval
+        self.poll_interval = poll_interval
+        self.confirm_timeout = confirm_timeout
+        self.pending: Dict[Signature, _Pending] = {}
+        self.finished: "OrderedDict[Signature, SubmitResult]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _send(self, pending: _Pending, skip_preflight: bool) -> None:
+        pending.broadcasts += 1
+        pending.next_broadcast = time.monotonic() + self.rebroadcast_interval
+        await self.transport.broadcast(
+            "sendTransaction",
+            [
+                pending.encoded,
+                {
+                    "encoding": "base64",
+                    "skipPreflight": skip_preflight,
+                    "preflightCommitment": "confirmed",
+                    "maxRetries": 0,
+                },
+            ],
+        )
+
+    async def submit(
+        self,
+        transaction: bytes,
+        last_valid_block_height: int,
+        skip_preflight: bool = False,
+        wait: bool = True,
+    ):
+        """
+        Sends a signed wire-format transaction.
+
+        Returns the SubmitResult once it is confirmed, failed or expired, or
+        the signature right after the first send when ``wait`` is False (then
+        ``confirm`` or ``result`` wait for it).
+        """
+        signature = Signature.from_bytes(transaction[1:65])
+        pending = _Pending(
+            signature,
+            base64.b64encode(transaction).decode(),
+            last_valid_block_height,
+            asyncio.get_running_loop().create_future(),
+        )
+        try:
+            await self._send(pending, skip_preflight)
+        except Exception as e:
+            # Preflight rejected it everywhere: it will never land
+            self._finish(pending, "failed", error=str(e))
+            return pending.future.result() if wait else signature
+        self.pending[signature] = pending
+        self.start()
+        if not wait:
+            return signature
+        return await self.confirm(signature)
+
+    async def confirm(self, signature: Signature) -> Optional[SubmitResult]:
+        """
+        Like ``result``, but gives up after ``confirm_timeout`` seconds and
+        settles the transaction as "timeout".
+        """
+        pending = self.pending.get(signature)
+        if pending is None:
+            return self.finished.get(signature)
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(pending.future), self.confirm_timeout
+            )
+        except asyncio.TimeoutError:
+            self._finish(pending, "timeout")
+            return pending.future.result()
+
+    def _finish(self, pending: _Pending, status: str, slot=None, error=None) -> None:
+        """Settles ``pending`` and keeps its result for ``result``."""
+        self.pending.pop(pending.signature, None)
+        pending.finish(status, slot, error)
+        self.finished[pending.signature] = pending.future.result()
+        while len(self.finished) > FINISHED_KEPT:
+            self.finished.popitem(last=False)
+
+    async def result(self, signature: Signature) -> Optional[SubmitResult]:
+        """
+        Waits for a transaction submitted with ``wait=False``. Settled
+        transactions are answered from the last ``FINISHED_KEPT`` results;
+        None means the signature is unknown (or long forgotten).
+        """
+        pending = self.pending.get(signature)
+        if pending is None:
+            return self.finished.get(signature)
+        return await asyncio.shield(pending.future)
+
+    async def _statuses(self, signatures: List[Signature]) -> List:
+        statuses: List = []
+        for start in range(0, len(signatures), SIGNATURE_STATUS_LIMIT):
+            chunk = signatures[start : start + SIGNATURE_STATUS_LIMIT]
+            statuses.extend((await self.client.get_signature_statuses(chunk)).value)
+        return statuses
+
+    async def _expire(self, candidates: List[_Pending]) -> None:
+        """
+        Marks ``candidates`` expired, but only once the cluster's block height
+        is past their last valid height and a last status check still does
+        not see them. The provider's height is an estimate that runs ahead of
+        the chain when slots are skipped; trusting it would let a caller
+        re-sign a transaction that can still land.
+        """
+        block_height = (await self.client.get_block_height(Confirmed)).value
+        candidates = [
+            pending
+            for pending in candidates
+            if block_height > pending.last_valid_block_height
+        ]
+        if not candidates:
+            return
+        statuses = await self._statuses([pending.signature for pending in candidates])
+        for pending, status in zip(candidates, statuses):
+            # Seen ones are settled by the next poll
+            if status is None and self.pending.get(pending.signature) is pending:
+                self._finish(pending, "expired")
+
+    async def _poll(self) -> None:
+        signatures = list(self.pending)
+        statuses = await self._statuses(signatures)
+        now = time.time()
+        block_height = self.blockhash.block_height
+        expiring = []
+        for signature, status in zip(signatures, statuses):
+            pending = self.pending.get(signature)
+            if pending is None:
+                continue
+            if status is None:
+                if block_height > pending.last_valid_block_height:
+                    expiring.append(pending)
+                continue
+            if pending.first_seen_at is None:
+                pending.first_seen_at = now
+            if status.err is not None:
+                self._finish(pending, "failed", status.slot, str(status.err))
+            elif status.confirmation_status in CONFIRMED:
+                self._finish(pending, "confirmed", status.slot)
+        if expiring:
+            await self._expire(expiring)
+
+    async def _rebroadcast(self) -> None:
+        now = time.monotonic()
+        due = [
+            pending
+            for pending in self.pending.values()
+            if pending.first_seen_at is None and pending.next_broadcast <= now
+        ]
+        if due:
+            await asyncio.gather(
+                *(self._send(pending, True) for pending in due),
+                return_exceptions=True,
+            )
+
+    async def _run(self) -> None:
+        while self.pending:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await asyncio.gather(self._poll(), self._rebroadcast())
+            except Exception as e:
+                logger.error(f"Signature status poll failed: {e!r}")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
@@ -0,0 +1,182 @@
+import struct
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Sequence
+
+from solders.compute_budget import ID as COMPUTE_BUDGET_PROGRAM_ID  # type: ignore
+from solders.hash import Hash  # type: ignore
+from solders.instruction import Instruction  # type: ignore
+from solders.keypair import Keypair  # type: ignore
+from solders.message import MessageV0, to_bytes_versioned  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+
+from utils.config import TEMPLATE_CACHE_SIZE
+from utils.extractor import SWAP_LAYOUT
+
+_AMOUNTS = struct.Struct("<QQ")
+_SENTINEL_AMOUNTS = (0x5EA1_0A11_70D0_5EA1, 0x5EA1_0B22_70D0_5EA1)
+_SENTINEL_BLOCKHASH = Hash(bytes([0xA7]) * 32)
+
+# ComputeBudget instruction tags and their little-endian arguments
+_SET_UNIT_LIMIT, _UNIT_LIMIT = 2, struct.Struct("<I")
+_SET_UNIT_PRICE, _UNIT_PRICE = 3, struct.Struct("<Q")
+_SENTINEL_UNIT_LIMIT = 0x5EA1_0C33
+_SENTINEL_UNIT_PRICE = 0x5EA1_0D44_70D0_5EA1
+
+
+def _find_once(message: bytes, needle: bytes, what: str) -> int:
+    offset = message.find(needle)
+    if offset < 0 or message.find(needle, offset + 1) >= 0:
+        raise ValueError(f"Could not locate {what} in compiled message")
+    return offset
+
+
+class SwapTemplate:
+    """
+    A compiled swap transaction with holes for the amounts and the blockhash.
+
+    The message is compiled once with sentinel values; ``sign`` copies the
+    serialized message, writes the real amounts and blockhash at the recorded
+    offsets and signs the bytes directly. Compute unit limit and price
+    instructions, if present, are holes too: they default to the values the
+    instructions were built with (``unit_limit``/``unit_price``) and can be
+    overridden per signature.
+
+    The swap data must be ``data_prefix`` (e.g. an instruction tag) followed
+    by the two u64 amounts of ``SWAP_LAYOUT``.
+    """
+
+    def __init__(
+        self,
+        payer: Pubkey,
+        instructions: Sequence[Instruction],
+        swap_index: int,
+        lookup_tables: Sequence = (),
+        data_prefix: bytes = b"",
+    ) -> None:
+        instructions = list(instructions)
+        swap = instructions[swap_index]
+        data = data_prefix + SWAP_LAYOUT.build(
+            dict(amountInMax=_SENTINEL_AMOUNTS[0], amountOut=_SENTINEL_AMOUNTS[1])
+        )
+        if len(swap.data) != len(data):
+            raise ValueError("Swap instruction data does not match SWAP_LAYOUT")
+        instructions[swap_index] = Instruction(swap.program_id, data, swap.accounts)
+        self.unit_limit: Optional[int] = None
+        self.unit_price: Optional[int] = None
+        # Set once unit_limit has been sized by a simulation (see FeeOracle)
+        self.sized = False
+        budget = {}
+        for index, instruction in enumerate(instructions):
+            if instruction.program_id != COMPUTE_BUDGET_PROGRAM_ID:
+                continue
+            tag, argument = instruction.data[0], instruction.data[1:]
+            if tag == _SET_UNIT_LIMIT:
+                (self.unit_limit,) = _UNIT_LIMIT.unpack(argument)
+                sentinel = bytes([tag]) + _UNIT_LIMIT.pack(_SENTINEL_UNIT_LIMIT)
+            elif tag == _SET_UNIT_PRICE:
+                (self.unit_price,) = _UNIT_PRICE.unpack(argument)
+                sentinel = bytes([tag]) + _UNIT_PRICE.pack(_SENTINEL_UNIT_PRICE)
+            else:
+                continue
+            budget[tag] = sentinel
+            instructions[index] = Instruction(
+                instruction.program_id, sentinel, instruction.accounts
+            )
+        self.instructions: List[Instruction] = instructions
+        compiled = MessageV0.try_compile(
+            payer, instructions, list(lookup_tables), _SENTINEL_BLOCKHASH
+        )
+        self.message = to_bytes_versioned(compiled)
+        self.amount_offset = len(data_prefix) + _find_once(
+            self.message, data, "swap amounts"
+        )
+        self.blockhash_offset = _find_once(
+            self.message, bytes(_SENTINEL_BLOCKHASH), "blockhash"
+        )
+        # Offsets of the u32 limit / u64 price, past the instruction tag
+        self.unit_limit_offset = self.unit_price_offset = None
+        if _SET_UNIT_LIMIT in budget:
+            self.unit_limit_offset = 1 + _find_once(
+                self.message, budget[_SET_UNIT_LIMIT], "compute unit limit"
+            )
+        if _SET_UNIT_PRICE in budget:
+            self.unit_price_offset = 1 + _find_once(
+                self.message, budget[_SET_UNIT_PRICE], "compute unit price"
+            )
+
+    def render(
+        self,
+        amount_in: int,
+        min_amount_out: int,
+        blockhash: Hash,
+        unit_price: Optional[int] = None,
+        unit_limit: Optional[int] = None,
+    ) -> bytes:
+        """Serialized versioned message with the amounts and blockhash filled in."""
+        message = bytearray(self.message)
+        _AMOUNTS.pack_into(message, self.amount_offset, amount_in, min_amount_out)
+        message[self.blockhash_offset : self.blockhash_offset + 32] = bytes(blockhash)
+        if self.unit_limit_offset is not None:
+            _UNIT_LIMIT.pack_into(
+                message,
+                self.unit_limit_offset,
+                self.unit_limit if unit_limit is None else unit_limit,
+            )
+        if self.unit_price_offset is not None:
+            _UNIT_PRICE.pack_into(
+                message,
+                self.unit_price_offset,
+                self.unit_price if unit_price is None else unit_price,
+            )
+        return bytes(message)
+
+    def sign(
+        self,
+        keypair: Keypair,
+        amount_in: int,
+        min_amount_out: int,
+        blockhash: Hash,
+        unit_price: Optional[int] = None,
+        unit_limit: Optional[int] = None,
+    ) -> bytes:
+        """Wire-format transaction, signed by ``keypair`` (the only signer)."""
+        message = self.render(
+            amount_in, min_amount_out, blockhash, unit_price, unit_limit
+        )
+        return b"\x01" + bytes(keypair.sign_message(message)) + message
+
+
+class TemplateCache:
+    """LRU of swap templates keyed by (pool, owner, direction)"""
+
+    def __init__(self, maxsize: int = TEMPLATE_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._templates: "OrderedDict[Hashable, SwapTemplate]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def get(self, pool, owner, direction: str) -> Optional[SwapTemplate]:
+        key = (str(pool), str(owner), direction)
+        template = self._templates.get(key)
+        if template is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._templates.move_to_end(key)
+        return template
+
+    def put(self, pool, owner, direction: str, template: SwapTemplate) -> None:
+        self._templates[(str(pool), str(owner), direction)] = template
+        while len(self._templates) > self.maxsize:
+            self._templates.popitem(last=False)
+
+    def invalidate(self, pool=None, owner=None) -> None:
+        """Drops templates matching ``pool`` and/or ``owner`` (all when both are None)."""
+        for key in list(self._templates):
+            if (pool is None or key[0] == str(pool)) and (
+                owner is None or key[1] == str(owner)
+            ):
+                del self._templates[key]
@@ -0,0 +1,444 @@
+"""Multi-endpoint RPC transport for ``solana.rpc.async_api.AsyncClient``.
+
+``RpcTransport`` is a drop-in replacement for solana-py's AsyncHTTPProvider.
+It keeps one pooled httpx session per endpoint, routes every call to the
+endpoint with the lowest latency EWMA, hedges read calls onto the next best
+endpoint when the first has not answered within its p95, and stops routing to
+endpoints that fail their ``/health`` check until they pass again.
+"""
+import asyncio
+import functools
+import itertools
+import json
+import ssl
+import time
+from collections import deque
+from typing import List, Optional, Sequence, Tuple, Type
+from urllib.parse import urlsplit
+
+import httpx
+from loguru import logger
+from solana.exceptions import SolanaRpcException, handle_async_exceptions
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Commitment
+from solana.rpc.providers.async_http import AsyncHTTPProvider
+from solana.rpc.providers.core import (
+    T,
+    _parse_raw,
+    _parse_raw_batch,
+    get_default_endpoint,
+)
+from solders.rpc.requests import Body
+
+from utils.config import (
+    RPC_HEALTH_INTERVAL,
+    RPC_HEDGE,
+    RPC_HEDGE_MIN_DELAY,
+    RPC_KEEPALIVE_EXPIRY,
+    RPC_MAX_CONNECTIONS,
+    RPC_MAX_KEEPALIVE,
+    RPC_NODES,
+    RPC_TIMEOUT,
+)
+from utils.metrics import METRICS
+from utils.scheduler import TokenBucket, make_budget, method_name
+
+WRITE_METHODS = frozenset(
+    (
+        "SendRawTransaction",
+        "SendLegacyTransaction",
+        "SendVersionedTransaction",
+        "RequestAirdrop",
+        # The same calls made through ``request_json``
+        "sendTransaction",
+        "requestAirdrop",
+    )
+)
+"""Requests that are never hedged (they are not safe to duplicate blindly)"""
+
+EWMA_ALPHA = 0.2
+MAX_FAILURES = 3
+"""Consecutive failures before an endpoint is ejected until its next health check"""
+
+RPC_LATENCY = METRICS.histogram(
+    "rpc_request_seconds", "Latency of RPC HTTP requests", ["method", "endpoint"]
+)
+RPC_ERRORS = METRICS.counter(
+    "rpc_errors_total", "Failed RPC HTTP requests", ["method", "endpoint"]
+)
+
+
+@functools.lru_cache(maxsize=None)
+def ssl_context() -> ssl.SSLContext:
+    """TLS context shared by every session; loading the CA bundle is most of a session's cost."""
+    return httpx.create_ssl_context()
+
+
+class Endpoint:
+    """One RPC URL with its own connection pool and latency statistics"""
+
+    def __init__(self, url: str, limits: httpx.Limits, timeout: float) -> None:
+        self.url = url.rstrip("/")
+        self.health_url = f"{self.url}/health"
+        # Host only: RPC urls often carry an API key in the path or query
+        self.name = urlsplit(self.url).hostname or self.url
+        self.limits = limits
+        self.timeout = timeout
+        self._session: Optional[httpx.AsyncClient] = None
+        self.ewma: Optional[float] = None
+        self.healthy = True
+        self.failures = 0
+        self.latencies: deque = deque(maxlen=256)
+        self.samples = 0
+        self._p95: Optional[float] = None
+        self._p95_at = 0
+
+    def __repr__(self) -> str:
+        return f"Endpoint({self.url!r}, ewma={self.ewma}, healthy={self.healthy})"
+
+    @property
+    def session(self) -> httpx.AsyncClient:
+        """Connection pool, opened on first use."""
+        if self._session is None:
+            self._session = httpx.AsyncClient(
+                limits=self.limits, timeout=self.timeout, verify=ssl_context()
+            )
+        return self._session
+
+    async def aclose(self) -> None:
+        # The closed session stays in place, so calls after close fail as before
+        if self._session is not None:
+            await self._session.aclose()
+
+    def observe(self, latency: float) -> None:
+        self.failures = 0
+        self.samples += 1
+        self.latencies.append(latency)
+        if self.ewma is None:
+            self.ewma = latency
+        else:
+            self.ewma += EWMA_ALPHA * (latency - self.ewma)
+
+    def fail(self, penalty: float) -> None:
+        self.failures += 1
+        self.ewma = max(self.ewma or 0.0, penalty)
+        if self.failures >= MAX_FAILURES and self.healthy:
+            self.healthy = False
+            logger.warning(f"Ejecting RPC endpoint {self.url}")
+
+    @property
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < 20:
+            return None
+        # Re-sort every 16 samples rather than on every request
+        if self._p95 is None or self.samples - self._p95_at >= 16:
+            ordered = sorted(self.latencies)
+            self._p95 = ordered[int(len(ordered) * 0.95) - 1]
+            self._p95_at = self.samples
+        return self._p95
+
+    @property
+    def score(self) -> float:
+        # Untested endpoints sort first so every endpoint gets measured
+        return self.ewma if self.ewma is not None else 0.0
+
+
+class RpcTransport(AsyncHTTPProvider):
+    """Latency-routed, hedged HTTP provider over several RPC endpoints."""
+
+    def __init__(
+        self,
+        endpoints: Sequence[str],
+        max_connections: int = RPC_MAX_CONNECTIONS,
+        max_keepalive_connections: int = RPC_MAX_KEEPALIVE,
+        keepalive_expiry: float = RPC_KEEPALIVE_EXPIRY,
+        timeout: float = RPC_TIMEOUT,
+        hedge: bool = RPC_HEDGE,
+        hedge_min_delay: float = RPC_HEDGE_MIN_DELAY,
+        health_interval: float = RPC_HEALTH_INTERVAL,
+        budget: Optional[TokenBucket] = None,
+    ) -> None:
+        endpoints = [url for url in endpoints if url]
+        if not endpoints:
+            raise ValueError("At least one RPC endpoint is required")
+        # Skip AsyncHTTPProvider.__init__: it would open an unused session
+        self._request_counter = itertools.count()
+        self.endpoint_uri = endpoints[0]
+        self.health_uri = f"{endpoints[0]}/health"
+        self.timeout = timeout
+        self.extra_headers = None
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.endpoints: List[Endpoint] = [
+            Endpoint(url, limits, timeout) for url in endpoints
+        ]
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.health_interval = health_interval
+        self.hedged = 0
+        self.budget = budget
+        self._health_task: Optional[asyncio.Task] = None
+
+    def __str__(self) -> str:
+        return f"RPC transport over {[endpoint.url for endpoint in self.endpoints]}"
+
+    def ranked(self) -> List[Endpoint]:
+        """Healthy endpoints by latency, then ejected ones as a last resort."""
+        return sorted(
+            self.endpoints, key=lambda endpoint: (not endpoint.healthy, endpoint.score)
+        )
+
+    def cost(self, method: str) -> float:
+        return self.budget.cost(method) if self.budget is not None else 0
+
+    async def _post(
+        self, endpoint: Endpoint, content: str, cost: float = 0, method: str = "batch"
+    ) -> str:
+        """POSTs ``content``, first waiting for ``cost`` credits of the budget."""
+        if self.budget is not None and cost:
+            await self.budget.acquire(cost)
+        started = time.perf_counter()
+        try:
+            response = await endpoint.session.post(
+                endpoint.url,
+                content=content,
+                headers={"Content-Type": "application/json"},
+            )
+            if (
+                response.status_code == httpx.codes.TOO_MANY_REQUESTS
+                and self.budget is not None
+            ):
+                retry_after = response.headers.get("Retry-After", "")
+                self.budget.pause(float(retry_after) if retry_after.isdigit() else 1.0)
+            response.raise_for_status()
+        except Exception:
+            # Rank a failing endpoint as if it had timed out
+            endpoint.fail(self.timeout)
+            RPC_ERRORS.inc(method_name(method), endpoint.name)
+            raise
+        elapsed = time.perf_counter() - started
+        endpoint.observe(elapsed)
+        RPC_LATENCY.observe(elapsed, method_name(method), endpoint.name)
+        return response.text
+
+    async def _hedged(self, content: str, method: str, cost: Optional[float] = None) -> str:
+        """First successful reply; duplicates the call if the leader is slow."""
+        if cost is None:
+            cost = self.cost(method)
+        endpoints = self.ranked()
+        healthy = sum(endpoint.healthy for endpoint in endpoints)
+        hedge = self.hedge and method not in WRITE_METHODS
+        pending = set()
+        last_error: Optional[BaseException] = None
+        try:
+            for index, endpoint in enumerate(endpoints):
+                # Credits are taken before the hedge timer starts, so waiting
+                # on the budget never makes the leader look slow
+                if self.budget is not None:
+                    if not pending:
+                        await self.budget.acquire(cost)
+                    elif not self.budget.try_acquire(cost):
+                        # A hedge that has to wait for credits is not worth sending
+                        break
+                if pending:
+                    self.hedged += 1
+                pending.add(asyncio.ensure_future(self._post(endpoint, content, 0, method)))
+                # Only race healthy endpoints; the rest are failover targets
+                hedging = hedge and index < healthy - 1
+                delay = None
+                if hedging:
+                    delay = max(endpoint.p95 or self.timeout, self.hedge_min_delay)
+                while pending:
+                    done, pending = await asyncio.wait(
+                        pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if not done:
+                        # Leader is slower than its p95: race the next endpoint
+                        break
+                    for task in done:
+                        if task.exception() is None:
+                            return task.result()
+                        last_error = task.exception()
+                    if not hedging:
+                        # Fail over to the next endpoint once this one errored
+                        break
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error or httpx.HTTPError("No RPC endpoint answered")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def request_json(self, method: str, params: Optional[list] = None):
+        """Raw JSON-RPC call for methods solders has no request type for."""
+        content = json.dumps(
+            {
+                "jsonrpc": "2.0",
+                "id": next(self._request_counter),
+                "method": method,
+                "params": params or [],
+            }
+        )
+        reply = json.loads(await self._hedged(content, method))
+        if "error" in reply:
+            raise ValueError(f"{method} failed: {reply['error']}")
+        return reply["result"]
+
+    async def broadcast(self, method: str, params: Optional[list] = None) -> list:
+        """
+        Sends the same JSON-RPC call to every healthy endpoint at once.
+
+        Returns the results of the endpoints that answered without error, or
+        raises the last error when none did.
+        """
+        self.start()
+        content = json.dumps(
+            {
+                "jsonrpc": "2.0",
+                "id": next(self._request_counter),
+                "method": method,
+                "params": params or [],
+            }
+        )
+        endpoints = [endpoint for endpoint in self.endpoints if endpoint.healthy]
+        replies = await asyncio.gather(
+            *(
+                self._post(endpoint, content, self.cost(method), method)
+                for endpoint in endpoints or self.endpoints
+            ),
+            return_exceptions=True,
+        )
+        results = []
+        last_error: Optional[BaseException] = None
+        for reply in replies:
+            if isinstance(reply, BaseException):
+                last_error = reply
+                continue
+            reply = json.loads(reply)
+            if "error" in reply:
+                last_error = ValueError(f"{method} failed: {reply['error']}")
+            else:
+                results.append(reply["result"])
+        if not results:
+            raise last_error
+        return results
+
+    @handle_async_exceptions(SolanaRpcException, httpx.HTTPError)
+    async def make_request(self, body: Body, parser: Type[T]) -> T:
+        raw = await self.make_request_unparsed(body)
+        return _parse_raw(raw, parser=parser)
+
+    async def make_request_unparsed(self, body: Body) -> str:
+        self.start()
+        return await self._hedged(body.to_json(), type(body).__name__)
+
+    async def make_batch_request_unparsed(self, reqs: Tuple[Body, ...]) -> str:
+        self.start()
+        content = self._build_batch_request_kwargs(reqs)["content"]
+        methods = [type(body).__name__ for body in reqs]
+        return await self._hedged(
+            content,
+            "SendRawTransaction" if WRITE_METHODS.intersection(methods) else "batch",
+            sum(self.cost(method) for method in methods),
+        )
+
+    async def make_batch_request(self, reqs, parsers):
+        raw = await self.make_batch_request_unparsed(reqs)
+        return _parse_raw_batch(raw, parsers)
+
+    async def check_endpoint(self, endpoint: Endpoint) -> bool:
+        try:
+            response = await endpoint.session.get(endpoint.health_url)
+            healthy = response.status_code == httpx.codes.OK
+        except (IOError, httpx.HTTPError):
+            healthy = False
+        if healthy and not endpoint.healthy:
+            logger.info(f"RPC endpoint {endpoint.url} is healthy again")
+            endpoint.failures = 0
+        elif not healthy and endpoint.healthy:
+            logger.warning(f"Ejecting RPC endpoint {endpoint.url}: health check failed")
+        endpoint.healthy = healthy
+        return healthy
+
+    async def is_connected(self) -> bool:
+        """Health-checks every endpoint; True if at least one is usable."""
+        results = await asyncio.gather(
+            *(self.check_endpoint(endpoint) for endpoint in self.endpoints)
+        )
+        return any(results)
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await self.is_connected()
+
+    def start(self) -> None:
+        """Starts background health checks (only useful with several endpoints)."""
+        if len(self.endpoints) < 2 or self.health_interval <= 0:
+            return
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.get_running_loop().create_task(
+                self._health_loop()
+            )
+
+    async def close(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        await asyncio.gather(
+            *(endpoint.aclose() for endpoint in self.endpoints)
+        )
+
+    async def __aenter__(self) -> "RpcTransport":
+        return self
+
+
+class TransportClient(AsyncClient):
+    """AsyncClient whose requests go through an ``RpcTransport``."""
+
+    def __init__(
+        self, transport: RpcTransport, commitment: Optional[Commitment] = None
+    ) -> None:
+        super().__init__(transport.endpoint_uri, commitment, transport.timeout)
+        # The default provider is replaced before its session ever connects
+        self._provider = transport
+
+    @property
+    def transport(self) -> RpcTransport:
+        """The provider, for calls that bypass AsyncClient's typed methods"""
+        return self._provider
+
+
+def make_client(endpoints: Sequence[str] = RPC_NODES, **kwargs) -> TransportClient:
+    """TransportClient over ``endpoints`` (the default endpoint if none are set)."""
+    endpoints = [url for url in endpoints if url] or [get_default_endpoint()]
+    kwargs.setdefault("budget", make_budget())
+    transport = RpcTransport(endpoints, **kwargs)
+    client = TransportClient(transport)
+    METRICS.callback(
+        "rpc_hedged_total",
+        "Read calls duplicated onto a second endpoint",
+        lambda: transport.hedged,
+    )
+    budget = transport.budget
+    if budget is not None:
+        METRICS.callback(
+            "rpc_credits_spent_total",
+            "RPC credits charged to the budget",
+            lambda: budget.spent,
+        )
+        METRICS.callback(
+            "rpc_budget_wait_seconds_total",
+            "Time calls waited for RPC credits",
+            lambda: budget.waited,
+        )
+    return client
@@ -0,0 +1,207 @@
+"""Wallet registry backed by a memory-mapped index of pubkeys and ATAs.
+
+``Wallets.txt`` is parsed and validated once; owner pubkeys and the
+associated token account of every configured mint are written to a
+fixed-width index next to it. Later starts map the index instead of decoding
+keys and deriving PDAs, and only parse a secret key when its Keypair is
+actually used.
+
+Index layout (little endian):
+
+    magic    8 bytes   b"WLTIDX1\\0"
+    digest  32 bytes   sha256 of Wallets.txt and the mint list
+    wallets  u32
+    mints    u32
+    mint pubkeys       32 bytes each
+    rows               per wallet: owner, then one ATA per mint (32 bytes each)
+    valid flags        one byte per wallet
+"""
+import functools
+import hashlib
+import mmap
+import os
+import struct
+from typing import Dict, Iterable, List, Optional, Sequence, Type
+
+from loguru import logger
+from solders.keypair import Keypair  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+from spl.token.instructions import get_associated_token_address
+
+from utils.config import KEYS_PATH, WALLET_INDEX_PATH
+from utils.metadata import b58decode
+
+INDEX_MAGIC = b"WLTIDX1\0"
+_HEADER = struct.Struct("<8s32sII")
+
+
+def parse_keypair(key: str) -> Keypair:
+    """Parses a base58 secret key, raising ValueError if it is malformed."""
+    try:
+        return Keypair.from_bytes(b58decode(key.strip()))
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(str(e)) from None
+
+
+class WalletRegistry:
+    """
+    Every wallet in ``Wallets.txt`` with its precomputed ATAs.
+
+    Wallets are addressed by their index among non-empty lines; invalid keys
+    keep their index and are reported through ``invalid``.
+    """
+
+    def __init__(
+        self,
+        mints: Sequence[Pubkey] = (),
+        keys_path: str = KEYS_PATH,
+        index_path: str = WALLET_INDEX_PATH,
+    ) -> None:
+        self.mints: List[Pubkey] = [
+            mint if isinstance(mint, Pubkey) else Pubkey.from_string(str(mint))
+            for mint in mints
+        ]
+        self.keys_path = keys_path
+        self.index_path = index_path
+        self._mint_slots = {str(mint): slot for slot, mint in enumerate(self.mints)}
+        self._row_size = 32 * (1 + len(self.mints))
+        self._keys: List[str] = []
+        self._keypairs: Dict[int, Keypair] = {}
+        self._index = None
+        self._rows_offset = 0
+        self._flags_offset = 0
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _digest(self, raw: bytes) -> bytes:
+        digest = hashlib.sha256(raw)
+        for mint in self.mints:
+            digest.update(bytes(mint))
+        return digest.digest()
+
+    def load(self) -> None:
+        with open(self.keys_path, "rb") as file:
+            raw = file.read()
+        self._keys = [line.strip() for line in raw.decode().splitlines() if line.strip()]
+        self._keypairs = {}
+        digest = self._digest(raw)
+        if not self._open_index(digest):
+            self._build_index(digest)
+            if not self._open_index(digest):
+                raise ValueError(f"Could not read wallet index {self.index_path}")
+
+    def _open_index(self, digest: bytes) -> bool:
+        if not os.path.exists(self.index_path):
+            return False
+        with open(self.index_path, "rb") as file:
+            if os.fstat(file.fileno()).st_size < _HEADER.size:
+                return False
+            index = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, stored, wallets, mints = _HEADER.unpack_from(index, 0)
+        expected = (
+            _HEADER.size + 32 * mints + wallets * self._row_size + wallets
+        )
+        if (
+            magic != INDEX_MAGIC
+            or stored != digest
+            or wallets != len(self._keys)
+            or mints != len(self.mints)
+            or len(index) != expected
+        ):
+            index.close()
+            return False
+        if self._index is not None:
+            self._index.close()
+        self._index = index
+        self._rows_offset = _HEADER.size + 32 * mints
+        self._flags_offset = self._rows_offset + wallets * self._row_size
+        return True
+
+    def _build_index(self, digest: bytes) -> None:
+        logger.info(f"Building wallet index for {len(self._keys)} wallets")
+        rows = bytearray()
+        flags = bytearray()
+        for line, key in enumerate(self._keys):
+            try:
+                keypair = parse_keypair(key)
+            except ValueError as e:
+                logger.error(f"Invalid private key on line {line + 1}: {e}")
+                rows += bytes(self._row_size)
+                flags.append(0)
+                continue
+            self._keypairs[line] = keypair
+            owner = keypair.pubkey()
+            rows += bytes(owner)
+            for mint in self.mints:
+                rows += bytes(get_associated_token_address(owner, mint))
+            flags.append(1)
+        header = _HEADER.pack(INDEX_MAGIC, digest, len(self._keys), len(self.mints))
+        temporary = f"{self.index_path}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(header)
+            for mint in self.mints:
+                file.write(bytes(mint))
+            file.write(rows)
+            file.write(flags)
+        os.replace(temporary, self.index_path)
+
+    def is_valid(self, index: int) -> bool:
+        return bool(self._index[self._flags_offset + index])
+
+    @property
+    def valid_indexes(self) -> List[int]:
+        return [index for index in range(len(self._keys)) if self.is_valid(index)]
+
+    @property
+    def invalid(self) -> List[int]:
+        return [index for index in range(len(self._keys)) if not self.is_valid(index)]
+
+    def _pubkey_at(self, offset: int) -> Pubkey:
+        return Pubkey.from_bytes(self._index[offset : offset + 32])
+
+    def pubkey(self, index: int) -> Pubkey:
+        return self._pubkey_at(self._rows_offset + index * self._row_size)
+
+    def ata(self, index: int, mint) -> Pubkey:
+        """Associated token account of wallet ``index`` for a configured mint."""
+        slot = self._mint_slots[str(mint)]
+        return self._pubkey_at(
+            self._rows_offset + index * self._row_size + 32 * (1 + slot)
+        )
+
+    def keypair(self, index: int) -> Optional[Keypair]:
+        """Parsed (and cached) keypair, None for an invalid key."""
+        if not self.is_valid(index):
+            return None
+        keypair = self._keypairs.get(index)
+        if keypair is None:
+            keypair = self._keypairs[index] = parse_keypair(self._keys[index])
+        return keypair
+
+    def associated_accounts(self, index: int) -> Dict[str, Pubkey]:
+        return {str(mint): self.ata(index, mint) for mint in self.mints}
+
+    def clients(self, cls: Type, indexes: Iterable[int] = None) -> list:
+        """
+        One ``cls`` instance (e.g. RaydiumClient) per wallet, ATAs prefilled.
+
+        Secret keys are parsed when a client first uses its keypair. Invalid
+        keys still get a client (with no pubkey or keypair) so callers can
+        report them alongside the rest of the fleet.
+        """
+        clients = []
+        for index in range(len(self._keys)) if indexes is None else indexes:
+            valid = self.is_valid(index)
+            client = cls(
+                pubkey=self.pubkey(index) if valid else None,
+                load_keypair=functools.partial(self.keypair, index),
+            )
+            client.wallet_index = index
+            if valid:
+                client.associated_accounts.update(self.associated_accounts(index))
+            clients.append(client)
+        return clients
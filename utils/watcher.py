@@ -0,0 +1,205 @@
+import asyncio
+from typing import Dict, NamedTuple, Optional
+
+from loguru import logger
+from solders.pubkey import Pubkey  # type: ignore
+from solders.rpc.responses import AccountNotification  # type: ignore
+
+from utils.blockchain import SolanaClient
+from utils.config import WATCHER_MAX_BACKOFF, WS_NODE
+from utils.fastlayout import FAST_ACCOUNT_LAYOUT, FAST_CPMM_POOL_INFO_LAYOUT
+from utils.lazy import lazy_import
+
+# websockets is only needed once a pool watcher starts
+websocket_api = lazy_import("solana.rpc.websocket_api")
+
+
+class PoolReserves(NamedTuple):
+    """Slot-stamped CPMM pool state as seen by a PoolWatcher"""
+
+    slot: int
+    vault_a: int
+    vault_b: int
+    protocol_fees_a: int
+    protocol_fees_b: int
+    fund_fees_a: int
+    fund_fees_b: int
+    status: int
+
+    @property
+    def reserve_a(self) -> int:
+        """Tradable side A liquidity (vault balance minus accrued protocol/fund fees)"""
+        return self.vault_a - self.protocol_fees_a - self.fund_fees_a
+
+    @property
+    def reserve_b(self) -> int:
+        return self.vault_b - self.protocol_fees_b - self.fund_fees_b
+
+
+class PoolWatcher:
+    """
+    Live reserve tracking for one CPMM pool over ``accountSubscribe``.
+
+    Subscribes to the pool account and both vaults, applies every update only
+    if it is newer than what it replaces, and resyncs the three accounts with
+    one getMultipleAccounts call after every (re)connect so no update is lost
+    while disconnected.
+
+    Usage:
+        async with PoolWatcher(client, amm_id) as watcher:
+            reserves = watcher.reserves            # latest state, no await
+            reserves = await watcher.wait_for_update()
+    """
+
+    def __init__(
+        self,
+        client: SolanaClient,
+        amm_id: Pubkey,
+        ws_url: str = WS_NODE,
+        commitment: str = "confirmed",
+        max_backoff: float = WATCHER_MAX_BACKOFF,
+    ) -> None:
+        self.client = client
+        self.amm_id = amm_id
+        self.ws_url = ws_url
+        self.commitment = commitment
+        self.max_backoff = max_backoff
+        self.reserves: Optional[PoolReserves] = None
+        # Subscribed and resynced, so ``reserves`` follows the chain
+        self.connected = False
+        self.reconnects = 0
+        self._fields: Dict[str, int] = {}
+        self._slots: Dict[Pubkey, int] = {}
+        self._accounts: Dict[Pubkey, str] = {}
+        # Not bound to a loop until first used, so waiting before start() is fine
+        self._changed = asyncio.Condition()
+        self._task: Optional[asyncio.Task] = None
+
+    def _apply(self, pubkey: Pubkey, slot: int, data: bytes) -> bool:
+        if slot < self._slots.get(pubkey, -1):
+            return False
+        self._slots[pubkey] = slot
+        role = self._accounts[pubkey]
+        if role == "pool":
+            pool = FAST_CPMM_POOL_INFO_LAYOUT.decode(data)
+            self._fields.update(
+                protocol_fees_a=pool.protocolFeesMintA,
+                protocol_fees_b=pool.protocolFeesMintB,
+                fund_fees_a=pool.fundFeesMintA,
+                fund_fees_b=pool.fundFeesMintB,
+                status=pool.status,
+            )
+        else:
+            self._fields[role] = FAST_ACCOUNT_LAYOUT.read("amount", data)
+        self.client.pool_cache.observe_slot(slot)
+        return True
+
+    async def _publish(self) -> None:
+        if len(self._fields) < 7:
+            return
+        self.reserves = PoolReserves(slot=max(self._slots.values()), **self._fields)
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def resync(self) -> None:
+        """Reloads all three accounts over HTTP."""
+        pubkeys = list(self._accounts)
+        response = await self.client.client.get_multiple_accounts(
+            pubkeys, commitment=self.commitment
+        )
+        for pubkey, account in zip(pubkeys, response.value):
+            if account is not None:
+                self._apply(pubkey, response.context.slot, account.data)
+        await self._publish()
+
+    async def _listen(self) -> None:
+        async with websocket_api.connect(self.ws_url) as websocket:
+            for pubkey in self._accounts:
+                await websocket.account_subscribe(
+                    pubkey, commitment=self.commitment, encoding="base64"
+                )
+            for _ in self._accounts:
+                await websocket.recv()
+            await self.resync()
+            self.connected = True
+            async for messages in websocket:
+                for message in messages:
+                    if not isinstance(message, AccountNotification):
+                        continue
+                    request = websocket.subscriptions.get(message.subscription)
+                    if request is None:
+                        continue
+                    result = message.result
+                    if self._apply(
+                        request.account, result.context.slot, result.value.data
+                    ):
+                        await self._publish()
+
+    async def _run(self) -> None:
+        backoff = 0.5
+        while True:
+            try:
+                await self._listen()
+                backoff = 0.5
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Pool watcher for {self.amm_id} disconnected: {e!r}")
+            finally:
+                self.connected = False
+            self.reconnects += 1
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def start(self) -> None:
+        """Loads the current state over HTTP, then starts watching."""
+        if self._task is not None:
+            return
+        pool_keys = await self.client.pool_keys(self.amm_id)
+        self._accounts = {
+            self.amm_id: "pool",
+            pool_keys["vaultA"]: "vault_a",
+            pool_keys["vaultB"]: "vault_b",
+        }
+        await self.resync()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def __aenter__(self) -> "PoolWatcher":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.stop()
+
+    @property
+    def live_reserves(self) -> Optional[PoolReserves]:
+        """``reserves`` while connected; None while they may have gone stale."""
+        return self.reserves if self.connected else None
+
+    async def wait_for_update(
+        self, after_slot: Optional[int] = None, timeout: Optional[float] = None
+    ) -> PoolReserves:
+        """
+        Waits until the state is newer than ``after_slot`` (default: current
+        state). May be called before ``start``; it then waits for the first load.
+        """
+        if after_slot is None:
+            after_slot = self.reserves.slot if self.reserves else -1
+
+        async def newer() -> PoolReserves:
+            async with self._changed:
+                await self._changed.wait_for(
+                    lambda: self.reserves is not None and self.reserves.slot > after_slot
+                )
+            return self.reserves
+
+        return await asyncio.wait_for(newer(), timeout)
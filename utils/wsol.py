@@ -0,0 +1,173 @@
+"""Persistent wrapped-SOL accounts (``WSOL_PERSISTENT`` mode).
+
+By default every sell creates the wallet's wSOL account and closes it again
+after the swap. In persistent mode the account stays open: sells only carry
+the compute budget instructions and the swap, and the wSOL they receive is
+unwrapped periodically for many wallets at once. Unwrapping closes the account
+and recreates it in the same transaction, so it never stops existing and the
+cache of open accounts stays valid.
+"""
+import asyncio
+from typing import Dict, Iterable, List, Sequence
+
+from loguru import logger
+from solders.instruction import Instruction  # type: ignore
+from solders.message import MessageV0  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+from solders.transaction import VersionedTransaction  # type: ignore
+from spl.token.instructions import CloseAccountParams, close_account
+
+from utils.blockchain import create_associated_token_account_idempotent
+from utils.config import (
+    LAMPORTS_PER_SOL,
+    TOKEN_PROGRAM_ID,
+    WSOL,
+    WSOL_UNWRAP_BATCH,
+    WSOL_UNWRAP_MIN_SOL,
+)
+from utils.fastlayout import FAST_ACCOUNT_LAYOUT
+from utils.snapshot import get_multiple_accounts
+
+WSOL_MINT = Pubkey.from_string(WSOL)
+
+
+class WsolAccounts:
+    """Owners whose wSOL associated token account is known to be open"""
+
+    def __init__(self) -> None:
+        self.open: set = set()
+
+    def __contains__(self, owner) -> bool:
+        return str(owner) in self.open
+
+    def __len__(self) -> int:
+        return len(self.open)
+
+    def mark(self, owner) -> None:
+        self.open.add(str(owner))
+
+    def forget(self, owner) -> None:
+        self.open.discard(str(owner))
+
+
+def unwrap_instructions(owner: Pubkey, wsol_account: Pubkey) -> List[Instruction]:
+    """Close the wSOL account into ``owner`` and reopen it empty."""
+    return [
+        close_account(CloseAccountParams(TOKEN_PROGRAM_ID, wsol_account, owner, owner)),
+        create_associated_token_account_idempotent(owner, owner, WSOL_MINT),
+    ]
+
+
+async def sync(clients: Sequence) -> Dict[Pubkey, int]:
+    """
+    Refreshes the open-account cache for ``clients`` in batched calls.
+
+    Returns the wrapped amount (lamports, rent excluded) of every open account,
+    keyed by owner.
+    """
+    clients = [client for client in clients if client.pubkey is not None]
+    if not clients:
+        return {}
+    accounts = await get_multiple_accounts(
+        clients[0].client,
+        [client.associated_token_address(WSOL_MINT) for client in clients],
+    )
+    balances = {}
+    for client, account in zip(clients, accounts):
+        owner = client.pubkey
+        if account is None:
+            client.wsol.forget(owner)
+            continue
+        client.wsol.mark(owner)
+        balances[owner] = FAST_ACCOUNT_LAYOUT.read("amount", account.data)
+    return balances
+
+
+async def _send_batch(batch: Sequence, instructions: Iterable[Instruction]):
+    payer = batch[0]
+    blockhash, last_valid_block_height = await payer.blockhash.latest_with_expiry()
+    message = MessageV0.try_compile(
+        payer.keypair.pubkey(), list(instructions), [], blockhash
+    )
+    transaction = VersionedTransaction(message, [client.keypair for client in batch])
+    return await payer.submitter.submit(bytes(transaction), last_valid_block_height)
+
+
+async def open_missing(clients: Sequence, batch_size: int = WSOL_UNWRAP_BATCH) -> int:
+    """Creates the wSOL account of every wallet that lacks one; returns how many."""
+    await sync(clients)
+    missing = [
+        client
+        for client in clients
+        if client.pubkey is not None and client.pubkey not in client.wsol
+    ]
+    batches = [
+        missing[start : start + batch_size]
+        for start in range(0, len(missing), batch_size)
+    ]
+
+    async def create(batch):
+        result = await _send_batch(
+            batch,
+            (
+                create_associated_token_account_idempotent(
+                    client.pubkey, client.pubkey, WSOL_MINT
+                )
+                for client in batch
+            ),
+        )
+        if result.ok:
+            for client in batch:
+                client.wsol.mark(client.pubkey)
+        return result
+
+    await asyncio.gather(*(create(batch) for batch in batches))
+    return len(missing)
+
+
+async def unwrap(
+    clients: Sequence,
+    min_sol: float = WSOL_UNWRAP_MIN_SOL,
+    batch_size: int = WSOL_UNWRAP_BATCH,
+) -> int:
+    """
+    Unwraps every wSOL account holding at least ``min_sol``.
+
+    Up to ``batch_size`` wallets share one transaction (each signs its own
+    close/reopen pair; the first pays the fee). Returns the lamports unwrapped
+    by confirmed transactions.
+    """
+    balances = await sync(clients)
+    due = [
+        client
+        for client in clients
+        if client.pubkey is not None
+        and balances.get(client.pubkey, 0) >= min_sol * LAMPORTS_PER_SOL
+    ]
+    batches = [
+        due[start : start + batch_size] for start in range(0, len(due), batch_size)
+    ]
+
+    async def close(batch) -> int:
+        instructions = []
+        for client in batch:
+            instructions.extend(
+                unwrap_instructions(
+                    client.pubkey, client.associated_token_address(WSOL_MINT)
+                )
+            )
+        result = await _send_batch(batch, instructions)
+        if not result.ok:
+            logger.error(
+                f"wSOL unwrap {result.signature} {result.status}: {result.error}"
+            )
+            return 0
+        return sum(balances[client.pubkey] for client in batch)
+
+    unwrapped = sum(await asyncio.gather(*(close(batch) for batch in batches)))
+    if due:
+        logger.info(
+            f"Unwrapped {unwrapped / LAMPORTS_PER_SOL:.4f} SOL from {len(due)} wallets "
+            f"in {len(batches)} transactions"
+        )
+    return unwrapped